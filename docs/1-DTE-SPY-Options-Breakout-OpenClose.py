@@ -1,11 +1,37 @@
+import timeit
+MODULE_LOAD_STARTED = timeit.default_timer()  # Start of the deploy-to-first-bar clock (see StartupProfiler)
 from AlgorithmImports import *
+ALGORITHM_IMPORTS_SECONDS = timeit.default_timer() - MODULE_LOAD_STARTED
 import numpy as np
-from hmmlearn.hmm import GaussianHMM
 from datetime import timedelta
 from collections import defaultdict
+MODULE_IMPORTS_SECONDS = timeit.default_timer() - MODULE_LOAD_STARTED
+
+# === DEFERRED IMPORT: hmmlearn ===
+# hmmlearn pulls in scikit-learn and scipy, which cost seconds at module load but are only needed by the
+# monthly update_regime. load_gaussian_hmm() imports it on first use, from the algorithm thread.
+GaussianHMM = None
+HMM_IMPORT_SECONDS = None
+
+def load_gaussian_hmm():
+    """Return hmmlearn's GaussianHMM class, importing it the first time."""
+    global GaussianHMM, HMM_IMPORT_SECONDS
+    if GaussianHMM is None:
+        started = timeit.default_timer()
+        from hmmlearn.hmm import GaussianHMM as gaussian_hmm
+        HMM_IMPORT_SECONDS = timeit.default_timer() - started
+        GaussianHMM = gaussian_hmm
+    return GaussianHMM
+
+# === STATIC CONFIG (computed once at import, not on every regime update) ===
+HMM_PARAMS = dict(n_components=3, covariance_type="diag", n_iter=100, random_state=42)
+REGIME_NAMES = {1: "BULL", 0: "NEUTRAL", -1: "BEAR"}
 
 class RegimeAwareMultiStrategyAlgorithm(QCAlgorithm):
     def initialize(self):
+        # Import / initialize / first-bar timings, logged once the first bar after warmup arrives
+        self.startup_profiler = StartupProfiler(self)
+
         # === STEP 1: ALL CONFIG PARAMETERS ===
         self.btc_momentum_period = 14
         self.btc_rsi_period = 14
@@ -42,6 +68,7 @@ class RegimeAwareMultiStrategyAlgorithm(QCAlgorithm):
         self.market_regime = None # -1: Bear, 0: Neutral, 1: Bull
         self.regime_update_interval = 30
         self.last_regime_update = None
+        self.startup_profiler.mark("parameters")
 
         # === STEP 2: ALGO SETUP ===
         self.SetStartDate(2023, 1, 1)
@@ -83,18 +110,30 @@ class RegimeAwareMultiStrategyAlgorithm(QCAlgorithm):
         self.spy_daily_symbol = self.AddEquity("SPY", Resolution.Daily).Symbol
         self.vix_daily_symbol = self.AddIndex("VIX", Resolution.Daily).Symbol
         self.hmm_model = None
+        # Daily bars for the regime features, extended by the missing tail instead of refetching 252 bars every month
+        self.history_cache = HistoryCache(self, max_bars=2 * self.regime_lookback)
+        self.startup_profiler.mark("securities")
+
+        # Chain preprocessing (right / DTE split, greeks, quotes) done once per slice and shared by the alphas
+        self.chain_cache = ChainCache(self)
+        # Vectorized credit spread construction on top of the cached chain arrays (gap alpha)
+        self.spread_search = SpreadSearch(self)
 
         # === STEP 4: ALPHA MODELS (AFTER ALL SYMBOLS ARE SET) ===
-        self.AddAlpha(BTCMomentumAlphaModel(self))
-        self.AddAlpha(PutSellingAlphaModel(self))
-        self.AddAlpha(CoveredCallAlphaModel(self))
-        self.AddAlpha(GapOptionSpreadAlphaModel(self))
+        # The scheduler is the only alpha LEAN sees. It calls each model's Update only when its declared
+        # inputs arrived in the slice and its window (cadence) is open, and times every call.
+        self.alpha_scheduler = AlphaScheduler(self, [
+            BTCMomentumAlphaModel(self),
+            PutSellingAlphaModel(self),
+            CoveredCallAlphaModel(self),
+            GapOptionSpreadAlphaModel(self),
+        ])
+        self.AddAlpha(self.alpha_scheduler)
 
         # === STEP 5: PORTFOLIO & EXECUTION ===
-        self.SetPortfolioConstruction(InsightWeightingPortfolioConstructionModel(
-            rebalance=self.DateRules.WeekStart(),
-            portfolio_bias=PortfolioBias.LONG_SHORT
-        ))
+        # Nets the alphas' intents per symbol and treats option insights as option legs (see the model)
+        self.portfolio_model = NettingOptionPortfolioConstructionModel(min_trade_value=1000)
+        self.SetPortfolioConstruction(self.portfolio_model)
         self.SetExecution(ImmediateExecutionModel())
         self.SetRiskManagement(MaximumDrawdownPercentPerSecurity(0.12))
 
@@ -103,6 +142,7 @@ class RegimeAwareMultiStrategyAlgorithm(QCAlgorithm):
         # need 14-20 days to be ready. This was stopping 3/5 strategies.
         # Setting to 25 to give a buffer.
         self.SetWarmUp(25)
+        self.startup_profiler.mark("alphas and models")
 
         # === STEP 6: SCHEDULED FUNCTIONS ===
         self.Schedule.On(self.DateRules.MonthStart(),
@@ -125,6 +165,7 @@ class RegimeAwareMultiStrategyAlgorithm(QCAlgorithm):
             
         # Track open gap spread orders
         self.open_gap_spread_tickets = []
+        self.startup_profiler.mark("schedules")
 
 
     def update_regime(self):
@@ -132,13 +173,14 @@ class RegimeAwareMultiStrategyAlgorithm(QCAlgorithm):
         if self.IsWarmingUp:
             return
             
-        history = self.History([self.spy_daily_symbol, self.vix_daily_symbol], self.regime_lookback, Resolution.Daily)
-        if history.empty or len(history.loc[self.spy_daily_symbol]) < self.regime_lookback or len(history.loc[self.vix_daily_symbol]) < self.regime_lookback:
+        # NumPy views from the history cache, no DataFrame round trip
+        history = self.history_cache.get([self.spy_daily_symbol, self.vix_daily_symbol], self.regime_lookback, Resolution.Daily)
+        if len(history[self.spy_daily_symbol]["close"]) < self.regime_lookback or len(history[self.vix_daily_symbol]["close"]) < self.regime_lookback:
             self.Log(f"HMM update failed: Not enough history. Need {self.regime_lookback} bars.")
             return
             
-        spy_prices = history.loc[self.spy_daily_symbol]['close'].values
-        vix_prices = history.loc[self.vix_daily_symbol]['close'].values
+        spy_prices = history[self.spy_daily_symbol]["close"]
+        vix_prices = history[self.vix_daily_symbol]["close"]
         
         spy_returns = np.diff(np.log(spy_prices))
         vix_returns = np.diff(np.log(vix_prices))
@@ -151,10 +193,10 @@ class RegimeAwareMultiStrategyAlgorithm(QCAlgorithm):
             return
 
         try:
-            # FIX: Changed covariance_type from "full" to "diag".
+            # FIX: Changed covariance_type from "full" to "diag" (see HMM_PARAMS).
             # "full" can cause numerical instability ("positive-definite" error) when features
             # like SPY and VIX returns are highly correlated. "diag" is more robust.
-            self.hmm_model = GaussianHMM(n_components=3, covariance_type="diag", n_iter=100, random_state=42)
+            self.hmm_model = load_gaussian_hmm()(**HMM_PARAMS)
             self.hmm_model.fit(features)
             hidden_states = self.hmm_model.predict(features)
             
@@ -172,8 +214,8 @@ class RegimeAwareMultiStrategyAlgorithm(QCAlgorithm):
             current_hmm_state = hidden_states[-1]
             self.market_regime = state_map[current_hmm_state]
 
-            regime_name = {1: "BULL", 0: "NEUTRAL", -1: "BEAR"}[self.market_regime]
-            self.Log(f"Regime Updated: {regime_name} (HMM State: {current_hmm_state})")
+            regime_name = REGIME_NAMES[self.market_regime]
+            self.Log(f"Regime Updated: {regime_name} (HMM State: {current_hmm_state}) | History cache: {self.history_cache.summary()}")
             self.Plot("Market Regime", "State", self.market_regime)
 
         except Exception as e:
@@ -209,6 +251,7 @@ class RegimeAwareMultiStrategyAlgorithm(QCAlgorithm):
 
     def OnData(self, slice):
         """Main data handler - chains available here"""
+        self.startup_profiler.on_data()
         if self.IsWarmingUp:
             return
 
@@ -246,13 +289,28 @@ class RegimeAwareMultiStrategyAlgorithm(QCAlgorithm):
         for removed in changes.RemovedSecurities:
             self.Log(f"Removed: {removed.Symbol}")
 
+    def OnEndOfAlgorithm(self):
+        self.Log(f"[ALPHA SCHEDULER] {self.alpha_scheduler.report()}")
+        self.Log(f"[CHAIN CACHE] {self.chain_cache.hits} hits, {self.chain_cache.misses} misses")
+        self.Log(f"[PORTFOLIO] {self.portfolio_model.report()}")
+        self.Log(f"[SPREAD SEARCH] {self.spread_search.report()}")
+
 
 class BTCMomentumAlphaModel(AlphaModel):
     """Strategy 3: BTC Futures Momentum (10%)"""
+    cadence = "on_input" # Daily BTC bar
+    watch_regime = True  # Regime exits go out as soon as the regime flips
+
     def __init__(self, algorithm):
         self.algorithm = algorithm
         self.name = "BTC_MOMENTUM"
 
+    def inputs(self, algorithm):
+        return [algorithm.btc_contract]
+
+    def holdings_key(self, algorithm):
+        return None
+
     def Update(self, algorithm, data):
         insights = []
 
@@ -294,10 +352,19 @@ class BTCMomentumAlphaModel(AlphaModel):
 
 class PutSellingAlphaModel(AlphaModel):
     """Strategy 4: QQQ Wheel Put Selling (25%)"""
+    cadence = "weekly"
+    watch_regime = True
+
     def __init__(self, algorithm):
         self.algorithm = algorithm
         self.name = "WHEEL_PUT_SELLING"
 
+    def inputs(self, algorithm):
+        return [algorithm.qqq_option.Symbol, algorithm.qqq_symbol]
+
+    def holdings_key(self, algorithm):
+        return None
+
     def Update(self, algorithm, data):
         insights = []
         if algorithm.IsWarmingUp:
@@ -333,38 +400,21 @@ class PutSellingAlphaModel(AlphaModel):
             self.algorithm.Log("[WHEEL_PUT] QQQ Option chain not found in data.")
             return insights
 
-        chain = data.OptionChains[algorithm.qqq_option.Symbol]
-        if len(chain) == 0:
-            return insights
-
         if not data.ContainsKey(algorithm.qqq_symbol) or data[algorithm.qqq_symbol] is None:
              return insights
 
         qqq_price = data[algorithm.qqq_symbol].Close
         if qqq_price == 0: return insights
         
-        puts = [contract for contract in chain if contract.Right == OptionRight.Put]
-        if len(puts) == 0:
-            return insights
-
-        valid_puts = []
-        for put in puts:
-            dte = (put.Expiry.date() - algorithm.Time.date()).days
-            if 25 <= dte <= 50:
-                valid_puts.append((put, dte))
-
-        if len(valid_puts) == 0:
+        # QQQ puts with 25-50 DTE, prefiltered once per slice by the shared chain cache
+        puts = algorithm.chain_cache.get(data, algorithm.qqq_option.Symbol, OptionRight.Put, 25, 50)
+        if puts is None or len(puts["contract"]) == 0:
             return insights
 
-        valid_puts.sort(key=lambda x: abs(x[1] - 35))
-        selected_dte = valid_puts[0][1]
-        contracts_at_dte = [p[0] for p in valid_puts if p[1] == selected_dte]
-
-        if len(contracts_at_dte) == 0:
-            return insights
-
-        # Find the put with the delta closest to our target
-        best_put = min(contracts_at_dte, key=lambda p: abs(p.Greeks.Delta - algorithm.wheel_put_delta))
+        # Expiry closest to the 35 DTE target, then the put with the delta closest to our target
+        selected_dte = int(puts["dte"][np.argmin(np.abs(puts["dte"] - algorithm.wheel_dte_target))])
+        at_dte = np.flatnonzero(puts["dte"] == selected_dte)
+        best_put = puts["contract"][at_dte[np.argmin(np.abs(puts["delta"][at_dte] - algorithm.wheel_put_delta))]]
         portfolio_value = algorithm.Portfolio.TotalPortfolioValue
         allocation_amount = portfolio_value * algorithm.wheel_allocation
         current_collateral = best_put.Strike * 100
@@ -377,15 +427,11 @@ class PutSellingAlphaModel(AlphaModel):
             iv_signal = 0.5 # This is hardcoded, consider calculating it
             if iv_signal > 0.3:
                 algorithm.Log(f"[ALPHA] WHEEL_PUT EMIT: SELL {max_contracts} contracts at {best_put.Strike:.2f} strike (Delta: {best_put.Greeks.Delta:.2f}), {selected_dte} DTE")
-                # This insight is for the underlying, which the PCM will use to sell the put.
-                # However, this insight direction is wrong for a put sale.
-                # A "short put" profits if the underlying goes UP.
-                # The insight should be UP, but the PCM needs to know to sell a put.
-                # This might be better handled by a custom PortfolioConstructionModel.
-                # For InsightWeighting, this UP insight will just BUY QQQ stock.
-                # This strategy needs to be re-thought or use a different PCM.
-                # For now, emitting the insight as-is, but this is a logic problem.
-                insights.append(Insight.Price(algorithm.qqq_symbol, timedelta(days=selected_dte), InsightDirection.Up, confidence=0.65, weight=min(0.25, max_contracts * 0.15)))
+                # Short put leg on the contract itself: the netting PCM reads Down on an option as "sell" and
+                # sizes it from the weight as collateral (strike x 100), i.e. back to max_contracts. The insight
+                # outlives the expiry so the PCM does not send a zero target (a buy-back) on expiry morning
+                period = best_put.Expiry - algorithm.Time + timedelta(days=1)
+                insights.append(Insight.Price(best_put.Symbol, period, InsightDirection.Down, confidence=0.65, weight=algorithm.wheel_allocation, tag="WheelPut"))
                 algorithm.wheel_put_quantity = max_contracts
                 algorithm.wheel_put_entry_price[best_put.Expiry] = best_put.Strike
         return insights
@@ -393,10 +439,20 @@ class PutSellingAlphaModel(AlphaModel):
 
 class CoveredCallAlphaModel(AlphaModel):
     """Strategy 4: QQQ Wheel Covered Calls (25%)"""
+    cadence = "weekly"
+    watch_regime = False
+
     def __init__(self, algorithm):
         self.algorithm = algorithm
         self.name = "WHEEL_COVERED_CALLS"
 
+    def inputs(self, algorithm):
+        return [algorithm.qqq_option.Symbol, algorithm.qqq_symbol]
+
+    def holdings_key(self, algorithm):
+        # Shares arriving from a put assignment should be covered right away, not next week
+        return algorithm.Portfolio[algorithm.qqq_symbol].Quantity
+
     def Update(self, algorithm, data):
         insights = []
         if algorithm.IsWarmingUp:
@@ -418,46 +474,31 @@ class CoveredCallAlphaModel(AlphaModel):
                 self.algorithm.Log("[WHEEL_CALL] QQQ Option chain not found in data.")
                 return insights
 
-            chain = data.OptionChains[algorithm.qqq_option.Symbol]
-            calls = [contract for contract in chain if contract.Right == OptionRight.Call]
-            if len(calls) == 0:
-                return insights
-                
             if not data.ContainsKey(algorithm.qqq_symbol) or data[algorithm.qqq_symbol] is None:
                 return insights
 
             qqq_price = data[algorithm.qqq_symbol].Close
             if qqq_price == 0: return insights
 
-            valid_calls = []
-            for call in calls:
-                dte = (call.Expiry.date() - algorithm.Time.date()).days
-                if 25 <= dte <= 50:
-                    valid_calls.append((call, dte))
-
-            if len(valid_calls) == 0:
-                return insights
-
-            valid_calls.sort(key=lambda x: abs(x[1] - 35))
-            selected_dte = valid_calls[0][1]
-            contracts_at_dte = [c[0] for c in valid_calls if c[1] == selected_dte]
-            
-            if len(contracts_at_dte) == 0:
+            # Same slice-scoped cache as the put side (computed once even when both wheel legs run)
+            calls = algorithm.chain_cache.get(data, algorithm.qqq_option.Symbol, OptionRight.Call, 25, 50)
+            if calls is None or len(calls["contract"]) == 0:
                 return insights
 
-            # Find the call with the delta closest to our target
-            best_call = min(contracts_at_dte, key=lambda c: abs(c.Greeks.Delta - algorithm.wheel_call_delta))
+            selected_dte = int(calls["dte"][np.argmin(np.abs(calls["dte"] - algorithm.wheel_dte_target))])
+            at_dte = np.flatnonzero(calls["dte"] == selected_dte)
+            best_call = calls["contract"][at_dte[np.argmin(np.abs(calls["delta"][at_dte] - algorithm.wheel_call_delta))]]
             # This logic is flawed, allocation is not used
             call_contracts = qqq_holdings.Quantity // 100 
             # call_contracts = min(qqq_holdings.Quantity // 100, int(algorithm.wheel_allocation * 100)) # Original logic
 
             if call_contracts > 0:
                 algorithm.Log(f"[ALPHA] WHEEL_CALL EMIT: SELL {call_contracts} contracts at {best_call.Strike:.2f} strike, {selected_dte} DTE")
-                # This insight is also problematic. A "short call" (covered call)
-                # profits if the underlying goes DOWN (or sideways).
-                # Emitting a DOWN insight will conflict with any long QQQ holdings.
-                # This highlights a conflict with the InsightWeightingPCM.
-                insights.append(Insight.Price(algorithm.qqq_symbol, timedelta(days=selected_dte), InsightDirection.Down, confidence=0.60, weight=0.05, tag="CoveredCall"))
+                # Short call leg on the contract, not a QQQ sell: weight is the covered notional, so the PCM sizes it
+                # back to call_contracts (and caps it at the shares held)
+                call_weight = call_contracts * best_call.Strike * 100 / algorithm.Portfolio.TotalPortfolioValue
+                period = best_call.Expiry - algorithm.Time + timedelta(days=1)  # past expiry, like the put
+                insights.append(Insight.Price(best_call.Symbol, period, InsightDirection.Down, confidence=0.60, weight=call_weight, tag="CoveredCall"))
                 algorithm.wheel_call_quantity = call_contracts
                 algorithm.wheel_call_entry_price[best_call.Expiry] = best_call.Strike
         return insights
@@ -465,6 +506,9 @@ class CoveredCallAlphaModel(AlphaModel):
 
 class GapOptionSpreadAlphaModel(AlphaModel):
     """Strategy 5: VIX/QQQ Open Gap 3-DTE Option Spreads (NEW - 15%)"""
+    cadence = "open_close" # Gap check on the first bar of the day, close recorded on the last
+    watch_regime = False
+
     def __init__(self, algorithm):
         self.algorithm = algorithm
         self.name = "GAP_OPTION_SPREADS"
@@ -477,6 +521,11 @@ class GapOptionSpreadAlphaModel(AlphaModel):
         self.gap_today_processed = False
         self.gap_last_processed_date = None
 
+    def inputs(self, algorithm):
+        return [algorithm.vix_index_symbol, algorithm.qqq_symbol]
+
+    def holdings_key(self, algorithm):
+        return None
 
     def Update(self, algorithm, data):
         insights = []
@@ -546,6 +595,10 @@ class GapOptionSpreadAlphaModel(AlphaModel):
         if current_date != self.gap_last_processed_date:
             self.gap_today_processed = False
             self.gap_last_processed_date = current_date
+        else:
+            # Only the first bar of the day opens on a gap. Later bars (the scheduler's close window)
+            # just carry the close forward for tomorrow's gap.
+            self.gap_today_processed = True
 
         if self.gap_today_processed:
             self.gap_yesterday_vix_close = current_vix_close
@@ -573,13 +626,13 @@ class GapOptionSpreadAlphaModel(AlphaModel):
             algorithm.Log(f"[GAP TRIGGERED] CALL SPREAD")
             # This is a hybrid model: the Alpha finds the trade but the main algorithm executes it.
             # This is necessary for complex orders like combo limit orders.
-            if algorithm.submit_spread_limit_order(option_chain, call=True):
+            if algorithm.submit_spread_limit_order(data, call=True):
                 self.gap_today_processed = True
                 algorithm.Log(f"[HYBRID] GAP_SPREAD SUBMITTED: CALL SPREAD VIX_gap={vix_gap_pct:.4f} QQQ_gap={qqq_gap_pct:.4f}")
 
         elif (vix_gap_pct <= -algorithm.gap_vix_threshold and qqq_gap_pct <= 0.01):
             algorithm.Log(f"[GAP TRIGGERED] PUT SPREAD")
-            if algorithm.submit_spread_limit_order(option_chain, call=False):
+            if algorithm.submit_spread_limit_order(data, call=False):
                 self.gap_today_processed = True
                 algorithm.Log(f"[HYBRID] GAP_SPREAD SUBMITTED: PUT SPREAD VIX_gap={vix_gap_pct:.4f} QQQ_gap={qqq_gap_pct:.4f}")
 
@@ -589,35 +642,25 @@ class GapOptionSpreadAlphaModel(AlphaModel):
         return insights
 
 
-def submit_spread_limit_order(self, option_chain, call=True):
+def submit_spread_limit_order(self, data, call=True):
     qty = 5
-    target_delta_short = algorithm.gap_short_delta if call else -algorithm.gap_short_delta
-    target_delta_long = algorithm.gap_long_delta if call else -algorithm.gap_long_delta
     option_type = OptionRight.Call if call else OptionRight.Put
 
-    shorts = [x for x in option_chain if x.Right == option_type and hasattr(x, 'Greeks') and x.Greeks.Delta is not None and ((x.Greeks.Delta <= target_delta_short and call) or (x.Greeks.Delta >= target_delta_short and not call)) and algorithm.is_liquid(x) and 0 <= (x.Expiry - algorithm.Time).days <= 3]
+    # Right and expiry window come prefiltered from the slice-scoped chain cache. (Expiry - Time).days in [0, 3]
+    # is calendar DTE 1-4 (expiries are stamped at midnight), which is the window the cache is asked for.
+    candidates = self.chain_cache.get(data, self.spy_option.Symbol, option_type, 1, 4)
 
-    if not shorts:
-        self.Log(f"[GAP] No liquid shorts found matching delta {target_delta_short}")
+    # Both legs are chosen together from every liquid same-expiry pair (see SpreadSearch), so the legs always
+    # share an expiry and have distinct strikes
+    spreads = self.spread_search.best(candidates, call, top_n=3)
+    if not spreads:
+        self.Log(f"[GAP] No liquid {option_type} spread with short delta <= {self.gap_short_delta} and long delta <= {self.gap_long_delta}")
         return False
 
-    short_leg = min(shorts, key=lambda x: abs(x.Greeks.Delta - target_delta_short))
-    longs = [x for x in option_chain if x.Right == option_type and hasattr(x, 'Greeks') and x.Greeks.Delta is not None and ((x.Greeks.Delta <= target_delta_long and call) or (x.Greeks.Delta >= target_delta_long and not call)) and algorithm.is_liquid(x) and 0 <= (x.Expiry - algorithm.Time).days <= 3]
-
-    if not longs:
-        self.Log(f"[GAP] No liquid longs found matching delta {target_delta_long}")
-        return False
-
-    long_leg = min(longs, key=lambda x: abs(x.Greeks.Delta - target_delta_long))
-
-    if short_leg.Expiry != long_leg.Expiry:
-        self.Log("[GAP] Different expiries for short and long legs")
-        return False
-
-    # Ensure strikes are not the same
-    if short_leg.Strike == long_leg.Strike:
-        self.Log("[GAP] Short and long leg strikes are the same.")
-        return False
+    best = spreads[0]
+    short_leg, long_leg = best["short"], best["long"]
+    self.Log(f"[GAP] Spread {short_leg.Strike}/{long_leg.Strike} {short_leg.Expiry:%Y-%m-%d}: credit {best['credit']:.2f} "
+             f"width {best['width']:.2f} POP {best['pop']:.2f} score {best['score']:.3f} ({len(spreads)} ranked)")
 
     # Create the combo order
     legs = [
@@ -625,45 +668,435 @@ def submit_spread_limit_order(self, option_chain, call=True):
         Leg.Create(long_leg.Symbol, qty)   # Buy the long leg
     ]
 
-    # Calculate limit price: Mid-point of the spread's bid/ask
-    limit_price = (short_leg.BidPrice - long_leg.AskPrice) if call else (short_leg.BidPrice - long_leg.AskPrice)
+    # Limit price: the natural credit (short bid - long ask) the spread was scored on
+    limit_price = best["credit"]
     
     ticket = self.ComboLimitOrder(legs, 0, limit_price) # Quantity is in the legs
     self.open_gap_spread_tickets.append(ticket)
     return True
 
 
-def is_liquid(self, contract):
-    """Check if option contract has sufficient liquidity"""
-    # === FIX 4: USE ALGORITHM PARAMETERS ===
-    # The original function had hardcoded values (0.08, 100, 0.10)
-    # This now correctly uses the parameters you defined in Initialize.
-    try:
-        bid = contract.BidPrice if hasattr(contract, 'BidPrice') and contract.BidPrice else 0
-        ask = contract.AskPrice if hasattr(contract, 'AskPrice') and contract.AskPrice else 0
-        
-        if bid <= self.gap_min_spread_bid:
-            # self.Log(f"[is_liquid] FAILED: Bid {bid} <= {self.gap_min_spread_bid}")
-            return False
-        if ask <= 0:
-            # self.Log(f"[is_liquid] FAILED: Ask {ask} <= 0")
-            return False
-            
-        spread = (ask - bid) / bid
-        oi = contract.OpenInterest if hasattr(contract, 'OpenInterest') else 0
-        
-        if oi <= self.gap_min_oi:
-            # self.Log(f"[is_liquid] FAILED: OI {oi} <= {self.gap_min_oi}")
-            return False
-        
-        if spread >= self.gap_max_spread_pct:
-            # self.Log(f"[is_liquid] FAILED: Spread {spread:.2f} >= {self.gap_max_spread_pct}")
-            return False
+class ChainCache:
+    """
+    Slice-scoped memo of option chain preprocessing shared by the alpha models.
+    get(data, canonical, right, min_dte, max_dte) returns read-only arrays (contract, strike, expiry, dte, delta,
+    bid, ask, open_interest) for the contracts of one chain with that right and calendar DTE in [min_dte, max_dte].
+    The whole chain is converted once per slice; each filtered request is computed once per slice; everything is
+    dropped when algorithm.Time moves to the next slice.
+    """
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.slice_time = None
+        self.chains = {} # canonical -> arrays for the whole chain (None when the chain is not in the slice)
+        self.views = {}  # (canonical, right, min_dte, max_dte) -> filtered arrays
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data, canonical, right, min_dte, max_dte):
+        if self.algorithm.Time != self.slice_time:
+            self.slice_time = self.algorithm.Time
+            self.chains.clear()
+            self.views.clear()
+        key = (canonical, right, min_dte, max_dte)
+        if key in self.views:
+            self.hits += 1
+            return self.views[key]
+        self.misses += 1
+
+        if canonical not in self.chains:
+            chain = data.OptionChains[canonical] if data.OptionChains and canonical in data.OptionChains else None
+            self.chains[canonical] = self.chain_arrays(chain) if chain is not None and len(chain) > 0 else None
+        arrays = self.chains[canonical]
+        if arrays is None:
+            self.views[key] = None
+            return None
+
+        mask = (arrays["is_call"] == (right == OptionRight.Call)) & (arrays["dte"] >= min_dte) & (arrays["dte"] <= max_dte)
+        view = {field: values[mask] for field, values in arrays.items()}
+        # Greeks are only evaluated for the contracts that survived the filter
+        view["delta"] = np.array([c.Greeks.Delta for c in view["contract"]], dtype=float)
+        for values in view.values():
+            values.flags.writeable = False
+        self.views[key] = view
+        return view
+
+    def chain_arrays(self, chain):
+        contracts = list(chain)
+        today = self.algorithm.Time.date()
+        return {
+            "contract": np.array(contracts, dtype=object),
+            "is_call": np.array([c.Right == OptionRight.Call for c in contracts], dtype=bool),
+            "strike": np.array([float(c.Strike) for c in contracts], dtype=float),
+            "expiry": np.array([c.Expiry.date().toordinal() for c in contracts], dtype=np.int64),
+            "dte": np.array([(c.Expiry.date() - today).days for c in contracts], dtype=np.int64),
+            "bid": np.array([float(c.BidPrice or 0) for c in contracts], dtype=float),
+            "ask": np.array([float(c.AskPrice or 0) for c in contracts], dtype=float),
+            "open_interest": np.array([float(c.OpenInterest or 0) for c in contracts], dtype=float),
+        }
+
+
+class SpreadSearch:
+    """
+    Vectorized credit spread construction over ChainCache arrays.
+    best(chain, call, top_n) enumerates every (short, long) pair of one right as a broadcast matrix, keeping pairs
+    with the same expiry, the long strike further out of the money, a liquid short at or beyond the short delta
+    target and a liquid long at or beyond the long delta target, and a positive credit (short bid - long ask).
+    Each pair is scored in one pass:
+      credit / width + POP - delta_weight * (distance of both legs from their delta targets) - leg bid/ask cost / width
+    where POP is 1 - |delta| at the breakeven, interpolated between the two strikes. Pairs dominated on
+    (credit, POP, max loss) by another pair are pruned before ranking. Returns up to top_n dicts, best first.
+    """
+    def __init__(self, algorithm, delta_weight=5.0, chunk=256):
+        self.algorithm = algorithm
+        self.delta_weight = delta_weight
+        self.chunk = chunk  # rows per block of the dominance comparison, bounds its memory to chunk x pairs
+        self.searches = 0
+        self.pairs = 0
+        self.pruned = 0
+
+    def liquid_mask(self, chain):
+        """Vectorized liquidity check with the gap parameters set in Initialize (min bid, min OI, max relative spread)"""
+        algorithm = self.algorithm
+        bid, ask = chain["bid"], chain["ask"]
+        relative_spread = np.divide(ask - bid, bid, out=np.full(len(bid), np.inf), where=bid > 0)
+        return ((bid > algorithm.gap_min_spread_bid) & (ask > 0) & (chain["open_interest"] > algorithm.gap_min_oi)
+                & (relative_spread < algorithm.gap_max_spread_pct) & np.isfinite(chain["delta"]))
+
+    def best(self, chain, call, top_n=3):
+        algorithm = self.algorithm
+        self.searches += 1
+        if chain is None or len(chain["contract"]) == 0:
+            return []
+        side = 1.0 if call else -1.0
+        abs_delta = np.abs(chain["delta"])
+        liquid = self.liquid_mask(chain)
+        short_idx = np.flatnonzero(liquid & (abs_delta <= algorithm.gap_short_delta))
+        long_idx = np.flatnonzero(liquid & (abs_delta <= algorithm.gap_long_delta))
+        if len(short_idx) == 0 or len(long_idx) == 0:
+            return []
+
+        strike, expiry, bid, ask = chain["strike"], chain["expiry"], chain["bid"], chain["ask"]
+        s, l = short_idx[:, None], long_idx[None, :]
+        width = (strike[l] - strike[s]) * side
+        credit = bid[s] - ask[l]
+        valid = (expiry[s] == expiry[l]) & (width > 0) & (credit > 0) & (credit < width)
+        rows, cols = np.nonzero(valid)
+        self.pairs += len(rows)
+        if len(rows) == 0:
+            return []
+        s, l = short_idx[rows], long_idx[cols]
+        width, credit = width[rows, cols], credit[rows, cols]
+
+        ratio = credit / width
+        pop = 1 - (abs_delta[s] - (abs_delta[s] - abs_delta[l]) * ratio)
+        max_loss = width - credit
+
+        keep = self.non_dominated(credit, pop, max_loss)
+        self.pruned += len(keep) - int(keep.sum())
+        s, l, width, credit, ratio, pop = s[keep], l[keep], width[keep], credit[keep], ratio[keep], pop[keep]
+
+        delta_error = np.abs(abs_delta[s] - algorithm.gap_short_delta) + np.abs(abs_delta[l] - algorithm.gap_long_delta)
+        leg_cost = ((ask[s] - bid[s]) + (ask[l] - bid[l])) / width
+        score = ratio + pop - self.delta_weight * delta_error - leg_cost
+
+        order = np.argsort(-score)[:top_n]
+        return [{
+            "short": chain["contract"][s[i]],
+            "long": chain["contract"][l[i]],
+            "credit": float(credit[i]),
+            "width": float(width[i]),
+            "pop": float(pop[i]),
+            "score": float(score[i]),
+        } for i in order]
+
+    def non_dominated(self, credit, pop, max_loss):
+        """True for pairs no other pair beats on credit, POP and max loss at once (ties are kept)"""
+        keep = np.ones(len(credit), dtype=bool)
+        for start in range(0, len(credit), self.chunk):
+            block = slice(start, start + self.chunk)
+            at_least = ((credit[None, :] >= credit[block, None]) & (pop[None, :] >= pop[block, None])
+                        & (max_loss[None, :] <= max_loss[block, None]))
+            better = ((credit[None, :] > credit[block, None]) | (pop[None, :] > pop[block, None])
+                      | (max_loss[None, :] < max_loss[block, None]))
+            keep[block] = ~(at_least & better).any(axis=1)
+        return keep
+
+    def report(self):
+        return f"{self.searches} searches, {self.pairs} valid pairs, {self.pruned} pruned as dominated"
+
+
+class AlphaScheduler(AlphaModel):
+    """
+    Single alpha model that owns the strategy alphas and decides, slice by slice, which of them run.
+    Each alpha declares:
+    - inputs(algorithm): symbols (bars or canonical option symbols) that must all be in the slice.
+    - cadence: "on_input" (whenever the inputs arrive), "weekly" (first slice of the week with inputs),
+      "open_close" (first slice of the day with inputs, and the last bar of the session).
+    - watch_regime: also run when algorithm.market_regime changed since the alpha last ran.
+    - holdings_key(algorithm): a value whose change (e.g. a share count) also makes the alpha due.
+    Calls, skips and time spent are kept per alpha; report() summarizes them.
+    """
+    def __init__(self, algorithm, alphas):
+        self.algorithm = algorithm
+        self.alphas = alphas
+        self.name = "ALPHA_SCHEDULER"
+        self.state = {alpha.name: {"week": None, "day": None, "regime": None, "holdings": None} for alpha in alphas}
+        self.stats = {alpha.name: [0, 0, 0.0] for alpha in alphas} # calls, skips, seconds
+
+    def Update(self, algorithm, data):
+        insights = []
+        for alpha in self.alphas:
+            if not self.is_due(algorithm, alpha, data):
+                self.stats[alpha.name][1] += 1
+                continue
+            started = timeit.default_timer()
+            emitted = alpha.Update(algorithm, data) or []
+            stats = self.stats[alpha.name]
+            stats[0] += 1
+            stats[2] += timeit.default_timer() - started
+            for insight in emitted:
+                insight.SourceModel = alpha.name
+            insights.extend(emitted)
+        return insights
+
+    def is_due(self, algorithm, alpha, data):
+        state = self.state[alpha.name]
+        due = False
+        regime = getattr(algorithm, "market_regime", None)
+        if alpha.watch_regime and regime != state["regime"]:
+            state["regime"] = regime
+            due = True
+        holdings = alpha.holdings_key(algorithm)
+        if holdings is not None and holdings != state["holdings"]:
+            state["holdings"] = holdings
+            due = True
+
+        if all(symbol in data.Bars or symbol in data.OptionChains for symbol in alpha.inputs(algorithm)):
+            today = algorithm.Time.date()
+            if alpha.cadence == "on_input":
+                due = True
+            elif alpha.cadence == "weekly":
+                week = today.isocalendar()[:2]
+                if week != state["week"]:
+                    state["week"] = week
+                    due = True
+            elif alpha.cadence == "open_close":
+                if today != state["day"] or algorithm.Time.hour >= 16:
+                    state["day"] = today
+                    due = True
+        return due
+
+    def OnSecuritiesChanged(self, algorithm, changes):
+        for alpha in self.alphas:
+            alpha.OnSecuritiesChanged(algorithm, changes)
+
+    def report(self):
+        parts = []
+        for name, (calls, skips, seconds) in self.stats.items():
+            per_call = seconds / calls * 1000 if calls else 0
+            parts.append(f"{name}: {calls} calls, {skips} skipped, {seconds:.2f}s ({per_call:.2f}ms/call)")
+        return " | ".join(parts)
+
+
+class NettingOptionPortfolioConstructionModel(PortfolioConstructionModel):
+    """
+    Portfolio construction that nets the alphas' intents into one target per symbol before execution.
+    - Each alpha keeps at most one active insight per symbol (keyed by SourceModel); a Flat insight or an
+      expired one withdraws it. Targets are only recomputed when an intent was added, withdrawn or expired.
+    - Equity/crypto insights: signed weight of the portfolio value, converted to quantity at the current price.
+    - Option insights are option legs, not underlying trades: Down means short the contract, Up long, and the
+      weight is the notional share of the portfolio (strike x multiplier per contract), so a cash-secured put
+      sized as wheel_allocation of the portfolio nets to the same contract count the alpha computed.
+    - Short calls are capped at the underlying shares held (or targeted) so a covered call never turns naked.
+    - Option intents stop counting once their contract has expired, whatever the insight period says.
+    - Intents on the same symbol from different alphas are summed, so opposite intents cancel before any order.
+    - A target is only emitted when it differs from the holding; resizing an open position (not opening or
+      closing it) also needs a change worth at least min_trade_value.
+    - check_targets logs wheel legs that did not net to what their alpha sized (a "WheelPut" intent to
+      wheel_put_quantity contracts, a short call to at most the covering shares / multiplier).
+    """
+    def __init__(self, min_trade_value=1000):
+        super().__init__()
+        self.min_trade_value = min_trade_value
+        self.intents = {}      # (source model, symbol) -> active insight
+        self.managed = set()   # symbols this model has targeted; they get a zero target once every intent is gone
+        self.netted = 0        # symbols where intents from different alphas pointed opposite ways
+        self.emitted = 0
+        self.skipped = 0
+        self.check_failures = 0
+
+    def CreateTargets(self, algorithm, insights):
+        changed = False
+        for insight in insights:
+            key = (insight.SourceModel, insight.Symbol)
+            if insight.Direction == InsightDirection.Flat:
+                self.intents.pop(key, None)
+            else:
+                self.intents[key] = insight
+            self.managed.add(insight.Symbol)
+            changed = True
+        for key in [key for key, insight in self.intents.items() if insight.IsExpired(algorithm.UtcTime)]:
+            del self.intents[key]
+            changed = True
+        if not changed:
+            return []
+        targets = self.net_targets(algorithm)
+        self.check_targets(algorithm, insights, targets)
+        return targets
+
+    def net_targets(self, algorithm):
+        total_value = algorithm.Portfolio.TotalPortfolioValue
+        quantities = defaultdict(float)
+        directions = defaultdict(set)
+        for (source, symbol), insight in self.intents.items():
+            if symbol.SecurityType == SecurityType.Option and symbol.ID.Date.date() < algorithm.Time.date():
+                continue  # expired contract: its leg is gone whatever the insight period says
+            security = algorithm.Securities[symbol]
+            sign = 1 if insight.Direction == InsightDirection.Up else -1
+            weight = insight.Weight or 0
+            if symbol.SecurityType == SecurityType.Option:
+                notional = float(symbol.ID.StrikePrice) * float(security.SymbolProperties.ContractMultiplier)
+                if notional > 0:
+                    quantities[symbol] += sign * int(weight * total_value / notional + 1e-9)
+            elif security.Price > 0:
+                quantities[symbol] += sign * weight * total_value / float(security.Price)
+            directions[symbol].add(sign)
+        self.netted += sum(1 for signs in directions.values() if len(signs) > 1)
+
+        # Covered calls: never more short calls than the shares that cover them
+        for symbol, quantity in list(quantities.items()):
+            if symbol.SecurityType == SecurityType.Option and symbol.ID.OptionRight == OptionRight.Call and quantity < 0:
+                underlying = symbol.Underlying
+                shares = quantities[underlying] if underlying in quantities else float(algorithm.Portfolio[underlying].Quantity)
+                multiplier = float(algorithm.Securities[symbol].SymbolProperties.ContractMultiplier)
+                quantities[symbol] = max(quantity, -int(max(shares, 0) // multiplier))
+
+        targets = []
+        for symbol in list(self.managed):
+            security = algorithm.Securities[symbol]
+            lot = float(security.SymbolProperties.LotSize) or 1
+            target = quantities.get(symbol, 0)
+            target = np.sign(target) * np.floor(abs(target) / lot) * lot
+            current = float(algorithm.Portfolio[symbol].Quantity)
+            if target == 0 and symbol not in quantities and current == 0:
+                self.managed.discard(symbol)
+                continue
+            if target == current:
+                continue
+            change_value = abs(target - current) * float(security.Price) * float(security.SymbolProperties.ContractMultiplier)
+            if target != 0 and current != 0 and change_value < self.min_trade_value:
+                self.skipped += 1
+                continue
+            targets.append(PortfolioTarget(symbol, float(target)))
+        self.emitted += len(targets)
+        return targets
+
+    def check_targets(self, algorithm, insights, targets):
+        quantities = {target.Symbol: target.Quantity for target in targets}
+        failures = []
+        for insight in insights:
+            if insight.Tag == "WheelPut" and insight.Symbol in quantities and -quantities[insight.Symbol] != algorithm.wheel_put_quantity:
+                failures.append(f"short put {insight.Symbol.Value} at {quantities[insight.Symbol]:.0f}, alpha sized {algorithm.wheel_put_quantity}")
+        for symbol, quantity in quantities.items():
+            if symbol.SecurityType == SecurityType.Option and symbol.ID.OptionRight == OptionRight.Call and quantity < 0:
+                underlying = symbol.Underlying
+                shares = quantities.get(underlying, float(algorithm.Portfolio[underlying].Quantity))
+                multiplier = float(algorithm.Securities[symbol].SymbolProperties.ContractMultiplier)
+                if -quantity > max(shares, 0) // multiplier:
+                    failures.append(f"short call {symbol.Value} at {quantity:.0f} with {shares:.0f} shares")
+        for failure in failures:
+            algorithm.Log(f"[PORTFOLIO] CHECK FAILED: {failure}")
+        self.check_failures += len(failures)
+
+    def report(self):
+        return (f"{self.emitted} targets, {self.skipped} below min trade value, {self.netted} opposing intents netted, "
+                f"{len(self.intents)} active intents, {self.check_failures} check failures")
+
+
+class HistoryCache:
+    """
+    History() bars kept as NumPy arrays per (symbol, resolution).
+    The first request fetches `bar_count` bars; later requests only fetch the bars after the last cached one and
+    append them. Consumers get read-only views of the last `bar_count` rows (time, open, high, low, close, volume).
+    Bars come from History[TradeBar], so no DataFrame is built unless a caller asks for one with to_dataframe().
+    """
+    FIELDS = ("open", "high", "low", "close", "volume")
+
+    def __init__(self, algorithm, max_bars=504):
+        self.algorithm = algorithm
+        self.max_bars = max_bars
+        self.store = {} # (symbol, resolution) -> dict of arrays
+        self.requests = 0
+        self.bars_fetched = 0
+        self.bars_served = 0
+
+    def get(self, symbols, bar_count, resolution):
+        """{symbol: {"time": ..., "close": ..., ...}} with up to `bar_count` rows each."""
+        return {symbol: self.get_symbol(symbol, bar_count, resolution) for symbol in symbols}
+
+    def get_symbol(self, symbol, bar_count, resolution):
+        key = (symbol, resolution)
+        cached = self.store.get(key)
+        if cached is None or len(cached["time"]) < bar_count:
+            cached = self.store[key] = self.to_arrays(self.algorithm.History[TradeBar](symbol, bar_count, resolution))
+        else:
+            last_time = cached["time"][-1]
+            tail = self.to_arrays(self.algorithm.History[TradeBar](symbol, last_time.item(), self.algorithm.Time, resolution))
+            keep = tail["time"] > last_time
+            if keep.any():
+                cached = self.store[key] = {field: np.concatenate([cached[field], tail[field][keep]])[-self.max_bars:] for field in cached}
+        self.requests += 1
+        view = {field: values[-bar_count:] for field, values in cached.items()}
+        for values in view.values():
+            values.flags.writeable = False
+        self.bars_served += len(view["time"])
+        return view
+
+    def to_arrays(self, bars):
+        rows = [(bar.EndTime, bar.Open, bar.High, bar.Low, bar.Close, bar.Volume) for bar in bars]
+        self.bars_fetched += len(rows)
+        arrays = {"time": np.array([row[0] for row in rows], dtype="datetime64[s]")}
+        for column, field in enumerate(self.FIELDS, start=1):
+            arrays[field] = np.array([float(row[column]) for row in rows], dtype=float)
+        return arrays
+
+    def to_dataframe(self, symbol, bar_count, resolution):
+        """Explicit pandas round trip for callers that need a DataFrame."""
+        view = self.get_symbol(symbol, bar_count, resolution)
+        return pd.DataFrame({field: view[field] for field in self.FIELDS}, index=pd.to_datetime(view["time"]))
+
+    def summary(self):
+        return f"{self.requests} requests, {self.bars_fetched} bars fetched, {self.bars_served} served"
+
+
+class StartupProfiler:
+    """Cold-start timings: imports, initialize() sections and deploy-to-first-bar, logged once."""
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.sections = [] # (initialize section, seconds)
+        self.last_mark = timeit.default_timer()
+        self.first_bar_seconds = None
+        self.reported = False
+
+    def mark(self, name):
+        now = timeit.default_timer()
+        self.sections.append((name, now - self.last_mark))
+        self.last_mark = now
+
+    def on_data(self):
+        if self.reported:
+            return
+        elapsed = timeit.default_timer() - MODULE_LOAD_STARTED
+        if self.first_bar_seconds is None:
+            self.first_bar_seconds = elapsed
+        if self.algorithm.IsWarmingUp:
+            return
+        self.reported = True
+        sections = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.sections)
+        hmm_import = "not loaded yet" if HMM_IMPORT_SECONDS is None else f"{HMM_IMPORT_SECONDS:.2f}s (deferred)"
+        self.algorithm.Log(f"[STARTUP] Imports {MODULE_IMPORTS_SECONDS:.2f}s (AlgorithmImports {ALGORITHM_IMPORTS_SECONDS:.2f}s), "
+                           f"hmmlearn {hmm_import} | initialize {sum(s for _, s in self.sections):.2f}s ({sections}) | "
+                           f"first slice {self.first_bar_seconds:.1f}s, first bar after warmup {elapsed:.1f}s after deploy")
 
-        return True # All checks passed
-    except Exception as e:
-        self.Log(f"[is_liquid] ERROR: {str(e)}")
-        return False
 
 RegimeAwareMultiStrategyAlgorithm.submit_spread_limit_order = submit_spread_limit_order
-RegimeAwareMultiStrategyAlgorithm.is_liquid = is_liquid
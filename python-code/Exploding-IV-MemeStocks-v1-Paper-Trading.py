@@ -1,6 +1,21 @@
 #region imports
+import timeit
+MODULE_LOAD_STARTED = timeit.default_timer()  # Start of the deploy-to-first-bar clock (see StartupProfiler)
 from AlgorithmImports import *
+ALGORITHM_IMPORTS_SECONDS = timeit.default_timer() - MODULE_LOAD_STARTED
 from collections import deque
+import bisect
+import gc
+import os
+import resource
+import sys
+import tracemalloc
+import struct
+import math
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+MODULE_IMPORTS_SECONDS = timeit.default_timer() - MODULE_LOAD_STARTED
 #endregion
 
 class MemeStocksStrategy(QCAlgorithm):
@@ -34,14 +49,52 @@ class MemeStocksStrategy(QCAlgorithm):
     - ✅ Filters for c.Right == OptionRight.Call and .Put — gets both legs.
     - ✅ Uses atm_call.ImpliedVolatility — reads IV directly from the contract object (not an indicator).
     - ✅ Stores in self.iv_cache — every tick, fresh IV is cached.
+    Developer Notes (10/19/2026):
+    - All logging now goes through `BufferedLogSink` (lazy formatting, per-tag rate limiting of diagnostic tags, duplicate counts, bounded ring buffer flushed in batches).
+    - Option chains are no longer chained to the whole universe. `StagedOptionSubscriptions` pre-screens the equities (price, dollar volume, realized-vol spike) and only subscribes chains for the shortlist on screening Mondays, 9:00-12:00.
+    - `OnSecuritiesChanged` hands changes to `SecurityLifecycleManager`, which evicts per-symbol state for removed names and keeps the active equity set current (no more rebuilding it from ActiveSecurities at screening time).
+    - Universe equities run at `Resolution.Hour` by default (like v2). `ResolutionScheduler` escalates to minute data for the screening shortlist and for holdings near their stop/take-profit (and back once the window closes or the holding is clear of its exit levels), and reports data volume and OnData wall time per policy.
+    - Screening (IV diff, call/put sentiment, ranking) runs on `ScreeningWorker`'s thread from an immutable snapshot. Orders are placed from the result on the next bar. Chain call/put volumes are now aggregated in `ReadIVFromData`.
+    - Buys and ETF rebalances go through `PortfolioTargetExecutor`: one pass computes every share quantity and the MAX_PORTFOLIO_ALLOCATION cap, nets against holdings and submits the batch (sells first). The quarterly SPY/XLU rebalance rides along with the screening batch when there is one.
+    - Memestock entries and stop/take-profit exits are worked by `SlicingExecutionEngine`: child limit orders at the NBBO (TWAP, capped at 10% of the last bar's volume), repriced every minute, swept at the end of the horizon, with implementation shortfall logged per parent order.
+    - `CapacityModel` keeps rolling dollar volume, daily vol and an intraday volume profile per universe name and caps each new position so its square-root impact estimate stays under 50 bps and it is worked within 10% of expected window volume.
+    - `UniverseIndicatorEngine` keeps daily SMA(50), ATR(14), realized vol(20) and RSI(14) for the whole universe in 2-D NumPy ring buffers, one vectorized update per day, rows added/freed as the universe churns. The 50-day MA trend filter from the analysis is available behind TREND_FILTER_ENABLED.
+    - `CorrelationTracker` keeps an exponentially weighted covariance of hourly returns (universe + XLU vs SPY) with rank-1 updates. Average pairwise correlation and portfolio beta are cached reads; new positions are halved while average correlation is above 0.8 (analysis Priority 1).
+    - `PortfolioRiskEngine` keeps positions, cost basis and prices in arrays updated from fills. One vectorized pass per bar evaluates the daily loss limit (kill switch), the monthly loss limit (halve new positions), 3 consecutive losing trades (halt new entries) and the per-position caps (1% account loss per trade, 5% of portfolio per memestock) from the analysis.
+    - Live sessions checkpoint all strategy state to the ObjectStore (`StrategyCheckpoint`) every 30 minutes and on shutdown. A restart restores it and skips the 7-day warmup.
+    - `OptionCoverageMonitor` records, per shortlisted underlying and session minute, whether its chain arrived, its contract count and whether the ATM IV was usable, plus the minutes from the open to the first valid IV. The daily summary carries a coverage heatmap and the names that never produced an IV (also listed when the 20-IV gate fails).
+    - Opt-in `MemoryBudgetGuard` (MEMORY_GUARD_ENABLED): every 15 minutes samples RSS and the size of the long-lived caches, takes a tracemalloc top-N grouped by component every hour, and sheds stale IV/chain/trade-date entries and the log buffer once RSS nears MEMORY_BUDGET_MB.
+    - `StartupProfiler` times the module imports, each Initialize section and deploy-to-first-bar (first slice and first bar after warmup), logs them once and keeps a history of live restarts in the ObjectStore. The ETF exclusion set used by the exit checks is built once in Initialize.
     """
 
     def Initialize(self):
         """Initialize the algorithm."""
+        # Import / Initialize / first-bar timings, reported once the first tradable bar arrives
+        self.startup_profiler = StartupProfiler(self, key="memestocks/startup.csv")
         self.SetStartDate(2025, 11, 1)
         self.SetEndDate(2025, 12, 1)
         self.SetCash(100000)
-        self.SetWarmup(timedelta(days=7))
+        # Warmup (7 days) is set at the end of Initialize, unless a live checkpoint was restored.
+
+        # === Logging ===
+        # Bounded, rate-limited log sink. Messages are templates that only get formatted when flushed.
+        # Set file_path to also write the batches to a local file when running LEAN locally.
+        self.log_sink = BufferedLogSink(self, level=BufferedLogSink.INFO, capacity=500, batch_size=50,
+                                        rate_per_minute=2, burst=3, file_path=None)
+
+        # === Screening Worker ===
+        # Ranks screening candidates off the data thread. Backtests wait for the result on the next bar to stay deterministic.
+        self.screening_worker = ScreeningWorker(self)
+
+        # === Order Batching ===
+        # Turns the screening candidates plus ETF targets into one netted batch of orders
+        self.portfolio_executor = PortfolioTargetExecutor(self)
+
+        # === Universe Indicators ===
+        # Daily SMA/ATR/realized vol/RSI for every universe equity, held in NumPy arrays instead of one indicator object per symbol
+        self.indicator_engine = UniverseIndicatorEngine(self, sma_period=50, atr_period=14, vol_period=20, rsi_period=14)
+        self.pending_etf_targets = {} # Quarterly SPY/XLU targets waiting to go out (with the next screening batch if one is running)
+        self.startup_profiler.Mark("components")
 
         # Set commission for IB but comment it out as not ready for live money trading yet
         # self.SetBrokerageModel(BrokerageName.InteractiveBrokers, AccountType.Margin)
@@ -58,6 +111,27 @@ class MemeStocksStrategy(QCAlgorithm):
         self.XLU_ALLOCATION = 0.20
         self.MAX_PORTFOLIO_ALLOCATION = 1.6 # Max 85% of portfolio in stocks but my PM always under 40%
         self.VIX_THRESHOLD = 20.50 # VIX level to define a BEAR market regime
+        self.OPTION_SHORTLIST_SIZE = 24 # Underlyings whose chains are streamed for a screening (gate needs 20 IVs)
+        self.OPTION_SUBSCRIBE_TIME = (9, 0)  # Chains are added ahead of the 10:05 screening...
+        self.OPTION_RELEASE_TIME = (12, 0)   # ...and dropped once the screening has run (at the close at the latest)
+        self.DEFAULT_RESOLUTION = Resolution.Hour      # Universe equities outside the escalation windows
+        self.ESCALATED_RESOLUTION = Resolution.Minute  # Screening window chains/shortlist and holdings near an exit
+        self.EXIT_ESCALATION_BAND = 0.05 # Escalate a holding once it is within 5% of its stop loss or take profit
+        self.ENTRY_SLICE_MINUTES = 15    # Entries are worked over 15 minutes...
+        self.EXIT_SLICE_MINUTES = 5      # ...exits over 5, then whatever is left is swept with a market order
+        self.PARTICIPATION_RATE = 0.10   # Child orders never exceed 10% of the last bar's volume
+        self.MAX_IMPACT_BPS = 50         # Positions are scaled down until estimated market impact is under 50 bps
+        self.MAX_ADV_FRACTION = 0.01     # ...and never exceed 1% of 20-day average dollar volume
+        self.TREND_FILTER_ENABLED = False # Skip screening candidates trading below their 50-day MA (analysis Priority 1)
+        self.CORRELATION_LIMIT = 0.80     # Average pairwise universe correlation above this...
+        self.CORRELATION_EXPOSURE_SCALE = 0.5 # ...scales new position size by this (analysis Priority 1)
+        self.MEMORY_GUARD_ENABLED = False # Sample RSS / allocations every 15 minutes and shed caches near the budget
+        self.MEMORY_BUDGET_MB = 1024      # Node memory available to the algorithm
+
+        # === Execution ===
+        # Built after the parameters above, which size the child orders and cap new positions
+        self.execution_engine = SlicingExecutionEngine(self, participation_rate=self.PARTICIPATION_RATE)
+        self.capacity_model = CapacityModel(self, max_impact_bps=self.MAX_IMPACT_BPS, max_adv_fraction=self.MAX_ADV_FRACTION)
         
         
         # === Internal State ===
@@ -66,7 +140,9 @@ class MemeStocksStrategy(QCAlgorithm):
         self.trade_dates = {}
         self.previous_iv = {}  # To store the previous screening's IV for comparison
         self.iv_cache = {}     # To store the latest implied volatility for each underlying
+        self.chain_volumes = {} # Latest (call volume, put volume) of each underlying's chain, for the sentiment filter
         self.last_screening_date = None
+        self.chains_screened_date = None # Day the screening gate last passed, i.e. the window's IVs were used
         self.last_trade_execution_date = None # Track actual trade execution for 14-day cadence
         self.screening_frequency_days = 14  # Every 2 weeks (change to 21 for 3 weeks)
         self.initial_screen_done = False # One-shot screening flag
@@ -78,25 +154,53 @@ class MemeStocksStrategy(QCAlgorithm):
         self.portfolio_value_at_start_of_day = 0
         self.last_loss_limit_date = None
 
+        # === Risk Limits (Analysis-and-comments, Priority 1) ===
+        self.MONTHLY_LOSS_LIMIT = -0.05       # -5% month to date halves new position size for the rest of the month
+        self.MAX_CONSECUTIVE_LOSSES = 3       # Losing round trips in a row before new entries halt (resets monthly)
+        self.MAX_TRADE_LOSS = 0.01            # Exit a position once it has lost 1% of the account
+        self.MAX_POSITION_PERCENT = 0.05      # Trim any single memestock above 5% of the portfolio
+
+        self.startup_profiler.Mark("parameters")
+
         # Set universe settings
         self.UniverseSettings.Asynchronous = True
-        self.UniverseSettings.Resolution = Resolution.Minute
+        self.UniverseSettings.Resolution = self.DEFAULT_RESOLUTION
         # Set data normalization to RAW. CRITICAL for options - without this, Greeks and IV won't calculate correctly.
         self.UniverseSettings.DataNormalizationMode = DataNormalizationMode.Raw
 
+        # Decides when data is escalated from DEFAULT_RESOLUTION to ESCALATED_RESOLUTION and tracks what each policy costs
+        self.resolution_scheduler = ResolutionScheduler(self, self.DEFAULT_RESOLUTION, self.ESCALATED_RESOLUTION,
+                                                        exit_band=self.EXIT_ESCALATION_BAND)
+
         # Add the universe selection function. The timing of the screening is handled by a scheduled event.
         # This will select our base equities.
         universe = self.AddUniverse(self.UniverseSelectionFunction)
 
-        # Chain an options universe to the equity universe, filtering for front-month contracts +/- 3 strikes
-        self.AddUniverseOptions(universe, self.OptionFilterFunction)
-        # The iv_cache will store the latest implied volatility for each symbol, populated from OptionChains.
+        # Option chains are NOT chained to the whole universe (that streamed 30 minute-resolution chains all day, every day).
+        # The stager pre-screens the equities and only subscribes chains (front-month +/- 3 strikes) for the shortlist
+        # around the screening window. The iv_cache is still populated from OptionChains while they stream.
+        self.option_stager = StagedOptionSubscriptions(self, shortlist_size=self.OPTION_SHORTLIST_SIZE,
+                                                       resolution=self.ESCALATED_RESOLUTION)
+        # Per-minute chain arrival / contract count / ATM IV bitmaps, for the "IV data not received" investigation
+        self.coverage_monitor = OptionCoverageMonitor(self, bucket_minutes=30)
         
         # Add VIX data to use as a market regime filter
         # TEMPLATE NOTE: VIX must be added as an Index, not an Equity, to ensure data is loaded correctly.
         self.vix = self.AddIndex("VIX", Resolution.Daily).Symbol
         self.spy = self.AddEquity("SPY", Resolution.Hour).Symbol
         self.xlu = self.AddEquity("XLU", Resolution.Hour).Symbol
+
+        # Streaming universe-vs-SPY betas and pairwise correlations (SPY is the benchmark row)
+        self.correlation_tracker = CorrelationTracker(self, self.spy, halflife_bars=70)
+        self.correlation_tracker.Add([self.xlu])
+
+        # Positions/exposure/P&L arrays and the loss-limit rules, evaluated in one pass per bar
+        self.risk_engine = PortfolioRiskEngine(self, daily_loss_limit=self.daily_loss_limit, monthly_loss_limit=self.MONTHLY_LOSS_LIMIT,
+                                               max_consecutive_losses=self.MAX_CONSECUTIVE_LOSSES, max_trade_loss=self.MAX_TRADE_LOSS,
+                                               max_position_percent=self.MAX_POSITION_PERCENT, uncapped=[self.spy, self.xlu])
+
+        # Tracks the tradable universe equities and evicts per-symbol state when names leave it
+        self.lifecycle = SecurityLifecycleManager(self, excluded=[self.spy, self.xlu, self.vix])
         
        # === Slippage Tracking ===
         self.daily_slippage_dollars = 0.0  # Total $ slippage today
@@ -109,12 +213,45 @@ class MemeStocksStrategy(QCAlgorithm):
         # === DEBUGGING ===
         self.last_diagnostic_time = None
 
+        # ETFs skipped by the memestock exit checks, built once instead of on every bar
+        self.etf_symbols = frozenset([self.spy, self.xlu])
+        self.startup_profiler.Mark("universe and securities")
+
         # === SCHEDULED EVENTS ===
         # Schedule the main screening and trading logic to run once per week.
         # This is the correct way to align data access for multiple securities.
         self.Schedule.On(self.DateRules.Every(DayOfWeek.Monday), 
                          self.TimeRules.At(10, 5), 
                          self.PerformWeeklyScreening)
+        self.Schedule.On(self.DateRules.Every(DayOfWeek.Monday),
+                         self.TimeRules.At(*self.OPTION_SUBSCRIBE_TIME),
+                         self.SubscribeScreeningChains)
+        self.Schedule.On(self.DateRules.Every(DayOfWeek.Monday),
+                         self.TimeRules.At(*self.OPTION_RELEASE_TIME),
+                         self.ReleaseScreeningChains)
+        self.Schedule.On(self.DateRules.EveryDay(),
+                         self.TimeRules.BeforeMarketClose(self.spy, 5),
+                         lambda: self.ReleaseScreeningChains(end_of_day=True))
+        self.Schedule.On(self.DateRules.EveryDay(),
+                         self.TimeRules.Every(timedelta(minutes=30)),
+                         self.SaveCheckpoint)
+
+        self.startup_profiler.Mark("schedules")
+
+        # === Memory Guard ===
+        self.memory_guard = MemoryBudgetGuard(self, enabled=self.MEMORY_GUARD_ENABLED, budget_mb=self.MEMORY_BUDGET_MB)
+        if self.MEMORY_GUARD_ENABLED:
+            self.Schedule.On(self.DateRules.EveryDay(),
+                             self.TimeRules.Every(timedelta(minutes=15)),
+                             self.memory_guard.Sample)
+
+        # === Checkpoint Restore ===
+        # A live restart restores the strategy state instead of replaying a week of minute option data.
+        # Backtests never read or write the checkpoint so runs stay independent of each other.
+        self.checkpoint = StrategyCheckpoint(self, key="memestocks/checkpoint.bin", max_age_days=3)
+        if not (self.LiveMode and self.checkpoint.Restore()):
+            self.SetWarmup(timedelta(days=7))
+        self.startup_profiler.Mark("checkpoint")
 
     def OptionFilterFunction(self, option_filter_universe: OptionFilterUniverse) -> OptionFilterUniverse:
         """Option filter for selecting desired option contracts."""
@@ -131,17 +268,33 @@ class MemeStocksStrategy(QCAlgorithm):
                     if self.MIN_STOCK_PRICE < c.Price < self.MAX_STOCK_PRICE 
                     and c.DollarVolume > 6700000]
         
-        top_30 = sorted(filtered, key=lambda c: c.DollarVolume, reverse=True)[:30]
+        ranked = sorted(filtered, key=lambda c: c.DollarVolume, reverse=True)
+        # Feed the option pre-screen's realized-vol history from the same coarse data
+        self.option_stager.UpdateCoarse(ranked)
+        # ...and the capacity model's rolling dollar volume / daily vol
+        self.capacity_model.UpdateCoarse(ranked)
+
+        top_30 = ranked[:30]
+        selected = [c.Symbol for c in top_30]
+        # Lingering minute subscriptions are only removed once the universe stops selecting the name
+        self.resolution_scheduler.OnSelection(selected)
         
-        return [c.Symbol for c in top_30]
+        return selected
 
     def OnSecuritiesChanged(self, changes: SecurityChanges):
         """
         Handles security changes in the algorithm.
         """
-        pass
+        self.lifecycle.OnSecuritiesChanged(changes)
 
     def OnData(self, data):
+        """Time every slice so the resolution scheduler can report what each data policy costs."""
+        started = timeit.default_timer()
+        self.startup_profiler.OnData()
+        self.ProcessData(data)
+        self.resolution_scheduler.Record(data, timeit.default_timer() - started)
+
+    def ProcessData(self, data):
         """Main trading logic - executed on data events."""
         # TEMPLATE NOTE: The main logic is called from OnData, not a scheduled event.
         # This is CRITICAL because it provides the 'data' slice, which is the only
@@ -151,20 +304,38 @@ class MemeStocksStrategy(QCAlgorithm):
 
         # === Initial Rebalancing (after warmup) ===
         if self.last_rebalance_date is None:
-            self.Log("Warmup finished. Performing initial ETF rebalancing.")
-            self.SetHoldings(self.spy, self.SPY_ALLOCATION)
-            self.SetHoldings(self.xlu, self.XLU_ALLOCATION)
+            self.log_sink.Info("REBALANCE", "Warmup finished. Performing initial ETF rebalancing.")
+            self.portfolio_executor.Execute(etf_targets={self.spy: self.SPY_ALLOCATION, self.xlu: self.XLU_ALLOCATION})
             self.last_rebalance_date = self.Time.date()
 
         # Read fresh IV every tick
         self.ReadIVFromData(data)
+
+        # Intraday volume profile for the capacity model, daily bar aggregation for the indicator engine
+        self.capacity_model.UpdateBars(data)
+        self.indicator_engine.OnBars(data.Bars)
+        self.correlation_tracker.OnData(data)
+
+        # Work the sliced parent orders (new child, reprice, or end-of-horizon sweep)
+        self.execution_engine.OnData(data)
         
+        # Place orders for a screening that finished on the worker since the last bar
+        self.ApplyScreeningResult()
+
+        # The initial screening needs a chain window of its own: open one on the first trading morning instead of
+        # waiting for Monday's (retried every morning until the initial screening has run)
+        if (not self.initial_screen_done
+            and not self.IsWarmingUp
+            and not self.resolution_scheduler.window_open
+            and (self.Time.hour, self.Time.minute) < self.OPTION_RELEASE_TIME):
+            self.SubscribeScreeningChains()
+
         # One-shot initial screening as soon as IV is ready
         if (not self.initial_screen_done 
             and not self.IsWarmingUp 
             and len(self.iv_cache) >= 20):
             
-            self.Log(f"[INITIAL_SCREEN] First IV cache ready with {len(self.iv_cache)} stocks. Running initial screening now.")
+            self.log_sink.Info("INITIAL_SCREEN", "First IV cache ready with {} stocks. Running initial screening now.", len(self.iv_cache))
             # Set last_screening_date so WeeklyScreeningAndTrading passes its first check
             self.last_screening_date = self.Time.date()
             self.WeeklyScreeningAndTrading(data)
@@ -172,12 +343,17 @@ class MemeStocksStrategy(QCAlgorithm):
         
         self.WeeklyScreeningAndTrading(data)
 
+        # Quarterly ETF rebalance that is not riding along with a screening batch goes out on its own
+        if self.pending_etf_targets and not self.screening_worker.IsBusy():
+            self.portfolio_executor.Execute(etf_targets=self.pending_etf_targets)
+            self.pending_etf_targets = {}
+
         # === DAILY SUMMARY LOG (triggered ~30 min after market close) ===
         # Market closes at 4 PM EST. This runs on first data after 4:30 PM.
         if self.Time.hour == 16 and self.Time.minute >= 30 and self.last_email_date != self.Time.date():
             portfolio_value = self.Portfolio.TotalPortfolioValue
             unrealized_pnl = self.Portfolio.TotalUnrealizedProfit
-            invested_count = len([h for h in self.Portfolio.Values if h.Invested])
+            invested_count = self.risk_engine.invested_count
 
             # Calculate daily P&L
             daily_pnl_pct = None
@@ -201,10 +377,19 @@ class MemeStocksStrategy(QCAlgorithm):
             Cash: ${self.Portfolio.Cash:,.2f}
             Trades: {self.daily_trades_count} | Slippage: ${self.daily_slippage_dollars:.2f} | Avg: ${avg_slippage_per_trade:.2f}
             Market Regime: {self.market_regime}
+            Execution: {self.execution_engine.Summary()}
+            Beta: {self.correlation_tracker.PortfolioBeta():.2f} | Avg Correlation: {self.correlation_tracker.AverageCorrelation(self.lifecycle.active_symbols):.2f}
             ====================
             """
-            # Log the summary to the console
-            self.Log(summary_message)
+            # Log the summary and push everything buffered today out with it
+            self.log_sink.Info("SUMMARY", "{}", summary_message)
+            self.log_sink.Info("DATA_COST", "{}", self.resolution_scheduler.Report())
+            if self.memory_guard.enabled:
+                self.log_sink.Info("MEMORY", "{}", self.memory_guard.Report())
+            coverage_report = self.coverage_monitor.Report()
+            if coverage_report:
+                self.log_sink.Info("COVERAGE", "{}", coverage_report)
+            self.log_sink.Flush()
             
             # Send the email notification
             # IMPORTANT: Replace with your actual email address
@@ -212,31 +397,65 @@ class MemeStocksStrategy(QCAlgorithm):
 
             self.last_email_date = self.Time.date()
 
-        # Initialize start-of-day portfolio value on the first run
-        if self.portfolio_value_at_start_of_day == 0:
-            self.portfolio_value_at_start_of_day = self.Portfolio.TotalPortfolioValue
-
-        # Reset daily anchor at the start of a new trading day
-        if self.last_loss_limit_date is None or self.Time.date() > self.last_loss_limit_date:
-            self.portfolio_value_at_start_of_day = self.Portfolio.TotalPortfolioValue
-            self.last_loss_limit_date = self.Time.date()
-
-        # === Daily Loss Limit Check ===
-        if self.portfolio_value_at_start_of_day > 0:
-            daily_pnl_pct = (
-                self.Portfolio.TotalPortfolioValue - self.portfolio_value_at_start_of_day
-            ) / self.portfolio_value_at_start_of_day
-
-            if daily_pnl_pct < self.daily_loss_limit:
-                self.Log(f"EMERGENCY EXIT: Daily loss {daily_pnl_pct:.2%} < limit {self.daily_loss_limit:.2%}. Liquidating and pausing.")
-                self.Liquidate()
-                # Halt further trading for the day by setting a high VIX regime
-                self.market_regime = 'BEAR' 
-                return
+        # === Risk Checks ===
+        # Daily anchor, daily/monthly loss limits, consecutive losses and per-position caps in one pass
+        risk = self.risk_engine.Evaluate()
+        if risk.kill:
+            self.log_sink.Error("EMERGENCY_EXIT", "Daily loss {:.2%} < limit {:.2%}. Liquidating and pausing.", risk.daily_pnl, self.daily_loss_limit)
+            self.execution_engine.CancelAll()
+            self.Liquidate()
+            # Halt further trading for the day by setting a high VIX regime (checkpointed once, when it trips)
+            if self.market_regime != 'BEAR':
+                self.market_regime = 'BEAR'
+                self.SaveCheckpoint()
+            return
+
+        for symbol, quantity, reason in risk.orders:
+            if self.execution_engine.IsExiting(symbol):
+                continue
+            if reason == "PositionCap" and self.execution_engine.CapEntry(symbol, self.Portfolio[symbol].Quantity + quantity):
+                # Shrink the entry that is still being worked rather than cancel it for a trim
+                continue
+            self.log_sink.Warn("RISK", "{} {}: trading {} shares.", reason, symbol.Value, quantity)
+            self.execution_engine.Submit(symbol, quantity, self.EXIT_SLICE_MINUTES, tag=reason, exit=True)
+            if reason == "MaxTradeLoss" and symbol in self.trade_dates: del self.trade_dates[symbol]
         
         # Manage existing positions with the current data slice
         self.ManagePositions(data)
 
+    def SubscribeScreeningChains(self):
+        """Scheduled function to stream option chains for the pre-screened shortlist ahead of a due screening."""
+        if self.last_trade_execution_date is not None and (self.Time.date() - self.last_trade_execution_date).days < self.screening_frequency_days:
+            return
+        equities = list(self.lifecycle.active_symbols)
+        shortlist = self.option_stager.Shortlist(equities)
+        self.chain_volumes.clear()  # The sentiment filter only uses volumes read in this window
+        self.resolution_scheduler.OpenWindow(shortlist)
+        self.option_stager.Subscribe(shortlist)
+        self.coverage_monitor.Expect(shortlist)
+        self.log_sink.Info("CHAINS", "Subscribed option chains for {} of {} universe equities.", len(shortlist), len(equities))
+
+    def ReleaseScreeningChains(self, end_of_day=False):
+        """
+        Scheduled function to drop the screening chains once the window is over. The midday release waits while the
+        window's screening has not passed its IV gate yet, so a slow chain fill does not lose the week's screening;
+        the end-of-day release always runs.
+        """
+        if not self.resolution_scheduler.window_open:
+            if end_of_day:
+                return  # No window today
+        elif not end_of_day and self.chains_screened_date != self.Time.date():
+            self.log_sink.Info("CHAINS", "Screening has not run yet ({} IVs). Keeping the chains until the close.", len(self.iv_cache))
+            return
+        released = self.option_stager.Release()
+        self.resolution_scheduler.CloseWindow()
+        # IVs are only valid for the window they were read in: the next screening (and the 20-IV gate) starts empty
+        # instead of ranking week-old values for names that may no longer be on the shortlist. Same for the call/put volumes.
+        self.iv_cache.clear()
+        self.chain_volumes.clear()
+        if released:
+            self.log_sink.Info("CHAINS", "Released {} option chains.", released)
+
     def PerformWeeklyScreening(self):
         """
         Scheduled event that simply sets the screening date.
@@ -248,22 +467,26 @@ class MemeStocksStrategy(QCAlgorithm):
         # === Check if enough days have passed since last screening ===
         if self.last_screening_date != self.Time.date():
             return # Only run on the day the scheduled event fires
+
+        if self.screening_worker.IsBusy():
+            return # A screening is already being ranked, its orders go out on the next bar
         
         # === NEW GATE: Ensure we have IV data ready ===
         if not self.iv_cache or len(self.iv_cache) == 0:
-            self.Log("[GATE] IV cache is empty. Skipping screening.")
+            self.log_sink.Info("GATE", "IV cache is empty. Skipping screening.")
             return
 
         if len(self.iv_cache) < 20:
-            self.Log(f"[GATE] Not enough IV data yet. Have {len(self.iv_cache)}, need 20. Skipping screening.")
+            self.log_sink.Info("GATE", "Not enough IV data yet. Have {}, need 20. Skipping screening. No valid IV yet: {}",
+                               len(self.iv_cache), self.coverage_monitor.StarvedNames)
             return
 
-        self.Log(f"[GATE_PASSED] IV cache ready with {len(self.iv_cache)} stocks. Proceeding with screening.")
+        self.log_sink.Info("GATE_PASSED", "IV cache ready with {} stocks. Proceeding with screening.", len(self.iv_cache))
+        self.chains_screened_date = self.Time.date()
         
         if (self.Time.date() - self.last_rebalance_date).days >= self.rebalance_frequency_days:
-            self.Log(f"Quarterly Rebalancing: Setting SPY to {self.SPY_ALLOCATION:.0%}, XLU to {self.XLU_ALLOCATION:.0%}")
-            self.SetHoldings(self.spy, self.SPY_ALLOCATION)
-            self.SetHoldings(self.xlu, self.XLU_ALLOCATION)
+            self.log_sink.Info("REBALANCE", "Quarterly Rebalancing: Setting SPY to {:.0%}, XLU to {:.0%}", self.SPY_ALLOCATION, self.XLU_ALLOCATION)
+            self.pending_etf_targets = {self.spy: self.SPY_ALLOCATION, self.xlu: self.XLU_ALLOCATION}
             self.last_rebalance_date = self.Time.date()
             
         # === Frequency Check (14 Days) ===
@@ -281,87 +504,66 @@ class MemeStocksStrategy(QCAlgorithm):
             else:
                 self.market_regime = 'BULL'
             
-            self.Log(f"VIX={vix_price:.2f} | Regime: {self.market_regime}")
+            self.log_sink.Info("REGIME", "VIX={:.2f} | Regime: {}", vix_price, self.market_regime)
         else:
             # Use last known regime if VIX unavailable (don't skip screening!)
-            self.Log(f"VIX unavailable, using last known regime: {self.market_regime}")
+            self.log_sink.Info("REGIME", "VIX unavailable, using last known regime: {}", self.market_regime)
         
         if self.market_regime == 'BEAR':
-            self.Log(f"Market regime is BEAR. Pausing new trades.")
+            self.log_sink.Info("REGIME", "Market regime is BEAR. Pausing new trades.")
             return  # Don't screen in bear market
         
         # --- Screening Logic using IV Cache ---
-        # Use a copy of the cache to avoid issues if the cache is modified during screening
-        current_iv_data = self.iv_cache.copy()
-
-        # Ensure we only consider symbols that are currently in our universe
-        # This cleans up any stale IV data for symbols that might have left the universe
-        active_equity_symbols = {s.Symbol for s in self.ActiveSecurities.Values if s.Type == SecurityType.Equity and s.Symbol not in [self.spy, self.xlu]}
-        current_iv_data = {s: iv for s, iv in current_iv_data.items() if s in active_equity_symbols}
+        # The ranking runs on the screening worker thread from an immutable snapshot, so this bar (and the
+        # stop-loss handling on the bars after it) is not held up. ApplyScreeningResult places the orders.
+        # The lifecycle manager evicts IV data as soon as a symbol leaves the universe. This filter only guards
+        # against entries restored from a checkpoint for names that left while the algorithm was down.
+        active_equity_symbols = self.lifecycle.active_symbols
+        current_iv_data = {s: iv for s, iv in self.iv_cache.items() if s in active_equity_symbols}
+        if self.TREND_FILTER_ENABLED:
+            current_iv_data = {s: iv for s, iv in current_iv_data.items() if self.indicator_engine.AboveTrend(s)}
+        self.screening_worker.Submit(ScreeningSnapshot(
+            current_iv=current_iv_data,
+            previous_iv=dict(self.previous_iv),
+            chain_volumes={s: self.chain_volumes[s] for s in current_iv_data if s in self.chain_volumes},
+            min_call_put_ratio=1.10,
+            top_n=15))
 
-        # Determine the pool of candidates for trading
-        candidate_pool = {}
-        is_initial_run = not self.previous_iv
-
-        if is_initial_run:
-            # On the first run, we use the absolute IV values
-            candidate_pool = current_iv_data
-        else:
-            # On subsequent runs, calculate the increase in IV
-            iv_increase_data = {}
-            for symbol, current_iv in current_iv_data.items():
-                if symbol in self.previous_iv:
-                    previous_iv = self.previous_iv[symbol]
-                    # Only consider stocks where IV has actually increased
-                    iv_increase = current_iv - previous_iv
-                    if iv_increase > 0:
-                        iv_increase_data[symbol] = iv_increase
-            
-            candidate_pool = iv_increase_data
-
-        # --- Sentiment Analysis ---
-        # We still use the call/put ratio as a secondary filter
-        bullish_sentiment_pool = {}
-        for symbol, value in candidate_pool.items():
-            # Ensure the option chain exists and has contracts to avoid errors
-            if not data.OptionChains.ContainsKey(symbol) or len(data.OptionChains[symbol]) == 0:
-                continue
-
-            chain = data.OptionChains[symbol]
-            contracts = chain.Contracts.values()
-            
-            total_call_volume = sum(c.Volume for c in contracts if c.Right == OptionRight.Call)
-            total_put_volume = sum(c.Volume for c in contracts if c.Right == OptionRight.Put)
-
-            call_put_ratio = float('inf') if total_put_volume == 0 and total_call_volume > 0 else (total_call_volume / total_put_volume if total_put_volume > 0 else 0)
-
-            if call_put_ratio >= 1.10:
-                # The 'value' is either the absolute IV (first run) or the IV increase (subsequent runs)
-                bullish_sentiment_pool[symbol] = value
+    def ApplyScreeningResult(self):
+        """Place the orders for a finished screening. Called on the bars after WeeklyScreeningAndTrading submitted it."""
+        result = self.screening_worker.Poll()
+        if result is None:
+            return
 
-        if not bullish_sentiment_pool:
-            self.Log("No candidates passed all filters. Skipping this screening cycle.")
+        if not result.ranked:
+            self.log_sink.Info("SCREEN", "No candidates passed all filters. Skipping this screening cycle.")
             return
 
-        # Rank candidates by their value (either absolute IV or IV increase)
-        top_sorted = sorted(bullish_sentiment_pool.items(), key=lambda item: item[1], reverse=True)
+        if self.risk_engine.HaltNewEntries():
+            self.log_sink.Warn("RISK", "{} consecutive losing trades. New entries halted until next month.", self.risk_engine.consecutive_losses)
+            return
 
-        # Select the top 15 symbols to trade
-        top_15_symbols = [symbol for symbol, _ in top_sorted[:15]]
+        # Reduce exposure after a monthly loss limit breach, and while the universe moves as one block
+        position_allocation = self.POSITION_ALLOCATION * self.risk_engine.ReductionScale()
+        average_correlation = self.correlation_tracker.AverageCorrelation(self.lifecycle.active_symbols)
+        if average_correlation > self.CORRELATION_LIMIT:
+            position_allocation *= self.CORRELATION_EXPOSURE_SCALE
+            self.log_sink.Info("CORRELATION", "Average correlation {:.2f} > {:.2f}. New positions sized at {:.2%}.",
+                               average_correlation, self.CORRELATION_LIMIT, position_allocation)
 
-        for symbol in top_15_symbols:
-            current_stock_allocation = self.Portfolio.TotalHoldingsValue / self.Portfolio.TotalPortfolioValue
-            if current_stock_allocation + self.POSITION_ALLOCATION > self.MAX_PORTFOLIO_ALLOCATION:
-                break
-            if self.Portfolio[symbol].Invested:
-                continue
-            self.Log(f"[BUY] {symbol.Value}: Current allocation {current_stock_allocation:.2%}. Adding new {self.POSITION_ALLOCATION:.0%} position.")
-            self.SetHoldings(symbol, self.POSITION_ALLOCATION)
+        # One batch: pending ETF rebalance plus the ranked candidates, capped at MAX_PORTFOLIO_ALLOCATION
+        added = self.portfolio_executor.Execute(candidates=result.ranked, weight=position_allocation,
+                                                max_allocation=self.MAX_PORTFOLIO_ALLOCATION,
+                                                etf_targets=self.pending_etf_targets)
+        self.pending_etf_targets = {}
+        for symbol, current_stock_allocation, weight in added:
+            self.log_sink.Info("BUY", "{}: Current allocation {:.2%}. Adding new {:.2%} position.", symbol.Value, current_stock_allocation, weight)
             self.trade_dates[symbol] = self.Time.date()
         
         # Save the current IV data to be used as 'previous' in the next screening cycle
-        self.previous_iv = current_iv_data
+        self.previous_iv = result.current_iv
         self.last_trade_execution_date = self.Time.date()
+        self.SaveCheckpoint()
                 
     def ReadIVFromData(self, data):
         """Extract IV directly from data.OptionChains every tick"""
@@ -373,14 +575,20 @@ class MemeStocksStrategy(QCAlgorithm):
             equity_symbol = chain.Symbol.Underlying
             
             # Skip if not in our active universe or is an ETF/Index we exclude
-            if equity_symbol not in self.ActiveSecurities or equity_symbol in [self.spy, self.xlu, self.vix]:
+            if equity_symbol not in self.lifecycle.active_symbols:
                 continue
             
             if len(chain) == 0:
+                self.coverage_monitor.OnChain(equity_symbol, 0, False)
                 continue
             
             # Get all contracts
             contracts = list(chain)
+
+            # Keep the call/put volume aggregate for the screening snapshot (sentiment filter)
+            total_call_volume = sum(c.Volume for c in contracts if c.Right == OptionRight.Call)
+            total_put_volume = sum(c.Volume for c in contracts if c.Right == OptionRight.Put)
+            self.chain_volumes[equity_symbol] = (total_call_volume, total_put_volume)
             
             # Filter for front-month
             front_month = min(c.Expiry for c in contracts)
@@ -397,12 +605,15 @@ class MemeStocksStrategy(QCAlgorithm):
             atm_put = min([c for c in front_contracts if c.Right == OptionRight.Put], 
                           key=lambda c: abs(c.Strike - spot), default=None)
             
+            iv_valid = False
             if atm_call and atm_put:
                 # Extract IV directly from the contract object (no indicator needed!)
                 iv_value = atm_call.ImpliedVolatility
                 
                 if iv_value and iv_value > 0:
                     self.iv_cache[equity_symbol] = iv_value
+                    iv_valid = True
+            self.coverage_monitor.OnChain(equity_symbol, len(contracts), iv_valid)
 
 
     def ManagePositions(self, data):
@@ -413,24 +624,31 @@ class MemeStocksStrategy(QCAlgorithm):
     
         # Timeout protection - timezone safe
         for order_ticket in self.Transactions.GetOpenOrderTickets():
+            # Sliced child orders are repriced and swept by the execution engine, not timed out here
+            if self.execution_engine.Owns(order_ticket.OrderId):
+                continue
             try:
                 # Safe subtraction using datetime utilities
                 time_open = (self.Time - order_ticket.Time).total_seconds()
                 if time_open > 125:
-                    self.Log(f"⚠️ Order timeout {order_ticket.Symbol} (ID:{order_ticket.OrderId}). Canceling.")
+                    self.log_sink.Warn("ORDER_TIMEOUT", "⚠️ Order timeout {} (ID:{}). Canceling.", order_ticket.Symbol, order_ticket.OrderId)
                     order_ticket.Cancel()
             except TypeError as e:
                 # Skip if timezone issue (rare but safe)
-                self.Log(f"⚠️ Skipping timeout check for order {order_ticket.OrderId}: {str(e)[:50]}")
+                self.log_sink.Warn("ORDER_TIMEOUT", "⚠️ Skipping timeout check for order {}: {}", order_ticket.OrderId, str(e)[:50])
                 continue
 
+        # Exits that completed no longer need minute data
+        self.resolution_scheduler.ReleaseClosed()
+
         for holding in self.Portfolio.Values:
             
-            if not holding.Invested or holding.Type != SecurityType.Equity or holding.Symbol in [self.spy, self.xlu]:
+            if not holding.Invested or holding.Type != SecurityType.Equity or holding.Symbol in self.etf_symbols:
                 continue
 
             symbol = holding.Symbol
             unrealized_profit_percent = holding.UnrealizedProfitPercent
+            self.resolution_scheduler.CheckExitBand(symbol, unrealized_profit_percent)
             '''
             # 3. IV Stop Loss: Exit if the reason for entry (high IV) is gone
             # To re-enable this, you would use self.iv_cache[symbol] to get the latest IV
@@ -441,20 +659,30 @@ class MemeStocksStrategy(QCAlgorithm):
                 if symbol in self.trade_dates: del self.trade_dates[symbol]
                 continue # Move to next holding
             '''        
+            # Exit already being worked by the execution engine
+            if self.execution_engine.IsExiting(symbol):
+                continue
+
             # 1. Stop Loss
             if unrealized_profit_percent <= self.STOP_LOSS_PERCENT:
-                self.Liquidate(symbol)
+                self.execution_engine.Submit(symbol, -holding.Quantity, self.EXIT_SLICE_MINUTES, tag="StopLoss", exit=True)
                 if symbol in self.trade_dates: del self.trade_dates[symbol]
                 continue # Move to next holding
 
             # 2. Take Profit
             if unrealized_profit_percent >= self.TAKE_PROFIT_PERCENT:
-                self.Liquidate(symbol)
+                self.execution_engine.Submit(symbol, -holding.Quantity, self.EXIT_SLICE_MINUTES, tag="TakeProfit", exit=True)
                 if symbol in self.trade_dates: del self.trade_dates[symbol]
-                continue # Move to next holding\
+                continue # Move to next holding
 
     def OnOrderEvent(self, orderEvent: OrderEvent):
         """Handle order events for logging."""
+        # Child order fills and cancels feed their parent order in the execution engine
+        self.execution_engine.OnOrderEvent(orderEvent)
+        # ...and every fill updates the risk engine's position arrays
+        if orderEvent.FillQuantity != 0:
+            self.risk_engine.OnFill(orderEvent.Symbol, orderEvent.FillQuantity, orderEvent.FillPrice)
+
         if orderEvent.Status != OrderStatus.Filled:
             return
 
@@ -468,7 +696,7 @@ class MemeStocksStrategy(QCAlgorithm):
         
         # Log large trades (>100 shares) for visibility
         if order.AbsoluteQuantity >= 100:
-            self.Log(f"FILLED {order.Symbol.Value} {order.Quantity} @ ${orderEvent.FillPrice:.2f}")
+            self.log_sink.Info("FILLED", "{} {} @ ${:.2f}", order.Symbol.Value, order.Quantity, orderEvent.FillPrice)
         
         # === Calculate and accumulate slippage ===
         market_price = self.Securities[order.Symbol].Price
@@ -488,3 +716,1769 @@ class MemeStocksStrategy(QCAlgorithm):
             # Accumulate daily slippage
             self.daily_slippage_dollars += trade_slippage_dollars
             self.daily_trades_count += 1
+
+    def SaveCheckpoint(self):
+        """Scheduled function to persist strategy state (live mode only)."""
+        if self.LiveMode and not self.IsWarmingUp:
+            self.checkpoint.Save()
+
+    def OnEndOfAlgorithm(self):
+        """Checkpoint and flush whatever is still buffered when the algorithm stops."""
+        self.SaveCheckpoint()
+        self.screening_worker.Shutdown()
+        self.log_sink.Info("DATA_COST", "{}", self.resolution_scheduler.Report())
+        self.log_sink.Flush()
+
+
+class BufferedLogSink:
+    """
+    Bounded logging layer used instead of calling self.Log directly.
+    - Lazy formatting: callers pass a template and args. Nothing is formatted unless the level is enabled,
+      and even then only when the record is flushed. An argument that is costly to build can be passed as a
+      zero-argument callable; it is only called for a record that gets past the filters below.
+    - Per-tag token bucket: each diagnostic tag (GATE, REGIME, ...) gets `burst` records and refills at
+      `rate_per_minute` of algorithm time, so a message fired on every minute bar cannot flood the log.
+      WARN and ERROR records are never rate limited.
+    - Duplicate suppression: an identical record (same tag, template and args) repeated back to back is
+      counted instead of stored, and reported as one "repeated N times" line.
+    - Trade records (`TRADE_TAGS`: entries, fills, shortfall and capacity caps) are exempt from both: a
+      15-name screening keeps all of its lines.
+    - Records live in a fixed-size ring buffer and are written out in batches to algorithm.Log (one call
+      per batch) or to a local file. ERROR records flush immediately.
+    """
+    DEBUG = 10
+    INFO = 20
+    WARN = 30
+    ERROR = 40
+    LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARN: "WARN", ERROR: "ERROR"}
+    TRADE_TAGS = frozenset(["BUY", "FILLED", "SHORTFALL", "CAPACITY"])
+
+    def __init__(self, algorithm, level=INFO, capacity=500, batch_size=50, rate_per_minute=2, burst=3, file_path=None):
+        self.algorithm = algorithm
+        self.level = level
+        self.batch_size = batch_size
+        self.rate_per_second = rate_per_minute / 60.0
+        self.burst = burst
+        self.file_path = file_path
+        self.buffer = deque(maxlen=capacity)  # (time, level, tag, template, args)
+        self.buckets = {}         # tag -> [tokens, last refill time]
+        self.last_key = {}        # tag -> (template, args) of the last accepted record
+        self.repeat_counts = {}   # tag -> duplicates suppressed since the last accepted record
+        self.limited_counts = {}  # tag -> records rejected by the token bucket since the last accepted record
+        self.dropped = 0          # Records overwritten in the ring buffer before they were flushed
+
+    def Debug(self, tag, template, *args):
+        self.Write(self.DEBUG, tag, template, *args)
+
+    def Info(self, tag, template, *args):
+        self.Write(self.INFO, tag, template, *args)
+
+    def Warn(self, tag, template, *args):
+        self.Write(self.WARN, tag, template, *args)
+
+    def Error(self, tag, template, *args):
+        self.Write(self.ERROR, tag, template, *args)
+
+    def IsEnabled(self, level):
+        return level >= self.level
+
+    def Write(self, level, tag, template, *args):
+        """Accept a record. Returns quickly (no formatting) if it is filtered, duplicated or rate limited."""
+        if level < self.level:
+            return
+        if tag in self.TRADE_TAGS:
+            self.Append((self.algorithm.Time, level, tag, template, self.Resolve(args)))
+            if len(self.buffer) >= self.batch_size:
+                self.Flush()
+            return
+
+        key = (template, args)
+        if self.last_key.get(tag) == key:
+            self.repeat_counts[tag] = self.repeat_counts.get(tag, 0) + 1
+            return
+
+        now = self.algorithm.Time
+        if level < self.WARN and not self.TakeToken(tag, now):
+            self.limited_counts[tag] = self.limited_counts.get(tag, 0) + 1
+            return
+
+        self.EmitSuppressed(tag, now)
+        self.last_key[tag] = key
+        self.Append((now, level, tag, template, self.Resolve(args)))
+
+        if level >= self.ERROR or len(self.buffer) >= self.batch_size:
+            self.Flush()
+
+    @staticmethod
+    def Resolve(args):
+        return tuple(arg() if callable(arg) else arg for arg in args)
+
+    def TakeToken(self, tag, now):
+        bucket = self.buckets.get(tag)
+        if bucket is None:
+            bucket = self.buckets[tag] = [float(self.burst), now]
+        else:
+            elapsed = (now - bucket[1]).total_seconds()
+            if elapsed > 0:
+                bucket[0] = min(float(self.burst), bucket[0] + elapsed * self.rate_per_second)
+                bucket[1] = now
+        if bucket[0] < 1.0:
+            return False
+        bucket[0] -= 1.0
+        return True
+
+    def EmitSuppressed(self, tag, now):
+        """Turn the pending duplicate / rate-limit counters of a tag into one summary record."""
+        repeats = self.repeat_counts.pop(tag, 0)
+        limited = self.limited_counts.pop(tag, 0)
+        if repeats or limited:
+            self.Append((now, self.INFO, tag, "previous message repeated {} times, {} records rate limited", (repeats, limited)))
+
+    def Append(self, record):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(record)
+
+    def Format(self, record):
+        time, level, tag, template, args = record
+        message = template.format(*args) if args else template
+        return f"{time} {self.LEVEL_NAMES.get(level, level)} [{tag}] {message}"
+
+    def Flush(self):
+        """Format and write every buffered record as one batch."""
+        now = self.algorithm.Time
+        for tag in list(self.repeat_counts.keys() | self.limited_counts.keys()):
+            self.EmitSuppressed(tag, now)
+            self.last_key.pop(tag, None)
+        if not self.buffer and not self.dropped:
+            return
+
+        lines = [self.Format(record) for record in self.buffer]
+        if self.dropped:
+            lines.append(f"{now} WARN [LOG] {self.dropped} records dropped (ring buffer full)")
+        self.buffer.clear()
+        self.dropped = 0
+
+        batch = "\n".join(lines)
+        if self.file_path:
+            with open(self.file_path, "a") as handle:
+                handle.write(batch + "\n")
+        else:
+            self.algorithm.Log(batch)
+
+
+class StrategyCheckpoint:
+    """
+    Versioned, struct-packed snapshot of the strategy state, stored in the ObjectStore.
+    Layout (little endian, version 2):
+        header   : magic b"MSCK", version u16, saved_at epoch seconds i64
+        scalars  : last_rebalance, last_trade_execution, last_screening, last_loss_limit (date ordinals u32, 0 = None),
+                   portfolio_value_at_start_of_day f64, market_regime u8 (0 BULL / 1 BEAR), initial_screen_done u8
+        symbols  : count u16, then per symbol u16 length + utf8 "ticker|security id"
+        iv_cache, previous_iv : count u16, then (symbol index u16, iv f64)
+        trade_dates           : count u16, then (symbol index u16, date ordinal u32)
+        pending_etf_targets   : count u16, then (symbol index u16, weight f64)
+        working parents       : count u16, then (symbol index u16, target/quantity/filled i32, notional/arrival f64,
+                                end epoch seconds i64, pov u8, exit u8) + u16 length + utf8 tag
+        risk engine           : month yyyymm u32 (0 = None), month_start_value f64, consecutive_losses u16,
+                                monthly_breached u8
+    Symbols are written once and referenced by index, so a snapshot of 30 names stays around 1KB.
+    Decode() only parses; the state is applied to the algorithm when the checkpoint is used.
+    """
+    MAGIC = b"MSCK"
+    VERSION = 2
+    HEADER = struct.Struct("<4sHq")
+    SCALARS = struct.Struct("<IIIIdBB")
+    COUNT = struct.Struct("<H")
+    IV_ENTRY = struct.Struct("<Hd")
+    DATE_ENTRY = struct.Struct("<HI")
+    PARENT_ENTRY = struct.Struct("<HiiiddqBB")
+    RISK = struct.Struct("<IdHB")
+    EPOCH = datetime(1970, 1, 1)
+
+    def __init__(self, algorithm, key="memestocks/checkpoint.bin", max_age_days=3):
+        self.algorithm = algorithm
+        self.key = key
+        self.max_age_days = max_age_days
+
+    def Save(self):
+        try:
+            self.algorithm.ObjectStore.SaveBytes(self.key, self.Encode())
+        except Exception as e:
+            self.algorithm.log_sink.Warn("CHECKPOINT", "Save failed: {}", str(e)[:80])
+
+    def Restore(self):
+        """Load the last checkpoint into the algorithm if it is recent enough to skip warmup. Returns True if it was."""
+        algorithm = self.algorithm
+        if not algorithm.ObjectStore.ContainsKey(self.key):
+            return False
+        try:
+            state = self.Decode(bytes(algorithm.ObjectStore.ReadBytes(self.key)))
+        except Exception as e:
+            algorithm.log_sink.Warn("CHECKPOINT", "Restore failed, warming up instead: {}", str(e)[:80])
+            return False
+
+        age_days = (algorithm.Time - state["saved_at"]).total_seconds() / 86400
+        if age_days > self.max_age_days:
+            # Too old to skip warmup, but a loss-limit halt of the current month must survive the restart
+            self.ApplyRisk(state)
+            algorithm.log_sink.Info("CHECKPOINT", "Checkpoint is {:.1f} days old (limit {}). Warming up instead.", age_days, self.max_age_days)
+            return False
+        self.Apply(state)
+        algorithm.log_sink.Info("CHECKPOINT", "Restored state saved {:.1f} days ago: {} IVs, {} open trade dates, {} working orders.",
+                                age_days, len(algorithm.iv_cache), len(algorithm.trade_dates), len(state["parents"]))
+        return True
+
+    @staticmethod
+    def DateToOrdinal(value):
+        return value.toordinal() if value is not None else 0
+
+    @staticmethod
+    def OrdinalToDate(value):
+        return date.fromordinal(value) if value else None
+
+    def Seconds(self, value):
+        return int((value - self.EPOCH).total_seconds())
+
+    def Encode(self):
+        algorithm = self.algorithm
+        parents = algorithm.execution_engine.parents
+        risk = algorithm.risk_engine
+        symbols = list({*algorithm.iv_cache, *algorithm.previous_iv, *algorithm.trade_dates, *algorithm.pending_etf_targets, *parents})
+        index = {symbol: i for i, symbol in enumerate(symbols)}
+
+        parts = [
+            self.HEADER.pack(self.MAGIC, self.VERSION, self.Seconds(algorithm.Time)),
+            self.SCALARS.pack(self.DateToOrdinal(algorithm.last_rebalance_date),
+                              self.DateToOrdinal(algorithm.last_trade_execution_date),
+                              self.DateToOrdinal(algorithm.last_screening_date),
+                              self.DateToOrdinal(algorithm.last_loss_limit_date),
+                              float(algorithm.portfolio_value_at_start_of_day),
+                              1 if algorithm.market_regime == 'BEAR' else 0,
+                              1 if algorithm.initial_screen_done else 0),
+            self.COUNT.pack(len(symbols)),
+        ]
+        for symbol in symbols:
+            encoded = f"{symbol.Value}|{symbol.ID}".encode("utf-8")
+            parts.append(self.COUNT.pack(len(encoded)))
+            parts.append(encoded)
+        for values in (algorithm.iv_cache, algorithm.previous_iv):
+            parts.append(self.COUNT.pack(len(values)))
+            parts.extend(self.IV_ENTRY.pack(index[s], float(iv)) for s, iv in values.items())
+        parts.append(self.COUNT.pack(len(algorithm.trade_dates)))
+        parts.extend(self.DATE_ENTRY.pack(index[s], d.toordinal()) for s, d in algorithm.trade_dates.items())
+        parts.append(self.COUNT.pack(len(algorithm.pending_etf_targets)))
+        parts.extend(self.IV_ENTRY.pack(index[s], float(w)) for s, w in algorithm.pending_etf_targets.items())
+
+        parts.append(self.COUNT.pack(len(parents)))
+        for symbol, parent in parents.items():
+            tag = parent["tag"].encode("utf-8")
+            parts.append(self.PARENT_ENTRY.pack(index[symbol], int(parent["target"]), int(parent["quantity"]), int(parent["filled"]),
+                                                float(parent["notional"]), float(parent["arrival"]), self.Seconds(parent["end"]),
+                                                1 if parent["mode"] == "pov" else 0, 1 if parent["exit"] else 0))
+            parts.append(self.COUNT.pack(len(tag)))
+            parts.append(tag)
+
+        month = risk.month[0] * 100 + risk.month[1] if risk.month else 0
+        parts.append(self.RISK.pack(month, float(risk.month_start_value), risk.consecutive_losses, 1 if risk.monthly_breached else 0))
+        return b"".join(parts)
+
+    def Decode(self, payload):
+        """Parse a checkpoint into a state dict (nothing is applied to the algorithm)."""
+        magic, version, saved_at = self.HEADER.unpack_from(payload, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"unsupported checkpoint {magic!r} v{version}")
+        offset = self.HEADER.size
+
+        (rebalance, execution, screening, loss_limit, start_of_day, regime, screened) = self.SCALARS.unpack_from(payload, offset)
+        offset += self.SCALARS.size
+
+        (count,) = self.COUNT.unpack_from(payload, offset)
+        offset += self.COUNT.size
+        symbols = []
+        for _ in range(count):
+            (length,) = self.COUNT.unpack_from(payload, offset)
+            offset += self.COUNT.size
+            ticker, sid = payload[offset:offset + length].decode("utf-8").split("|", 1)
+            offset += length
+            symbols.append(Symbol(SecurityIdentifier.Parse(sid), ticker))
+
+        weight_maps = []
+        for _ in range(2):
+            (count,) = self.COUNT.unpack_from(payload, offset)
+            offset += self.COUNT.size
+            values = {}
+            for _ in range(count):
+                i, iv = self.IV_ENTRY.unpack_from(payload, offset)
+                offset += self.IV_ENTRY.size
+                values[symbols[i]] = iv
+            weight_maps.append(values)
+
+        (count,) = self.COUNT.unpack_from(payload, offset)
+        offset += self.COUNT.size
+        trade_dates = {}
+        for _ in range(count):
+            i, ordinal = self.DATE_ENTRY.unpack_from(payload, offset)
+            offset += self.DATE_ENTRY.size
+            trade_dates[symbols[i]] = date.fromordinal(ordinal)
+
+        (count,) = self.COUNT.unpack_from(payload, offset)
+        offset += self.COUNT.size
+        etf_targets = {}
+        for _ in range(count):
+            i, weight = self.IV_ENTRY.unpack_from(payload, offset)
+            offset += self.IV_ENTRY.size
+            etf_targets[symbols[i]] = weight
+
+        (count,) = self.COUNT.unpack_from(payload, offset)
+        offset += self.COUNT.size
+        parents = []
+        for _ in range(count):
+            i, target, quantity, filled, notional, arrival, end, pov, exit = self.PARENT_ENTRY.unpack_from(payload, offset)
+            offset += self.PARENT_ENTRY.size
+            (length,) = self.COUNT.unpack_from(payload, offset)
+            offset += self.COUNT.size
+            tag = payload[offset:offset + length].decode("utf-8")
+            offset += length
+            parents.append((symbols[i], target, quantity, filled, notional, arrival, self.EPOCH + timedelta(seconds=end),
+                            "pov" if pov else "twap", tag, bool(exit)))
+
+        month, month_start_value, consecutive_losses, monthly_breached = self.RISK.unpack_from(payload, offset)
+
+        return {
+            "saved_at": self.EPOCH + timedelta(seconds=saved_at),
+            "last_rebalance_date": self.OrdinalToDate(rebalance),
+            "last_trade_execution_date": self.OrdinalToDate(execution),
+            "last_screening_date": self.OrdinalToDate(screening),
+            "last_loss_limit_date": self.OrdinalToDate(loss_limit),
+            "portfolio_value_at_start_of_day": start_of_day,
+            "market_regime": 'BEAR' if regime else 'BULL',
+            "initial_screen_done": bool(screened),
+            "iv_cache": weight_maps[0],
+            "previous_iv": weight_maps[1],
+            "trade_dates": trade_dates,
+            "pending_etf_targets": etf_targets,
+            "parents": parents,
+            "risk": ((month // 100, month % 100) if month else None, month_start_value, consecutive_losses, bool(monthly_breached)),
+        }
+
+    def Apply(self, state):
+        algorithm = self.algorithm
+        for name in ("last_rebalance_date", "last_trade_execution_date", "last_screening_date", "last_loss_limit_date",
+                     "portfolio_value_at_start_of_day", "market_regime", "initial_screen_done", "iv_cache", "previous_iv",
+                     "trade_dates", "pending_etf_targets"):
+            setattr(algorithm, name, state[name])
+        for parent in state["parents"]:
+            algorithm.execution_engine.Restore(*parent)
+        self.ApplyRisk(state)
+
+    def ApplyRisk(self, state):
+        """Restore the risk engine's month anchor and halt flags if the checkpoint is from the current month."""
+        month = state["risk"][0]
+        today = self.algorithm.Time.date()
+        if month != (today.year, today.month):
+            return
+        risk = self.algorithm.risk_engine
+        risk.month, risk.month_start_value, risk.consecutive_losses, risk.monthly_breached = state["risk"]
+        if risk.monthly_breached or risk.HaltNewEntries():
+            self.algorithm.log_sink.Warn("CHECKPOINT", "Restored risk state: monthly limit breached {}, {} consecutive losses.",
+                                         risk.monthly_breached, risk.consecutive_losses)
+
+
+class StagedOptionSubscriptions:
+    """
+    Two-stage option data: a cheap equity-only pre-screen every day, option chains only when they are needed.
+    Stage 1 (daily, from the coarse data already used for universe selection): keep the last `long_window` daily
+    prices of the top `pool_size` names by dollar volume and rank them by realized-vol spike (short-window
+    realized vol / long-window realized vol). Names without a full long window yet have no meaningful ratio: they
+    are never cut from the shortlist on it, and ties are broken by dollar volume so the ranking is deterministic.
+    Stage 2 (screening window only): AddOption for the shortlisted underlyings, RemoveSecurity afterwards.
+    """
+    def __init__(self, algorithm, shortlist_size=24, short_window=5, long_window=20, pool_size=100, resolution=Resolution.Minute):
+        self.algorithm = algorithm
+        self.resolution = resolution
+        self.shortlist_size = shortlist_size
+        self.short_window = short_window
+        self.long_window = long_window
+        self.pool_size = pool_size
+        self.price_history = {}  # equity symbol -> deque of daily prices
+        self.dollar_volume = {}  # equity symbol -> latest daily dollar volume
+        self.subscribed = {}     # equity symbol -> canonical option symbol
+
+    def UpdateCoarse(self, ranked_coarse):
+        """Append today's price for the dollar-volume pool. Names that fall out of the pool are evicted."""
+        pool = ranked_coarse[:self.pool_size]
+        history = {}
+        self.dollar_volume = {c.Symbol: c.DollarVolume for c in pool}
+        for c in pool:
+            prices = self.price_history.get(c.Symbol)
+            if prices is None:
+                prices = deque(maxlen=self.long_window + 1)
+            prices.append(c.Price)
+            history[c.Symbol] = prices
+        self.price_history = history
+
+    @staticmethod
+    def RealizedVol(prices):
+        returns = [math.log(b / a) for a, b in zip(prices, prices[1:]) if a > 0 and b > 0]
+        if len(returns) < 2:
+            return None
+        mean = sum(returns) / len(returns)
+        return math.sqrt(sum((r - mean) ** 2 for r in returns) / (len(returns) - 1))
+
+    def IsSeasoned(self, symbol):
+        return len(self.price_history.get(symbol, ())) > self.long_window
+
+    def SpikeRatio(self, symbol):
+        """Short-window over long-window realized vol. 1.0 (neutral) until there is enough history."""
+        if not self.IsSeasoned(symbol):
+            return 1.0
+        prices = list(self.price_history[symbol])
+        short_vol = self.RealizedVol(prices[-(self.short_window + 1):])
+        long_vol = self.RealizedVol(prices)
+        if not short_vol or not long_vol:
+            return 1.0
+        return short_vol / long_vol
+
+    def Shortlist(self, symbols):
+        """
+        Keep every unseasoned universe equity (by dollar volume), then fill up to `shortlist_size` with the seasoned
+        ones ranked by realized-vol spike.
+        """
+        by_dollar_volume = sorted(symbols, key=lambda s: (-self.dollar_volume.get(s, 0.0), s.Value))
+        unseasoned = [s for s in by_dollar_volume if not self.IsSeasoned(s)]
+        seasoned = sorted((s for s in by_dollar_volume if self.IsSeasoned(s)), key=self.SpikeRatio, reverse=True)
+        return unseasoned + seasoned[:max(0, self.shortlist_size - len(unseasoned))]
+
+    def Subscribe(self, symbols):
+        for symbol in symbols:
+            if symbol in self.subscribed:
+                continue
+            option = self.algorithm.AddOption(symbol, self.resolution)
+            option.SetFilter(self.algorithm.OptionFilterFunction)
+            self.subscribed[symbol] = option.Symbol
+
+    def ReleaseSymbol(self, symbol):
+        """Remove the chain of one underlying, e.g. when it leaves the universe mid-window."""
+        option_symbol = self.subscribed.pop(symbol, None)
+        if option_symbol is not None:
+            self.algorithm.RemoveSecurity(option_symbol)
+
+    def Release(self):
+        """Remove every chain subscription. Returns how many were removed."""
+        for option_symbol in self.subscribed.values():
+            self.algorithm.RemoveSecurity(option_symbol)
+        released = len(self.subscribed)
+        self.subscribed.clear()
+        return released
+
+
+class SecurityLifecycleManager:
+    """
+    Reacts to universe changes so per-symbol state stays bounded while the top-30 universe churns.
+    - Keeps `active_symbols`: the universe equities we can screen (SPY/XLU/VIX and option contracts excluded),
+      and gives new ones indicator engine and correlation tracker rows.
+    - On removal, evicts the symbol from iv_cache, previous_iv and chain_volumes, drops its trade date unless still
+      invested, releases its staged option chain and escalated data, and frees its indicator/correlation rows.
+    """
+    def __init__(self, algorithm, excluded=()):
+        self.algorithm = algorithm
+        self.excluded = set(excluded)
+        self.active_symbols = set()
+        self.evicted_count = 0
+
+    def OnSecuritiesChanged(self, changes):
+        added = []
+        for security in changes.AddedSecurities:
+            if security.Type == SecurityType.Equity and security.Symbol not in self.excluded and security.Symbol not in self.active_symbols:
+                self.active_symbols.add(security.Symbol)
+                added.append(security.Symbol)
+        if added:
+            # One batched history request seeds the indicator rows of every new name
+            self.algorithm.indicator_engine.Add(added)
+            self.algorithm.correlation_tracker.Add(added)
+
+        for security in changes.RemovedSecurities:
+            if security.Type == SecurityType.Equity and security.Symbol in self.active_symbols:
+                self.Evict(security.Symbol)
+
+    def Evict(self, symbol):
+        algorithm = self.algorithm
+        self.active_symbols.discard(symbol)
+        algorithm.iv_cache.pop(symbol, None)
+        algorithm.previous_iv.pop(symbol, None)
+        algorithm.chain_volumes.pop(symbol, None)
+        if not algorithm.Portfolio[symbol].Invested:
+            algorithm.trade_dates.pop(symbol, None)
+        algorithm.option_stager.ReleaseSymbol(symbol)
+        algorithm.resolution_scheduler.Forget(symbol)
+        algorithm.indicator_engine.Remove(symbol)
+        algorithm.correlation_tracker.Remove(symbol)
+        self.evicted_count += 1
+
+
+class ResolutionScheduler:
+    """
+    Runs the universe at a coarse resolution and escalates to fine data only where it pays off:
+    - Screening window: the shortlisted underlyings get an `escalated_resolution` subscription while their
+      chains stream (the chains themselves are added at that resolution by StagedOptionSubscriptions).
+    - Volatile exits: a holding within `exit_band` of its stop loss or take profit is escalated so the
+      exit triggers on the next minute bar instead of the next hourly bar.
+    Escalation ends when the window closes (screening names) or once a holding trades back outside twice the band or
+    is closed (exit names). The extra subscription cannot be downgraded and RemoveSecurity on a name the universe still
+    selects would evict it from the universe, so a de-escalated name "lingers" on minute data until the universe stops
+    selecting it and it is flat; only then is its subscription removed. Re-escalating a lingering name is free.
+    Every slice is attributed to the policy in force ("coarse" or "escalated") with its bar count, option
+    contract count and OnData wall time, so the cost of each policy can be compared from the logs.
+    """
+    def __init__(self, algorithm, default_resolution=Resolution.Hour, escalated_resolution=Resolution.Minute, exit_band=0.05):
+        self.algorithm = algorithm
+        self.default_resolution = default_resolution
+        self.escalated_resolution = escalated_resolution
+        self.exit_band = exit_band
+        self.window_open = False
+        self.escalated = {}  # symbol -> reason ("screening" / "exit")
+        self.lingering = set()  # de-escalated names whose minute subscription waits for the universe to drop them
+        self.selected = frozenset()  # latest universe selection (replaced whole from the selection thread)
+        self.stats = {"coarse": [0, 0, 0, 0.0], "escalated": [0, 0, 0, 0.0]}  # slices, bars, contracts, seconds
+
+    def Policy(self):
+        return "escalated" if self.window_open or self.escalated or self.lingering else "coarse"
+
+    def OnSelection(self, symbols):
+        self.selected = frozenset(symbols)
+
+    def Escalate(self, symbol, reason):
+        if symbol in self.escalated or self.default_resolution == self.escalated_resolution:
+            return
+        if symbol in self.lingering:
+            self.lingering.discard(symbol)  # still subscribed at the escalated resolution
+        else:
+            self.algorithm.AddSecurity(symbol, self.escalated_resolution, dataNormalizationMode=DataNormalizationMode.Raw)
+        self.escalated[symbol] = reason
+
+    def Deescalate(self, symbol):
+        if self.escalated.pop(symbol, None) is not None:
+            self.lingering.add(symbol)
+
+    def RemoveUnselected(self):
+        """Remove the subscriptions of lingering names the universe no longer selects and that are flat."""
+        if not self.selected:
+            return  # no selection seen yet
+        portfolio = self.algorithm.Portfolio
+        for symbol in [s for s in self.lingering if s not in self.selected and not portfolio[s].Invested]:
+            self.lingering.discard(symbol)
+            self.algorithm.RemoveSecurity(symbol)
+
+    def OpenWindow(self, symbols):
+        self.window_open = True
+        for symbol in symbols:
+            self.Escalate(symbol, "screening")
+
+    def CloseWindow(self):
+        self.window_open = False
+        for symbol in [s for s, reason in self.escalated.items() if reason == "screening"]:
+            self.Deescalate(symbol)
+
+    def CheckExitBand(self, symbol, unrealized_profit_percent):
+        """Escalate a holding once it trades close to one of its exit levels, de-escalate it once it is well clear."""
+        algorithm = self.algorithm
+        distance = min(unrealized_profit_percent - algorithm.STOP_LOSS_PERCENT,
+                       algorithm.TAKE_PROFIT_PERCENT - unrealized_profit_percent)
+        if distance <= self.exit_band:
+            self.Escalate(symbol, "exit")
+        elif distance > 2 * self.exit_band and self.escalated.get(symbol) == "exit":
+            self.Deescalate(symbol)
+
+    def ReleaseClosed(self):
+        """De-escalate exit names whose position has been closed, then drop lingering names the universe left."""
+        portfolio = self.algorithm.Portfolio
+        for symbol in [s for s, reason in self.escalated.items() if reason == "exit" and not portfolio[s].Invested]:
+            self.Deescalate(symbol)
+        self.RemoveUnselected()
+
+    def Forget(self, symbol):
+        self.escalated.pop(symbol, None)
+        self.lingering.discard(symbol)
+
+    def Record(self, data, elapsed):
+        stats = self.stats[self.Policy()]
+        stats[0] += 1
+        stats[1] += len(data.Bars)
+        if data.OptionChains:
+            stats[2] += sum(len(chain) for chain in data.OptionChains.Values)
+        stats[3] += elapsed
+
+    def Report(self):
+        parts = []
+        for policy, (slices, bars, contracts, seconds) in self.stats.items():
+            per_slice = (seconds / slices * 1000) if slices else 0
+            parts.append(f"{policy}: {slices} slices, {bars} bars, {contracts} contracts, {seconds:.1f}s OnData ({per_slice:.2f}ms/slice)")
+        parts.append(f"escalated now: {len(self.escalated)}, lingering: {len(self.lingering)}")
+        return " | ".join(parts)
+
+
+# Immutable inputs and output of one screening run. Plain dict copies, no Slice or Security references,
+# so the worker thread never touches LEAN objects that change under it.
+ScreeningSnapshot = namedtuple("ScreeningSnapshot", ["current_iv", "previous_iv", "chain_volumes", "min_call_put_ratio", "top_n"])
+ScreeningResult = namedtuple("ScreeningResult", ["ranked", "current_iv"])
+
+
+class ScreeningWorker:
+    """
+    Runs the screening ranking on a single background thread.
+    Submit() hands over a ScreeningSnapshot and returns immediately. Poll() returns the ScreeningResult once:
+    live trading only picks it up when it is done (bars keep flowing meanwhile), backtests block on the next
+    bar so results and fills do not depend on thread timing.
+    """
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screening")
+        self.pending = None
+
+    def IsBusy(self):
+        return self.pending is not None
+
+    def Submit(self, snapshot):
+        self.pending = self.executor.submit(self.Rank, snapshot)
+
+    def Poll(self):
+        if self.pending is None:
+            return None
+        if self.algorithm.LiveMode and not self.pending.done():
+            return None
+        future, self.pending = self.pending, None
+        try:
+            return future.result()
+        except Exception as e:
+            self.algorithm.log_sink.Error("SCREEN", "Screening worker failed: {}", str(e)[:80])
+            return None
+
+    def Shutdown(self):
+        self.executor.shutdown(wait=False)
+
+    @staticmethod
+    def Rank(snapshot):
+        """IV filter, call/put sentiment filter and ranking. Pure function of the snapshot."""
+        current_iv_data = snapshot.current_iv
+
+        # Determine the pool of candidates for trading
+        if not snapshot.previous_iv:
+            # On the first run, we use the absolute IV values
+            candidate_pool = current_iv_data
+        else:
+            # On subsequent runs, only consider stocks where IV has actually increased
+            candidate_pool = {}
+            for symbol, current_iv in current_iv_data.items():
+                if symbol in snapshot.previous_iv:
+                    iv_increase = current_iv - snapshot.previous_iv[symbol]
+                    if iv_increase > 0:
+                        candidate_pool[symbol] = iv_increase
+
+        # --- Sentiment Analysis ---
+        # We still use the call/put ratio as a secondary filter
+        bullish_sentiment_pool = {}
+        for symbol, value in candidate_pool.items():
+            # Skip underlyings whose chain never arrived
+            if symbol not in snapshot.chain_volumes:
+                continue
+            total_call_volume, total_put_volume = snapshot.chain_volumes[symbol]
+
+            call_put_ratio = float('inf') if total_put_volume == 0 and total_call_volume > 0 else (total_call_volume / total_put_volume if total_put_volume > 0 else 0)
+
+            if call_put_ratio >= snapshot.min_call_put_ratio:
+                # The 'value' is either the absolute IV (first run) or the IV increase (subsequent runs)
+                bullish_sentiment_pool[symbol] = value
+
+        # Rank candidates by their value (either absolute IV or IV increase) and keep the top N
+        top_sorted = sorted(bullish_sentiment_pool.items(), key=lambda item: item[1], reverse=True)
+        return ScreeningResult(ranked=[symbol for symbol, _ in top_sorted[:snapshot.top_n]], current_iv=current_iv_data)
+
+
+class PortfolioTargetExecutor:
+    """
+    Batch replacement for calling SetHoldings once per symbol.
+    Portfolio value and stock allocation are read once. ETF targets are applied first, then candidates are
+    added in rank order at `weight` each until `max_allocation` would be exceeded. Every target is netted
+    against the current holding into a share quantity and the resulting orders are submitted together,
+    sells first so they free buying power for the buys. Candidate weights are capped by the CapacityModel
+    before they count against the allocation. ETF orders are plain market orders, memestock entries are
+    handed to the SlicingExecutionEngine.
+    """
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+
+    def Execute(self, candidates=(), weight=0.0, max_allocation=float('inf'), etf_targets=None):
+        """Returns [(symbol, stock allocation before it was added, weight)] for the candidates that got a target."""
+        algorithm = self.algorithm
+        portfolio = algorithm.Portfolio
+        total_value = portfolio.TotalPortfolioValue
+        if total_value <= 0:
+            return []
+
+        allocation = portfolio.TotalHoldingsValue / total_value
+        etf_targets_set = set(etf_targets or ())
+        targets = {}
+        for symbol, target_weight in (etf_targets or {}).items():
+            targets[symbol] = target_weight
+            allocation += target_weight - portfolio[symbol].HoldingsValue / total_value
+
+        added = []
+        for symbol in candidates:
+            if allocation + weight > max_allocation:
+                break
+            if portfolio[symbol].Invested or symbol in targets or algorithm.Securities[symbol].Price <= 0:
+                continue
+            symbol_weight = algorithm.capacity_model.CapWeight(symbol, weight, total_value)
+            if symbol_weight <= 0:
+                continue
+            added.append((symbol, allocation, symbol_weight))
+            targets[symbol] = symbol_weight
+            allocation += symbol_weight
+
+        orders = []
+        for symbol, target_weight in targets.items():
+            price = algorithm.Securities[symbol].Price
+            if price <= 0:
+                continue
+            quantity = int(target_weight * total_value / price) - portfolio[symbol].Quantity
+            if quantity != 0:
+                orders.append((symbol, quantity))
+
+        # ETF targets are liquid and go out as market orders; memestock entries are sliced by the execution engine
+        orders.sort(key=lambda order: order[1])
+        for symbol, quantity in orders:
+            if symbol in etf_targets_set:
+                algorithm.MarketOrder(symbol, quantity, asynchronous=True, tag="TargetBatch")
+            else:
+                algorithm.execution_engine.Submit(symbol, quantity, algorithm.ENTRY_SLICE_MINUTES, tag="Entry")
+        return added
+
+
+class SlicingExecutionEngine:
+    """
+    Works parent orders on thin, volatile names as a sequence of child limit orders.
+    - One child at a time, priced at the NBBO (buy at the ask, sell at the bid, last price if there is no quote).
+    - Child size: TWAP (remaining / minutes left in the horizon), capped at `participation_rate` of the last bar's
+      volume. mode="pov" uses the participation cap alone.
+    - A child that is still open after `reprice_seconds` is moved to the current NBBO. Once the horizon is over
+      the rest is swept with a market order.
+    - When a parent completes, its implementation shortfall against the arrival mid is logged (bps and dollars).
+    - A cancelled parent stays in `closing` until the broker confirms its child's cancel (or fill), so a late fill
+      is still counted, and it is netted out of a new parent working the same symbol.
+    - Working parents are checkpointed without their child. A parent restored after a restart cancels whatever
+      order of the old session is still open on its symbol and re-derives `remaining` from its target holding.
+    """
+    def __init__(self, algorithm, participation_rate=0.10, reprice_seconds=60):
+        self.algorithm = algorithm
+        self.participation_rate = participation_rate
+        self.reprice_seconds = reprice_seconds
+        self.parents = {}          # symbol -> parent order state
+        self.child_orders = {}     # child order id -> (symbol, parent it was placed for)
+        self.closing = {}          # child order id -> parent cancelled while that child was still open
+        self.completed = 0
+        self.shortfall_dollars = 0.0
+        self.shortfall_bps_sum = 0.0
+
+    def Owns(self, order_id):
+        return order_id in self.child_orders
+
+    def IsExiting(self, symbol):
+        parent = self.parents.get(symbol)
+        return parent is not None and parent["exit"]
+
+    def CapEntry(self, symbol, target):
+        """
+        Lower the target holding of a working entry (e.g. to a position cap) instead of replacing it with an exit.
+        An open child is cancelled so the next one is sized for the new remainder. Returns False without an entry.
+        """
+        parent = self.parents.get(symbol)
+        if parent is None or parent["exit"]:
+            return False
+        capped = min(parent["target"], target) if parent["quantity"] > 0 else max(parent["target"], target)
+        if capped == parent["target"]:
+            return True
+        parent["remaining"] -= parent["target"] - capped
+        parent["target"] = capped
+        if parent["child"] is not None:
+            parent["child"].Cancel()
+        return True
+
+    def Submit(self, symbol, quantity, horizon_minutes, mode="twap", tag="", exit=False):
+        """Start working a parent order. Replaces any parent already working the same symbol."""
+        if quantity == 0:
+            return
+        if symbol in self.parents:
+            self.Cancel(symbol)
+        security = self.algorithm.Securities[symbol]
+        now = self.algorithm.Time
+        self.parents[symbol] = {
+            "target": self.algorithm.Portfolio[symbol].Quantity + quantity,
+            "quantity": quantity, "remaining": quantity, "filled": 0, "notional": 0.0,
+            "arrival": self.Mid(security), "end": now + timedelta(minutes=horizon_minutes),
+            "mode": mode, "tag": tag, "exit": exit, "child": None, "child_time": None,
+        }
+        self.Step(symbol)
+
+    def Restore(self, symbol, target, quantity, filled, notional, arrival, end, mode, tag, exit):
+        """Put back a parent from a checkpoint. Its first Step reconciles it with the brokerage."""
+        self.parents[symbol] = {
+            "target": target, "quantity": quantity, "remaining": target, "filled": filled, "notional": notional,
+            "arrival": arrival, "end": end, "mode": mode, "tag": tag, "exit": exit, "child": None, "child_time": None,
+            "restored": True,
+        }
+
+    def OnData(self, data):
+        for symbol in list(self.parents):
+            self.Step(symbol)
+
+    def Step(self, symbol):
+        algorithm = self.algorithm
+        parent = self.parents[symbol]
+        now = algorithm.Time
+        if not algorithm.Securities.ContainsKey(symbol):
+            # A parent restored from a checkpoint waits for the universe to subscribe its name again
+            if now >= parent["end"]:
+                algorithm.log_sink.Warn("CHECKPOINT", "{}: restored order reached its horizon without data. Dropped it.", symbol.Value)
+                del self.parents[symbol]
+            return
+        security = algorithm.Securities[symbol]
+        if parent.pop("restored", False):
+            # Orders of the previous session are not tracked; what they filled is already in the holding
+            algorithm.Transactions.CancelOpenOrders(symbol)
+            parent["remaining"] = parent["target"] - algorithm.Portfolio[symbol].Quantity
+            if parent["remaining"] * parent["quantity"] < 0:
+                parent["remaining"] = 0
+        remaining = parent["remaining"]
+        child = parent["child"]
+
+        if child is not None:
+            if now >= parent["end"]:
+                child.Cancel()  # the cancel event clears the child, the sweep follows on the next step
+            elif (now - parent["child_time"]).total_seconds() >= self.reprice_seconds:
+                child.UpdateLimitPrice(self.LimitPrice(security, remaining))
+                parent["child_time"] = now
+            return
+
+        if remaining * parent["quantity"] <= 0:
+            self.Finish(symbol)  # done, or its target was capped below what is already held
+            return
+
+        if now >= parent["end"]:
+            ticket = algorithm.MarketOrder(symbol, remaining, asynchronous=True, tag=f"{parent['tag']} sweep")
+        else:
+            ticket = algorithm.LimitOrder(symbol, self.SliceQuantity(parent, security, now),
+                                          self.LimitPrice(security, remaining), asynchronous=True, tag=parent["tag"])
+        parent["child"] = ticket
+        parent["child_time"] = now
+        self.child_orders[ticket.OrderId] = (symbol, parent)
+
+    def SliceQuantity(self, parent, security, now):
+        remaining = parent["remaining"]
+        participation_cap = max(1, int(self.participation_rate * security.Volume))
+        if parent["mode"] == "pov":
+            size = participation_cap
+        else:
+            minutes_left = max(1, math.ceil((parent["end"] - now).total_seconds() / 60))
+            size = min(math.ceil(abs(remaining) / minutes_left), participation_cap)
+        size = min(abs(remaining), size)
+        return size if remaining > 0 else -size
+
+    @staticmethod
+    def Mid(security):
+        if security.BidPrice > 0 and security.AskPrice > 0:
+            return float(security.BidPrice + security.AskPrice) / 2
+        return float(security.Price)
+
+    @staticmethod
+    def LimitPrice(security, quantity):
+        quote = security.AskPrice if quantity > 0 else security.BidPrice
+        return quote if quote > 0 else security.Price
+
+    def OnOrderEvent(self, orderEvent):
+        if orderEvent.OrderId not in self.child_orders:
+            return
+        symbol, parent = self.child_orders[orderEvent.OrderId]
+        closing = orderEvent.OrderId in self.closing
+
+        if orderEvent.FillQuantity != 0:
+            parent["filled"] += orderEvent.FillQuantity
+            parent["notional"] += float(orderEvent.FillQuantity * orderEvent.FillPrice)
+            parent["remaining"] -= orderEvent.FillQuantity
+            working = self.parents.get(symbol)
+            if closing and working is not None:
+                # The replacement was sized from the holding before this fill
+                working["remaining"] -= orderEvent.FillQuantity
+
+        if orderEvent.Status in (OrderStatus.Filled, OrderStatus.Canceled, OrderStatus.Invalid):
+            del self.child_orders[orderEvent.OrderId]
+            parent["child"] = None
+            if closing:
+                del self.closing[orderEvent.OrderId]
+                self.Report(symbol, parent)
+            elif parent["remaining"] * parent["quantity"] <= 0:
+                self.Finish(symbol)
+
+    def Cancel(self, symbol):
+        """Stop working a parent order. It is reported once its open child (if any) is confirmed cancelled or filled."""
+        parent = self.parents.pop(symbol, None)
+        if parent is None:
+            return
+        child = parent["child"]
+        if child is None:
+            self.Report(symbol, parent)
+            return
+        self.closing[child.OrderId] = parent
+        child.Cancel()
+
+    def CancelAll(self):
+        for symbol in list(self.parents):
+            self.Cancel(symbol)
+
+    def Finish(self, symbol):
+        self.Report(symbol, self.parents.pop(symbol))
+
+    def Report(self, symbol, parent):
+        """Log and accumulate the implementation shortfall of a parent that is done."""
+        filled = parent["filled"]
+        arrival = parent["arrival"]
+        if filled == 0 or arrival <= 0:
+            return
+        average_price = parent["notional"] / filled
+        side = 1 if filled > 0 else -1
+        shortfall_bps = side * (average_price - arrival) / arrival * 10000
+        shortfall_dollars = side * (average_price - arrival) * abs(filled)
+        self.completed += 1
+        self.shortfall_bps_sum += shortfall_bps
+        self.shortfall_dollars += shortfall_dollars
+        self.algorithm.log_sink.Info("SHORTFALL", "{} {} {}/{} @ {:.2f} vs arrival {:.2f}: {:.1f} bps (${:.2f})",
+                                     parent["tag"], symbol.Value, filled, parent["quantity"], average_price,
+                                     arrival, shortfall_bps, shortfall_dollars)
+
+    def Summary(self):
+        average_bps = self.shortfall_bps_sum / self.completed if self.completed else 0
+        return f"{self.completed} parents | Shortfall: ${self.shortfall_dollars:.2f} | Avg: {average_bps:.1f} bps | Working: {len(self.parents)}"
+
+
+class CapacityModel:
+    """
+    Liquidity-aware position caps.
+    - From the daily coarse data (same list the universe is picked from): 20-day rolling average dollar volume
+      (running sum over a deque) and an EWMA of squared daily log returns for daily vol, for the top
+      `pool_size` names by dollar volume. Names leaving the pool are evicted.
+    - From the bars in OnData: an EWMA profile of shares traded per minute in 30-minute buckets of the trading day
+      (works for minute and hourly bars alike).
+    - Impact estimate (square-root law): impact_bps = impact_coefficient * daily_vol * sqrt(notional / ADV) * 10000.
+    CapWeight scales a target weight down to the largest notional that keeps the impact under `max_impact_bps`,
+    stays under `max_adv_fraction` of ADV and can be worked at the execution participation rate inside the
+    entry window given the profile's expected volume.
+    """
+    BUCKET_MINUTES = 30
+    BUCKETS = 13  # 9:30 - 16:00
+
+    def __init__(self, algorithm, adv_days=20, impact_coefficient=1.0, max_impact_bps=50, max_adv_fraction=0.01,
+                 pool_size=100, vol_decay=0.94, profile_decay=0.9, default_daily_vol=0.04):
+        self.algorithm = algorithm
+        self.adv_days = adv_days
+        self.impact_coefficient = impact_coefficient
+        self.max_impact_bps = max_impact_bps
+        self.max_adv_fraction = max_adv_fraction
+        self.pool_size = pool_size
+        self.vol_decay = vol_decay
+        self.profile_decay = profile_decay
+        self.default_daily_vol = default_daily_vol
+        self.dollar_volumes = {}  # symbol -> [deque of daily dollar volume, running sum]
+        self.variances = {}       # symbol -> [EWMA variance of daily log returns, last price]
+        self.profiles = {}        # symbol -> EWMA shares per minute, per 30-minute bucket
+
+    def UpdateCoarse(self, ranked_coarse):
+        dollar_volumes = {}
+        variances = {}
+        for c in ranked_coarse[:self.pool_size]:
+            window = self.dollar_volumes.get(c.Symbol)
+            if window is None:
+                window = [deque(maxlen=self.adv_days), 0.0]
+            if len(window[0]) == self.adv_days:
+                window[1] -= window[0][0]
+            window[0].append(c.DollarVolume)
+            window[1] += c.DollarVolume
+            dollar_volumes[c.Symbol] = window
+
+            state = self.variances.get(c.Symbol)
+            if state is None:
+                state = [None, c.Price]
+            elif state[1] > 0 and c.Price > 0:
+                squared_return = math.log(c.Price / state[1]) ** 2
+                state[0] = squared_return if state[0] is None else self.vol_decay * state[0] + (1 - self.vol_decay) * squared_return
+                state[1] = c.Price
+            variances[c.Symbol] = state
+        self.dollar_volumes = dollar_volumes
+        self.variances = variances
+        self.profiles = {s: p for s, p in self.profiles.items() if s in dollar_volumes}
+
+    def UpdateBars(self, data):
+        for symbol, bar in data.Bars.items():
+            if symbol not in self.dollar_volumes:
+                continue
+            bucket = ((bar.Time.hour - 9) * 60 + bar.Time.minute - 30) // self.BUCKET_MINUTES
+            if not 0 <= bucket < self.BUCKETS:
+                continue
+            bar_minutes = max(1.0, (bar.EndTime - bar.Time).total_seconds() / 60)
+            volume_per_minute = bar.Volume / bar_minutes
+            profile = self.profiles.get(symbol)
+            if profile is None:
+                profile = self.profiles[symbol] = [None] * self.BUCKETS
+            previous = profile[bucket]
+            profile[bucket] = volume_per_minute if previous is None else self.profile_decay * previous + (1 - self.profile_decay) * volume_per_minute
+
+    def AverageDollarVolume(self, symbol):
+        window = self.dollar_volumes.get(symbol)
+        return window[1] / len(window[0]) if window and window[0] else 0.0
+
+    def DailyVol(self, symbol):
+        state = self.variances.get(symbol)
+        return math.sqrt(state[0]) if state and state[0] else self.default_daily_vol
+
+    def ImpactBps(self, symbol, notional):
+        adv = self.AverageDollarVolume(symbol)
+        if adv <= 0:
+            return float('inf')
+        return self.impact_coefficient * self.DailyVol(symbol) * math.sqrt(abs(notional) / adv) * 10000
+
+    def WindowCapacity(self, symbol, minutes, participation_rate):
+        """Dollars that can be worked over the next `minutes` at `participation_rate`, from the intraday profile."""
+        profile = self.profiles.get(symbol)
+        now = self.algorithm.Time
+        bucket = ((now.hour - 9) * 60 + now.minute - 30) // self.BUCKET_MINUTES
+        if profile is None or not 0 <= bucket < self.BUCKETS or profile[bucket] is None:
+            return float('inf')
+        return participation_rate * profile[bucket] * minutes * self.algorithm.Securities[symbol].Price
+
+    def CapWeight(self, symbol, weight, total_value):
+        algorithm = self.algorithm
+        adv = self.AverageDollarVolume(symbol)
+        if adv <= 0 or total_value <= 0:
+            return weight  # No liquidity history yet (e.g. right after a restart), keep the flat allocation
+
+        impact_limit = (self.max_impact_bps / (self.impact_coefficient * self.DailyVol(symbol) * 10000)) ** 2 * adv
+        notional = min(weight * total_value, impact_limit, self.max_adv_fraction * adv,
+                       self.WindowCapacity(symbol, algorithm.ENTRY_SLICE_MINUTES, algorithm.PARTICIPATION_RATE))
+        capped = notional / total_value
+        if capped < weight:
+            algorithm.log_sink.Info("CAPACITY", "{}: weight {:.2%} -> {:.2%} (ADV ${:,.0f}, impact {:.1f} bps)",
+                                    symbol.Value, weight, capped, adv, self.ImpactBps(symbol, notional))
+        return capped
+
+
+class UniverseIndicatorEngine:
+    """
+    Daily indicators for the whole universe in 2-D NumPy arrays (one row per symbol, one column per day).
+    - Intraday bars are folded into today's high/low/close vectors. The first bar of a new day commits
+      yesterday as one ring-buffer column for every row at once (rows without a bar carry their close forward).
+    - SMA, ATR (simple average true range), annualized realized vol and RSI (Cutler, simple averages) are then
+      recomputed for all rows in one vectorized pass over the window, so no per-symbol state needs seeding.
+    - Rows are allocated when a symbol joins the universe (seeded from one batched History call) and freed
+      when it leaves. The arrays double when they run out of rows.
+    """
+    def __init__(self, algorithm, sma_period=50, atr_period=14, vol_period=20, rsi_period=14, capacity=64):
+        self.algorithm = algorithm
+        self.sma_period = sma_period
+        self.atr_period = atr_period
+        self.vol_period = vol_period
+        self.rsi_period = rsi_period
+        self.window = max(sma_period, atr_period + 1, vol_period + 1, rsi_period + 1)
+        self.rows = {}  # symbol -> row
+        self.free_rows = list(range(capacity - 1, -1, -1))
+        self.highs = np.full((capacity, self.window), np.nan)
+        self.lows = np.full((capacity, self.window), np.nan)
+        self.closes = np.full((capacity, self.window), np.nan)
+        self.counts = np.zeros(capacity, dtype=int)  # committed days per row, capped at the window
+        self.position = self.window - 1              # column of the latest committed day
+        self.day = None
+        self.day_high = np.full(capacity, np.nan)
+        self.day_low = np.full(capacity, np.nan)
+        self.day_close = np.full(capacity, np.nan)
+        self.sma = np.full(capacity, np.nan)
+        self.atr = np.full(capacity, np.nan)
+        self.realized_vol = np.full(capacity, np.nan)
+        self.rsi = np.full(capacity, np.nan)
+
+    def Grow(self):
+        capacity = len(self.counts)
+        def extend(array, fill=np.nan):
+            return np.concatenate([array, np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)])
+        self.highs, self.lows, self.closes = extend(self.highs), extend(self.lows), extend(self.closes)
+        self.counts = extend(self.counts, 0)
+        self.day_high, self.day_low, self.day_close = extend(self.day_high), extend(self.day_low), extend(self.day_close)
+        self.sma, self.atr, self.realized_vol, self.rsi = extend(self.sma), extend(self.atr), extend(self.realized_vol), extend(self.rsi)
+        self.free_rows = list(range(2 * capacity - 1, capacity - 1, -1)) + self.free_rows
+
+    def Add(self, symbols):
+        new_symbols = [s for s in symbols if s not in self.rows]
+        for symbol in new_symbols:
+            if not self.free_rows:
+                self.Grow()
+            self.rows[symbol] = self.free_rows.pop()
+        if not new_symbols:
+            return
+
+        # Names usually join at the universe selection before the day's first bar: commit the previous day first
+        # so the seed's newest bar (that day) lands in its own column instead of the one before it
+        self.Roll(self.algorithm.Time.date())
+        history = self.algorithm.History(new_symbols, self.window, Resolution.Daily)
+        if history.empty:
+            return
+        seeded = set(history.index.get_level_values(0))
+        for symbol in new_symbols:
+            if symbol in seeded:
+                frame = history.loc[symbol]
+                self.Seed(self.rows[symbol], frame['high'].values, frame['low'].values, frame['close'].values)
+        self.Compute()
+
+    def Seed(self, row, highs, lows, closes):
+        """Right-align a row's daily history so its newest bar sits in the latest committed column."""
+        count = min(len(closes), self.window)
+        columns = (self.position - np.arange(count)[::-1]) % self.window
+        self.highs[row, columns] = highs[-count:]
+        self.lows[row, columns] = lows[-count:]
+        self.closes[row, columns] = closes[-count:]
+        self.counts[row] = count
+
+    def Remove(self, symbol):
+        row = self.rows.pop(symbol, None)
+        if row is None:
+            return
+        for array in (self.highs, self.lows, self.closes):
+            array[row] = np.nan
+        for array in (self.day_high, self.day_low, self.day_close, self.sma, self.atr, self.realized_vol, self.rsi):
+            array[row] = np.nan
+        self.counts[row] = 0
+        self.free_rows.append(row)
+
+    def Roll(self, today):
+        """Commit the pending day once the algorithm has moved past it."""
+        if self.day != today:
+            if self.day is not None:
+                self.Commit()
+            self.day = today
+
+    def OnBars(self, bars):
+        self.Roll(self.algorithm.Time.date())
+
+        rows, highs, lows, closes = [], [], [], []
+        for symbol, bar in bars.items():
+            row = self.rows.get(symbol)
+            if row is not None:
+                rows.append(row)
+                highs.append(bar.High)
+                lows.append(bar.Low)
+                closes.append(bar.Close)
+        if not rows:
+            return
+        rows = np.array(rows)
+        self.day_high[rows] = np.fmax(self.day_high[rows], np.array(highs, dtype=float))
+        self.day_low[rows] = np.fmin(self.day_low[rows], np.array(lows, dtype=float))
+        self.day_close[rows] = np.array(closes, dtype=float)
+
+    def Commit(self):
+        """Write the day that just ended as one column for all rows and refresh the indicators."""
+        has_bar = ~np.isnan(self.day_close)
+        carried = ~has_bar & (self.counts > 0)
+        last_close = self.closes[:, self.position]
+
+        self.position = (self.position + 1) % self.window
+        self.closes[:, self.position] = np.where(has_bar, self.day_close, last_close)
+        self.highs[:, self.position] = np.where(has_bar, self.day_high, last_close)
+        self.lows[:, self.position] = np.where(has_bar, self.day_low, last_close)
+        self.counts = np.where(has_bar | carried, np.minimum(self.counts + 1, self.window), self.counts)
+
+        self.day_high.fill(np.nan)
+        self.day_low.fill(np.nan)
+        self.day_close.fill(np.nan)
+        self.Compute()
+
+    def Compute(self):
+        order = (self.position - np.arange(self.window)) % self.window  # newest first
+        closes = self.closes[:, order]
+        highs = self.highs[:, order]
+        lows = self.lows[:, order]
+        previous = closes[:, 1:]
+        counts = self.counts
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            n = self.sma_period
+            self.sma = np.where(counts >= n, closes[:, :n].mean(axis=1), np.nan)
+
+            n = self.atr_period
+            true_range = np.maximum(highs[:, :-1] - lows[:, :-1],
+                                    np.maximum(np.abs(highs[:, :-1] - previous), np.abs(lows[:, :-1] - previous)))
+            self.atr = np.where(counts > n, true_range[:, :n].mean(axis=1), np.nan)
+
+            n = self.vol_period
+            log_returns = np.log(closes[:, :-1] / previous)
+            self.realized_vol = np.where(counts > n, log_returns[:, :n].std(axis=1, ddof=1) * np.sqrt(252), np.nan)
+
+            n = self.rsi_period
+            changes = closes[:, :n] - previous[:, :n]
+            average_gain = np.clip(changes, 0, None).mean(axis=1)
+            average_loss = np.clip(-changes, 0, None).mean(axis=1)
+            rsi = np.where(average_loss > 0, 100 - 100 / (1 + average_gain / average_loss), 100.0)
+            self.rsi = np.where(counts > n, rsi, np.nan)
+
+    def Value(self, name, symbol):
+        """Latest value of 'sma', 'atr', 'realized_vol' or 'rsi' for a symbol, None until it is ready."""
+        row = self.rows.get(symbol)
+        if row is None:
+            return None
+        value = getattr(self, name)[row]
+        return None if np.isnan(value) else float(value)
+
+    def AboveTrend(self, symbol):
+        """Close above the SMA. Symbols without enough history pass so a fresh universe name is not blocked."""
+        row = self.rows.get(symbol)
+        if row is None or np.isnan(self.sma[row]):
+            return True
+        return bool(self.closes[row, self.position] > self.sma[row])
+
+
+class CorrelationTracker:
+    """
+    Streaming exponentially weighted covariance of bar returns, benchmark (SPY) in row 0.
+    On every slice with a benchmark bar, the return vector x of all tracked rows (last price vs current price,
+    0 when a name did not trade) updates the mean and covariance with one rank-1 step:
+        d = x - mean;  mean += (1 - decay) * d;  cov = decay * (cov + (1 - decay) * outer(d, d))
+    That is O(n^2) per bar with no history refetch. Correlations, betas and the averages derived from them are
+    cached until the next update, so the screen, the summary and risk checks can read them for free.
+    """
+    def __init__(self, algorithm, benchmark, halflife_bars=70, capacity=64):
+        self.algorithm = algorithm
+        self.benchmark = benchmark
+        self.decay = 0.5 ** (1.0 / halflife_bars)
+        self.rows = {benchmark: 0}
+        self.free_rows = list(range(capacity - 1, 0, -1))
+        self.mean = np.zeros(capacity)
+        self.cov = np.zeros((capacity, capacity))
+        self.last_prices = np.full(capacity, np.nan)
+        self.updates = 0
+        self.correlation = None  # cached correlation matrix, None when stale
+
+    def Add(self, symbols):
+        for symbol in symbols:
+            if symbol in self.rows:
+                continue
+            if not self.free_rows:
+                self.Grow()
+            self.rows[symbol] = self.free_rows.pop()
+
+    def Remove(self, symbol):
+        row = self.rows.pop(symbol, None)
+        if row is None or row == 0:
+            return
+        self.mean[row] = 0
+        self.cov[row, :] = 0
+        self.cov[:, row] = 0
+        self.last_prices[row] = np.nan
+        self.free_rows.append(row)
+        self.correlation = None
+
+    def Grow(self):
+        capacity = len(self.mean)
+        cov = np.zeros((2 * capacity, 2 * capacity))
+        cov[:capacity, :capacity] = self.cov
+        self.cov = cov
+        self.mean = np.concatenate([self.mean, np.zeros(capacity)])
+        self.last_prices = np.concatenate([self.last_prices, np.full(capacity, np.nan)])
+        self.free_rows = list(range(2 * capacity - 1, capacity - 1, -1)) + self.free_rows
+
+    def OnData(self, data):
+        if not data.Bars.ContainsKey(self.benchmark):
+            return
+        securities = self.algorithm.Securities
+        prices = np.full(len(self.mean), np.nan)
+        for symbol, row in self.rows.items():
+            if securities.ContainsKey(symbol):
+                prices[row] = securities[symbol].Price
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = prices / self.last_prices - 1
+        returns[~np.isfinite(returns)] = 0
+        self.last_prices = np.where(prices > 0, prices, self.last_prices)
+
+        deviation = returns - self.mean
+        self.mean += (1 - self.decay) * deviation
+        self.cov = self.decay * (self.cov + (1 - self.decay) * np.outer(deviation, deviation))
+        self.updates += 1
+        self.correlation = None
+
+    def Correlation(self):
+        if self.correlation is None:
+            std = np.sqrt(np.diag(self.cov))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.correlation = self.cov / np.outer(std, std)
+        return self.correlation
+
+    def Beta(self, symbol):
+        row = self.rows.get(symbol)
+        benchmark_variance = self.cov[0, 0]
+        if row is None or benchmark_variance <= 0:
+            return None
+        return float(self.cov[row, 0] / benchmark_variance)
+
+    def AverageCorrelation(self, symbols):
+        """Mean off-diagonal correlation among `symbols` (0 until there is enough data)."""
+        rows = [self.rows[s] for s in symbols if s in self.rows and self.rows[s] != 0]
+        if len(rows) < 2:
+            return 0.0
+        block = self.Correlation()[np.ix_(rows, rows)]
+        off_diagonal = block[~np.eye(len(rows), dtype=bool)]
+        off_diagonal = off_diagonal[np.isfinite(off_diagonal)]
+        return float(off_diagonal.mean()) if len(off_diagonal) else 0.0
+
+    def PortfolioBeta(self):
+        """Holdings-weighted beta to SPY. Names without a beta yet count as 1."""
+        portfolio = self.algorithm.Portfolio
+        total_value = portfolio.TotalPortfolioValue
+        if total_value <= 0:
+            return 0.0
+        beta = 0.0
+        for holding in portfolio.Values:
+            if holding.Invested and holding.Type == SecurityType.Equity:
+                symbol_beta = 1.0 if holding.Symbol == self.benchmark else self.Beta(holding.Symbol)
+                beta += (holding.HoldingsValue / total_value) * (1.0 if symbol_beta is None else symbol_beta)
+        return beta
+
+
+RiskDecision = namedtuple("RiskDecision", ["daily_pnl", "monthly_pnl", "kill", "orders"])
+
+
+class PortfolioRiskEngine:
+    """
+    Position, exposure and P&L state in NumPy arrays (one row per traded symbol), updated from fills and prices.
+    Evaluate() runs every rule in one vectorized pass:
+    - daily loss limit against the start-of-day anchor -> kill switch (liquidate, pause for the day)
+    - monthly loss limit against the start-of-month anchor -> ReductionScale() is 0.5 for the rest of the month
+    - consecutive losing round trips (counted on fills) -> HaltNewEntries() until next month
+    - per-position caps on capped rows (everything except `uncapped`, i.e. SPY/XLU): exit when the open loss exceeds
+      `max_trade_loss` of the account, trim back to `max_position_percent` when a position grows past it
+    `invested_count`, the anchors and the halt flags are plain attributes, so the summary and the kill switch read them in O(1).
+    The daily anchor lives on the algorithm (portfolio_value_at_start_of_day / last_loss_limit_date). Both anchors and the halt
+    flags are checkpointed (StrategyCheckpoint), and a checkpoint is written as soon as a limit trips, so a restart within
+    the month keeps the halt in force.
+    """
+    def __init__(self, algorithm, daily_loss_limit=-0.05, monthly_loss_limit=-0.05, max_consecutive_losses=3,
+                 max_trade_loss=0.01, max_position_percent=0.05, uncapped=(), capacity=64):
+        self.algorithm = algorithm
+        self.daily_loss_limit = daily_loss_limit
+        self.monthly_loss_limit = monthly_loss_limit
+        self.max_consecutive_losses = max_consecutive_losses
+        self.max_trade_loss = max_trade_loss
+        self.max_position_percent = max_position_percent
+        self.uncapped = set(uncapped)
+        self.rows = {}
+        self.symbols = [None] * capacity
+        self.quantity = np.zeros(capacity)
+        self.average_price = np.zeros(capacity)
+        self.prices = np.zeros(capacity)
+        self.trade_pnl = np.zeros(capacity)  # realized P&L of the round trip in progress
+        self.capped = np.zeros(capacity, dtype=bool)
+        self.invested_count = 0
+        self.consecutive_losses = 0
+        self.month = None
+        self.month_start_value = 0.0
+        self.monthly_breached = False
+        self.synced = False
+
+    def Row(self, symbol):
+        row = self.rows.get(symbol)
+        if row is not None:
+            return row
+        row = len(self.rows)
+        if row == len(self.quantity):
+            capacity = len(self.quantity)
+            self.symbols += [None] * capacity
+            self.quantity, self.average_price, self.prices, self.trade_pnl = (
+                np.concatenate([a, np.zeros(capacity)]) for a in (self.quantity, self.average_price, self.prices, self.trade_pnl))
+            self.capped = np.concatenate([self.capped, np.zeros(capacity, dtype=bool)])
+        self.rows[symbol] = row
+        self.symbols[row] = symbol
+        self.capped[row] = symbol not in self.uncapped
+        return row
+
+    def Sync(self):
+        """Seed the arrays from the brokerage portfolio, e.g. after a restart restored from a checkpoint."""
+        for holding in self.algorithm.Portfolio.Values:
+            if holding.Invested and holding.Type == SecurityType.Equity:
+                row = self.Row(holding.Symbol)
+                self.quantity[row] = holding.Quantity
+                self.average_price[row] = holding.AveragePrice
+        self.invested_count = int(np.count_nonzero(self.quantity))
+        self.synced = True
+
+    def OnFill(self, symbol, fill_quantity, fill_price):
+        if not self.synced:
+            self.Sync()
+            return  # Sync already read the post-fill holding
+        row = self.Row(symbol)
+        fill_quantity = float(fill_quantity)
+        fill_price = float(fill_price)
+        previous = self.quantity[row]
+        current = previous + fill_quantity
+
+        if previous == 0 or (previous > 0) == (fill_quantity > 0):
+            self.average_price[row] = (self.average_price[row] * previous + fill_price * fill_quantity) / current
+        else:
+            closed = min(abs(fill_quantity), abs(previous))
+            self.trade_pnl[row] += (fill_price - self.average_price[row]) * closed * np.sign(previous)
+            if abs(fill_quantity) > abs(previous):
+                self.average_price[row] = fill_price  # flipped through zero
+        self.quantity[row] = current
+
+        if current == 0:
+            if self.capped[row]:
+                self.consecutive_losses = self.consecutive_losses + 1 if self.trade_pnl[row] < 0 else 0
+                if self.consecutive_losses == self.max_consecutive_losses:
+                    self.algorithm.SaveCheckpoint()
+            self.trade_pnl[row] = 0
+            self.average_price[row] = 0
+        if (previous == 0) != (current == 0):
+            self.invested_count += 1 if current != 0 else -1
+
+    def HaltNewEntries(self):
+        return self.consecutive_losses >= self.max_consecutive_losses
+
+    def ReductionScale(self):
+        return 0.5 if self.monthly_breached else 1.0
+
+    def Evaluate(self):
+        algorithm = self.algorithm
+        if not self.synced:
+            self.Sync()
+        total_value = float(algorithm.Portfolio.TotalPortfolioValue)
+        today = algorithm.Time.date()
+
+        # Anchors: start of day (kept on the algorithm for the checkpoint) and start of month
+        if algorithm.portfolio_value_at_start_of_day == 0 or algorithm.last_loss_limit_date is None or today > algorithm.last_loss_limit_date:
+            algorithm.portfolio_value_at_start_of_day = total_value
+            algorithm.last_loss_limit_date = today
+        if self.month != (today.year, today.month):
+            self.month = (today.year, today.month)
+            self.month_start_value = total_value
+            self.monthly_breached = False
+            self.consecutive_losses = 0
+
+        day_start = algorithm.portfolio_value_at_start_of_day
+        daily_pnl = (total_value - day_start) / day_start if day_start > 0 else 0.0
+        monthly_pnl = (total_value - self.month_start_value) / self.month_start_value if self.month_start_value > 0 else 0.0
+        if daily_pnl < self.daily_loss_limit:
+            return RiskDecision(daily_pnl, monthly_pnl, True, [])
+        if monthly_pnl < self.monthly_loss_limit and not self.monthly_breached:
+            self.monthly_breached = True
+            algorithm.log_sink.Warn("RISK", "Monthly loss {:.2%} < limit {:.2%}. New positions halved for the rest of the month.",
+                                    monthly_pnl, self.monthly_loss_limit)
+            algorithm.SaveCheckpoint()
+
+        held = np.flatnonzero(self.quantity)
+        if len(held) == 0 or total_value <= 0:
+            return RiskDecision(daily_pnl, monthly_pnl, False, [])
+        securities = algorithm.Securities
+        self.prices[held] = [securities[self.symbols[row]].Price for row in held]
+
+        quantity = self.quantity[held]
+        prices = self.prices[held]
+        values = quantity * prices
+        open_pnl = quantity * (prices - self.average_price[held])
+        capped = self.capped[held]
+        exits = capped & (open_pnl < -self.max_trade_loss * total_value)
+        trims = capped & ~exits & (np.abs(values) > self.max_position_percent * total_value) & (prices > 0)
+
+        orders = [(self.symbols[row], int(-quantity[i]), "MaxTradeLoss") for i, row in enumerate(held) if exits[i]]
+        for i in np.flatnonzero(trims):
+            target = np.sign(quantity[i]) * int(self.max_position_percent * total_value / prices[i])
+            orders.append((self.symbols[held[i]], int(target - quantity[i]), "PositionCap"))
+        return RiskDecision(daily_pnl, monthly_pnl, False, orders)
+
+
+class OptionCoverageMonitor:
+    """
+    Per underlying, per session minute record of the option data the screen depends on:
+    - `arrived` / `valid_iv`: bitmaps (7 uint64 words = 390 minutes per row) set with one OR per chain.
+    - `contracts`: contract count of the last chain seen in each minute.
+    - `first_valid`: minute of the first usable ATM IV, i.e. the latency from the open.
+    Rows are handed out as underlyings are expected (the staged shortlist) or first seen, and everything is cleared
+    at the start of each day. Report() renders the day as a text heatmap (one cell per `bucket_minutes`) and lists
+    the names that starved the screen; live runs also store the heatmap as CSV in the ObjectStore.
+    """
+    SESSION_MINUTES = 390
+    WORDS = (SESSION_MINUTES + 63) // 64
+    SHADES = " .:-=+*#%@"
+
+    def __init__(self, algorithm, bucket_minutes=30, key_prefix="memestocks/coverage", capacity=64):
+        self.algorithm = algorithm
+        self.bucket_minutes = bucket_minutes
+        self.key_prefix = key_prefix
+        self.rows = {}
+        self.day = None
+        self.arrived = np.zeros((capacity, self.WORDS), dtype=np.uint64)
+        self.valid_iv = np.zeros((capacity, self.WORDS), dtype=np.uint64)
+        self.contracts = np.zeros((capacity, self.SESSION_MINUTES), dtype=np.uint16)
+        self.first_valid = np.full(capacity, -1, dtype=np.int16)
+
+    def SessionMinute(self):
+        time = self.algorithm.Time
+        minute = time.hour * 60 + time.minute - (9 * 60 + 30) - 1  # the bar ending 9:31 is minute 0
+        return minute if 0 <= minute < self.SESSION_MINUTES else None
+
+    def Row(self, symbol):
+        today = self.algorithm.Time.date()
+        if today != self.day:
+            self.Reset(today)
+        row = self.rows.get(symbol)
+        if row is None:
+            row = self.rows[symbol] = len(self.rows)
+            if row >= len(self.first_valid):
+                self.Grow()
+        return row
+
+    def Reset(self, day):
+        self.day = day
+        self.rows = {}
+        self.arrived[:] = 0
+        self.valid_iv[:] = 0
+        self.contracts[:] = 0
+        self.first_valid[:] = -1
+
+    def Grow(self):
+        capacity = len(self.first_valid)
+        self.arrived = np.vstack([self.arrived, np.zeros_like(self.arrived)])
+        self.valid_iv = np.vstack([self.valid_iv, np.zeros_like(self.valid_iv)])
+        self.contracts = np.vstack([self.contracts, np.zeros_like(self.contracts)])
+        self.first_valid = np.concatenate([self.first_valid, np.full(capacity, -1, dtype=np.int16)])
+
+    def Expect(self, symbols):
+        """Register underlyings whose chains should arrive, so a chain that never shows up is still reported."""
+        for symbol in symbols:
+            self.Row(symbol)
+
+    def OnChain(self, symbol, contract_count, iv_valid):
+        minute = self.SessionMinute()
+        if minute is None:
+            return
+        row = self.Row(symbol)
+        word, bit = minute >> 6, np.uint64(1 << (minute & 63))
+        self.arrived[row, word] |= bit
+        self.contracts[row, minute] = min(contract_count, 65535)
+        if iv_valid:
+            self.valid_iv[row, word] |= bit
+            if self.first_valid[row] < 0:
+                self.first_valid[row] = minute + 1
+
+    def Bits(self, bitmap):
+        """Unpack a bitmap into a (rows, 390) boolean matrix."""
+        rows = len(self.rows)
+        as_bytes = bitmap[:rows].astype("<u8").view(np.uint8).reshape(rows, -1)
+        return np.unpackbits(as_bytes, axis=1, bitorder="little")[:, :self.SESSION_MINUTES].astype(bool)
+
+    def Heatmap(self):
+        """Fraction of minutes with a valid ATM IV per underlying and bucket -> (symbols, matrix)."""
+        symbols = sorted(self.rows, key=self.rows.get)
+        valid = self.Bits(self.valid_iv)
+        buckets = -(-self.SESSION_MINUTES // self.bucket_minutes)
+        padded = np.zeros((len(symbols), buckets * self.bucket_minutes), dtype=bool)
+        padded[:, :self.SESSION_MINUTES] = valid
+        return symbols, padded.reshape(len(symbols), buckets, self.bucket_minutes).mean(axis=2)
+
+    def Starved(self):
+        """Expected underlyings without a single valid IV today."""
+        return [symbol for symbol, row in self.rows.items() if self.first_valid[row] < 0]
+
+    def StarvedNames(self):
+        return ", ".join(symbol.Value for symbol in self.Starved()) or "-"
+
+    def Report(self):
+        if not self.rows:
+            return ""
+        symbols, heatmap = self.Heatmap()
+        arrived = self.Bits(self.arrived).sum(axis=1)
+        valid = self.Bits(self.valid_iv).sum(axis=1)
+        lines = [f"{self.day} option coverage, {len(symbols)} underlyings, {self.bucket_minutes}m cells from 9:30:"]
+        for row, symbol in enumerate(symbols):
+            shades = "".join(self.SHADES[int(round(v * (len(self.SHADES) - 1)))] for v in heatmap[row])
+            seen = self.contracts[row][self.contracts[row] > 0]
+            latency = f"{self.first_valid[row]}m" if self.first_valid[row] >= 0 else "never"
+            lines.append(f"{symbol.Value:<6}|{shades}| chains {arrived[row]}m, valid IV {valid[row]}m, "
+                         f"first IV {latency}, contracts {int(seen.mean()) if seen.size else 0}")
+        starved = self.Starved()
+        if starved:
+            lines.append(f"No valid IV: {', '.join(s.Value for s in starved)}")
+        if self.algorithm.LiveMode:
+            self.Save(symbols, heatmap)
+        return "\n".join(lines)
+
+    def Save(self, symbols, heatmap):
+        rows = ["symbol," + ",".join(str(i * self.bucket_minutes) for i in range(heatmap.shape[1]))]
+        rows += [symbol.Value + "," + ",".join(f"{v:.2f}" for v in heatmap[row]) for row, symbol in enumerate(symbols)]
+        self.algorithm.ObjectStore.Save(f"{self.key_prefix}/{self.day:%Y%m%d}.csv", "\n".join(rows))
+
+
+class MemoryBudgetGuard:
+    """
+    Opt-in memory monitor (MEMORY_GUARD_ENABLED), sampled on a schedule so it costs nothing per bar.
+    - Every sample: process RSS (/proc/self/statm, peak RSS from getrusage as a fallback) and the size of the
+      long-lived structures (iv_cache, previous_iv, trade_dates, chain volumes, log buffer, staged chains, orders).
+    - Every `snapshot_every` samples: a tracemalloc snapshot (1 frame per trace, which keeps the tracing overhead low)
+      with the top `top_n` allocation sites grouped by component: the class of this file they were made in, or the
+      module file for library allocations.
+    - Once RSS passes `shed_fraction` of `budget_mb`: flush the log buffer, drop cached IV / chain data for names
+      no longer in the universe and trade dates of closed positions, then collect garbage.
+    """
+    def __init__(self, algorithm, enabled=False, budget_mb=1024, shed_fraction=0.85, top_n=8, snapshot_every=4):
+        self.algorithm = algorithm
+        self.enabled = enabled
+        self.budget_mb = budget_mb
+        self.shed_fraction = shed_fraction
+        self.top_n = top_n
+        self.snapshot_every = snapshot_every
+        self.samples = 0
+        self.sheds = 0
+        self.last_rss_mb = 0.0
+        self.peak_rss_mb = 0.0
+        self.source_file = None
+        self.class_lines = []   # first line of each class in this file, sorted...
+        self.class_names = []   # ...and its name
+        if enabled:
+            self.Start()
+
+    def Start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        self.source_file = globals().get("__file__")
+        try:
+            with open(self.source_file) as source:
+                for number, line in enumerate(source, 1):
+                    if line.startswith("class "):
+                        self.class_lines.append(number)
+                        self.class_names.append(line[6:].split("(")[0].split(":")[0].strip())
+        except (OSError, TypeError):
+            self.class_lines, self.class_names = [], []
+
+    @staticmethod
+    def RssMb():
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+        except (OSError, ValueError, IndexError):
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def StructureSizes(self):
+        """(name, entries, shallow bytes) of the structures that live for the whole run."""
+        algorithm = self.algorithm
+        structures = [
+            ("iv_cache", algorithm.iv_cache),
+            ("previous_iv", algorithm.previous_iv),
+            ("trade_dates", algorithm.trade_dates),
+            ("chain_volumes", algorithm.chain_volumes),
+            ("log_buffer", algorithm.log_sink.buffer),
+            ("log_tags", algorithm.log_sink.last_key),
+            ("staged_chains", algorithm.option_stager.subscribed),
+            ("child_orders", algorithm.execution_engine.child_orders),
+        ]
+        return [(name, len(value), sys.getsizeof(value)) for name, value in structures]
+
+    def Component(self, frame):
+        if frame.filename != self.source_file or not self.class_lines:
+            return os.path.basename(frame.filename)
+        index = bisect.bisect_right(self.class_lines, frame.lineno) - 1
+        return self.class_names[index] if index >= 0 else "module"
+
+    def TopComponents(self):
+        totals = {}
+        for statistic in tracemalloc.take_snapshot().statistics("lineno"):
+            component = self.Component(statistic.traceback[0])
+            totals[component] = totals.get(component, 0) + statistic.size
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:self.top_n]
+
+    def Sample(self):
+        if not self.enabled:
+            return
+        self.samples += 1
+        self.last_rss_mb = self.RssMb()
+        self.peak_rss_mb = max(self.peak_rss_mb, self.last_rss_mb)
+        log_sink = self.algorithm.log_sink
+        if self.last_rss_mb >= self.shed_fraction * self.budget_mb:
+            dropped = self.Shed()
+            log_sink.Warn("MEMORY", "RSS {:.0f}MB >= {:.0%} of the {}MB budget. Shed {} cached entries, now {:.0f}MB.",
+                          self.last_rss_mb, self.shed_fraction, self.budget_mb, dropped, self.RssMb())
+        if self.samples % self.snapshot_every == 0:
+            top = ", ".join(f"{name} {size / 2 ** 20:.1f}MB" for name, size in self.TopComponents())
+            log_sink.Info("MEMORY", "RSS {:.0f}MB. Top allocations: {}", self.last_rss_mb, top)
+
+    def Shed(self):
+        algorithm = self.algorithm
+        algorithm.log_sink.Flush()
+        active = algorithm.lifecycle.active_symbols
+        dropped = 0
+        for cache in (algorithm.iv_cache, algorithm.previous_iv, algorithm.chain_volumes):
+            stale = [symbol for symbol in cache if symbol not in active]
+            for symbol in stale:
+                del cache[symbol]
+            dropped += len(stale)
+        closed = [symbol for symbol in algorithm.trade_dates if not algorithm.Portfolio[symbol].Invested]
+        for symbol in closed:
+            del algorithm.trade_dates[symbol]
+        dropped += len(closed)
+        gc.collect()
+        self.sheds += 1
+        return dropped
+
+    def Report(self):
+        sizes = ", ".join(f"{name} {entries}" for name, entries, _ in self.StructureSizes())
+        return (f"RSS {self.last_rss_mb:.0f}MB (peak {self.peak_rss_mb:.0f}MB) of {self.budget_mb}MB budget, "
+                f"{self.sheds} sheds | {sizes}")
+
+
+class StartupProfiler:
+    """
+    Cold-start timings, from module load to the first tradable bar.
+    - Imports: AlgorithmImports and the whole import header, measured where they run (module level).
+    - Initialize: Mark(name) records the time since the previous mark, one entry per Initialize section.
+    - Deploy-to-first-bar: module load to the first slice, and to the first slice after warmup. A live restart
+      that restores a checkpoint skips the warmup, so the two are close; a cold start pays the 7-day warmup.
+    Reported once. Live runs append the figures to a CSV in the ObjectStore so restarts can be compared.
+    """
+    def __init__(self, algorithm, key="memestocks/startup.csv"):
+        self.algorithm = algorithm
+        self.key = key
+        self.sections = []  # (Initialize section, seconds)
+        self.last_mark = timeit.default_timer()
+        self.first_bar_seconds = None
+        self.first_trading_bar_seconds = None
+
+    def Mark(self, name):
+        now = timeit.default_timer()
+        self.sections.append((name, now - self.last_mark))
+        self.last_mark = now
+
+    def OnData(self):
+        if self.first_trading_bar_seconds is not None:
+            return
+        elapsed = timeit.default_timer() - MODULE_LOAD_STARTED
+        if self.first_bar_seconds is None:
+            self.first_bar_seconds = elapsed
+        if not self.algorithm.IsWarmingUp:
+            self.first_trading_bar_seconds = elapsed
+            self.Report()
+
+    def Report(self):
+        initialize_seconds = sum(seconds for _, seconds in self.sections)
+        sections = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.sections)
+        self.algorithm.log_sink.Info("STARTUP", "Imports {:.2f}s (AlgorithmImports {:.2f}s) | Initialize {:.2f}s ({}) | "
+                                     "first slice {:.1f}s, first bar after warmup {:.1f}s after deploy",
+                                     MODULE_IMPORTS_SECONDS, ALGORITHM_IMPORTS_SECONDS, initialize_seconds, sections,
+                                     self.first_bar_seconds, self.first_trading_bar_seconds)
+        if not self.algorithm.LiveMode:
+            return
+        store = self.algorithm.ObjectStore
+        history = store.Read(self.key) if store.ContainsKey(self.key) else "deployed,imports,initialize,first_slice,first_trading_bar"
+        row = (f"{self.algorithm.Time:%Y-%m-%d %H:%M},{MODULE_IMPORTS_SECONDS:.3f},{initialize_seconds:.3f},"
+               f"{self.first_bar_seconds:.3f},{self.first_trading_bar_seconds:.3f}")
+        store.Save(self.key, "\n".join(history.splitlines()[-199:] + [row]))
@@ -0,0 +1,190 @@
+"""
+Memory-mapped columnar minute-bar store for offline replays.
+Bars are converted once (from LEAN minute zips or any OHLCV arrays) into one folder per symbol and year:
+    <root>/<SYMBOL>/<YEAR>/time.npy open.npy high.npy low.npy close.npy volume.npy days.npy offsets.npy
+- time is int64 ms since epoch (New York wall clock, like LEAN), prices float64, volume float64.
+- days (int32 day numbers) + offsets (row where each day starts, plus an end sentinel) are the date index,
+  so a time range resolves to a row range with two searchsorted calls.
+- Reads use np.load(mmap_mode="r"): slices are views into the page cache, nothing is parsed or copied, and worker
+  processes that map the same files share those pages. A BarStore pickles as its root path only, so it can be handed
+  to multiprocessing workers, each of which maps the files itself.
+
+Usage (from this folder):
+    python bar_store.py import --data /path/to/lean/Data --store ./bars --symbols GME,AMC --start 2022-01-01 --end 2024-12-31
+    python bar_store.py info --store ./bars --symbols GME
+"""
+import argparse
+import os
+from datetime import date, datetime, timedelta
+from multiprocessing import Pool
+
+import numpy as np
+
+from lean_data import LeanMinuteLoader
+
+FIELDS = ("time", "open", "high", "low", "close", "volume")
+MS_PER_DAY = 86400000
+
+
+def to_ms(value):
+    """datetime / date / datetime64 -> int64 ms since epoch."""
+    return int(np.datetime64(value, "ms").astype(np.int64))
+
+
+class BarStore:
+    def __init__(self, root):
+        self.root = root
+        self.maps = {}  # (symbol, year) -> dict of read-only memmaps
+
+    def __getstate__(self):
+        return {"root": self.root}
+
+    def __setstate__(self, state):
+        self.__init__(state["root"])
+
+    # === Writing ===
+    def folder(self, symbol, year):
+        return os.path.join(self.root, symbol.upper(), str(year))
+
+    def write_year(self, symbol, year, bars):
+        """Store one symbol-year. `bars` is a dict of equal-length arrays with datetime64 or int64 ms "time"."""
+        times = np.asarray(bars["time"])
+        times = times.astype("datetime64[ms]").astype(np.int64) if times.dtype.kind == "M" else times.astype(np.int64)
+        order = np.argsort(times, kind="stable")
+        day_numbers = (times[order] // MS_PER_DAY).astype(np.int32)
+        days, starts = np.unique(day_numbers, return_index=True)
+        columns = {"time": times[order], "days": days,
+                   "offsets": np.append(starts, len(times)).astype(np.int64)}
+        for field in FIELDS[1:]:
+            columns[field] = np.asarray(bars[field], dtype=np.float64)[order]
+
+        folder = self.folder(symbol, year)
+        os.makedirs(folder, exist_ok=True)
+        for name, values in columns.items():
+            temporary = os.path.join(folder, f".{name}.tmp.npy")
+            np.save(temporary, values)
+            os.replace(temporary, os.path.join(folder, f"{name}.npy"))
+        self.maps.pop((symbol.upper(), year), None)
+
+    def import_lean(self, loader, symbol, start, end):
+        """Convert LEAN minute zips for [start, end] into the store, one year file set at a time."""
+        written = 0
+        for year in range(start.year, end.year + 1):
+            day = max(start, date(year, 1, 1))
+            last = min(end, date(year, 12, 31))
+            chunks = []
+            while day <= last:
+                chunk = loader.load_day(symbol, day)
+                if chunk is not None:
+                    chunks.append(chunk)
+                day += timedelta(days=1)
+            if chunks:
+                self.write_year(symbol, year, {f: np.concatenate([c[f] for c in chunks]) for f in FIELDS})
+                written += sum(len(c["time"]) for c in chunks)
+        return written
+
+    # === Reading ===
+    def years(self, symbol):
+        folder = os.path.join(self.root, symbol.upper())
+        if not os.path.isdir(folder):
+            return []
+        return sorted(int(name) for name in os.listdir(folder) if name.isdigit())
+
+    def open_year(self, symbol, year):
+        key = (symbol.upper(), year)
+        if key not in self.maps:
+            folder = self.folder(symbol, year)
+            if not os.path.exists(os.path.join(folder, "offsets.npy")):
+                return None
+            self.maps[key] = {name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r")
+                              for name in FIELDS + ("days", "offsets")}
+        return self.maps[key]
+
+    def row_range(self, year_map, start_ms, end_ms):
+        """Rows of a year whose time is in [start_ms, end_ms), located through the date index."""
+        days, offsets, times = year_map["days"], year_map["offsets"], year_map["time"]
+        first_day = int(np.searchsorted(days, start_ms // MS_PER_DAY, side="left"))
+        last_day = int(np.searchsorted(days, (end_ms - 1) // MS_PER_DAY, side="right"))
+        lo, hi = int(offsets[first_day]), int(offsets[last_day])
+        lo += int(np.searchsorted(times[lo:hi], start_ms, side="left"))
+        hi = lo + int(np.searchsorted(times[lo:hi], end_ms, side="left"))
+        return lo, hi
+
+    def slices(self, symbol, start, end):
+        """Zero-copy views, one dict per year touched by [start, end)."""
+        start_ms, end_ms = to_ms(start), to_ms(end)
+        first_year = np.datetime64(start, "Y").astype(int) + 1970
+        last_year = np.datetime64(np.datetime64(end, "ms") - 1, "Y").astype(int) + 1970
+        views = []
+        for year in self.years(symbol):
+            if first_year <= year <= last_year:
+                year_map = self.open_year(symbol, year)
+                lo, hi = self.row_range(year_map, start_ms, end_ms)
+                if hi > lo:
+                    views.append({field: year_map[field][lo:hi] for field in FIELDS})
+        return views
+
+    def read(self, symbol, start, end):
+        """Bars in [start, end). A view when the range is inside one year, a concatenated copy otherwise."""
+        views = self.slices(symbol, start, end)
+        if not views:
+            return None
+        if len(views) == 1:
+            return views[0]
+        return {field: np.concatenate([v[field] for v in views]) for field in FIELDS}
+
+    def read_many(self, symbols, start, end):
+        return {symbol: bars for symbol in symbols if (bars := self.read(symbol, start, end)) is not None}
+
+    def load(self, symbol, start, bars, max_days=400):
+        """Same interface as LeanMinuteLoader.load, so the store can replace the zip loader in exit_grid."""
+        result = self.read(symbol, start, start + timedelta(days=max_days))
+        if result is None:
+            return None
+        result = {field: values[:bars] for field, values in result.items()}
+        result["time"] = result["time"].astype("datetime64[ms]")
+        return result
+
+    # === Workers ===
+    def map_symbols(self, function, symbols, start, end, processes=None):
+        """Run function(symbol, bars) for each symbol in a process pool; every worker maps the files read-only."""
+        with Pool(processes, initializer=_init_worker, initargs=(self.root,)) as pool:
+            return dict(zip(symbols, pool.starmap(_run_worker, [(function, s, start, end) for s in symbols])))
+
+
+_worker_store = None
+
+
+def _init_worker(root):
+    global _worker_store
+    _worker_store = BarStore(root)
+
+
+def _run_worker(function, symbol, start, end):
+    return function(symbol, _worker_store.read(symbol, start, end))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("import", "info"))
+    parser.add_argument("--store", required=True)
+    parser.add_argument("--symbols", required=True, help="comma separated tickers")
+    parser.add_argument("--data", help="LEAN data root (import)")
+    parser.add_argument("--start", default="2000-01-01")
+    parser.add_argument("--end", default=str(date.today()))
+    args = parser.parse_args()
+
+    store = BarStore(args.store)
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end = datetime.strptime(args.end, "%Y-%m-%d").date()
+    for symbol in args.symbols.split(","):
+        if args.command == "import":
+            print(f"{symbol}: {store.import_lean(LeanMinuteLoader(args.data), symbol, start, end):,} bars")
+            continue
+        for year in store.years(symbol):
+            year_map = store.open_year(symbol, year)
+            print(f"{symbol} {year}: {len(year_map['time']):,} bars over {len(year_map['days'])} days")
+
+
+if __name__ == "__main__":
+    main()
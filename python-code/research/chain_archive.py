@@ -0,0 +1,259 @@
+"""
+Compressed option-chain snapshot archive for local replays.
+One folder per underlying and day (<root>/<UNDERLYING>/<YYYYMMDD>/), every column a .npy file:
+- Contract dictionary, sorted by (expiry, right, strike): expiries and strikes are stored delta-encoded
+  (expiry_delta int16 days, strike_delta int32 in 1/1000 dollars), right int8. A contract is referred to by its row.
+- Snapshots: time_delta (int32 ms), underlying price (float32) and change_offsets into the change columns.
+- Changes: only quotes that differ from the previous snapshot of the same contract are stored
+  (contract id uint16/uint32, bid/ask/last/iv float32, volume/open interest int32, present int8 for listings/delistings).
+Nothing is compressed with a codec, so every column can be memory-mapped; the reader walks the change stream and
+keeps one array per field with the current state, which is all the RAM a replay needs.
+
+ChainArchive.replay / replay_slices yield ChainSnapshot objects that mimic a Slice's OptionChains: iterating one
+gives records with the LEAN attribute names (Strike, Expiry, Right, ImpliedVolatility, Volume, ...), built only when
+iterated. Their arrays are the reader's state and change on the next step; copy() what must outlive it.
+
+Usage (from this folder):
+    python chain_archive.py --archive ./chains --underlyings GME,AMC
+"""
+import argparse
+import heapq
+import os
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+CALL, PUT = 0, 1
+STRIKE_SCALE = 1000
+QUOTE_FIELDS = ("bid", "ask", "last", "iv", "volume", "open_interest")
+QUOTE_TYPES = {"bid": np.float32, "ask": np.float32, "last": np.float32, "iv": np.float32,
+               "volume": np.int32, "open_interest": np.int32}
+EPOCH = date(1970, 1, 1)
+
+OptionContractRecord = namedtuple("OptionContractRecord", [
+    "Expiry", "Strike", "Right", "BidPrice", "AskPrice", "LastPrice", "ImpliedVolatility", "Volume", "OpenInterest",
+    "UnderlyingLastPrice"])
+
+
+class ChainArchiveWriter:
+    """
+    Collects the snapshots of one underlying for one day, then writes them with close().
+    add() takes the chain as arrays: expiry (dates or day numbers), strike, right (0 call / 1 put) and the quote fields.
+    """
+    def __init__(self, root, underlying, day):
+        self.folder = os.path.join(root, underlying.upper(), f"{day:%Y%m%d}")
+        self.ids = {}                                  # (expiry day, strike milli, right) -> provisional id
+        self.state = {field: [] for field in QUOTE_FIELDS}
+        self.present = []
+        self.times, self.prices, self.offsets = [], [], [0]
+        self.changes = {field: [] for field in ("contract", "present") + QUOTE_FIELDS}
+
+    def add(self, time, underlying_price, expiry, strike, right, **quotes):
+        expiry = np.asarray(expiry)
+        expiry_days = ((expiry.astype("datetime64[D]").astype(np.int64)) if expiry.dtype.kind in "MO"
+                       else expiry.astype(np.int64))
+        strike_milli = np.rint(np.asarray(strike, dtype=np.float64) * STRIKE_SCALE).astype(np.int64)
+        right = np.asarray(right, dtype=np.int64)
+        ids = np.empty(len(strike_milli), dtype=np.int64)
+        for row, key in enumerate(zip(expiry_days.tolist(), strike_milli.tolist(), right.tolist())):
+            contract = self.ids.get(key)
+            if contract is None:
+                contract = self.ids[key] = len(self.ids)
+                for field in QUOTE_FIELDS:
+                    self.state[field].append(np.nan)
+                self.present.append(0)
+            ids[row] = contract
+
+        # === Diff against the last state of every contract ===
+        previous = {field: np.asarray(self.state[field], dtype=np.float64)[ids] for field in QUOTE_FIELDS}
+        current = {field: np.asarray(quotes.get(field, np.full(len(ids), np.nan)), dtype=np.float64)
+                   for field in QUOTE_FIELDS}
+        changed = np.asarray(self.present, dtype=np.int64)[ids] == 0
+        for field in QUOTE_FIELDS:
+            same = (previous[field] == current[field]) | (np.isnan(previous[field]) & np.isnan(current[field]))
+            changed |= ~same
+        listed = np.zeros(len(self.present), dtype=bool)
+        listed[ids] = True
+        delisted = np.flatnonzero(np.asarray(self.present, dtype=bool) & ~listed)
+
+        for row in np.flatnonzero(changed):
+            contract = int(ids[row])
+            self.present[contract] = 1
+            self.changes["contract"].append(contract)
+            self.changes["present"].append(1)
+            for field in QUOTE_FIELDS:
+                self.state[field][contract] = current[field][row]
+                self.changes[field].append(current[field][row])
+        for contract in delisted.tolist():
+            self.present[contract] = 0
+            self.changes["contract"].append(contract)
+            self.changes["present"].append(0)
+            for field in QUOTE_FIELDS:
+                self.changes[field].append(np.nan)
+
+        self.times.append(np.datetime64(time, "ms").astype(np.int64))
+        self.prices.append(underlying_price)
+        self.offsets.append(len(self.changes["contract"]))
+
+    def close(self):
+        if not self.times:
+            return 0
+        # Renumber contracts in (expiry, right, strike) order so the dictionary delta-encodes into small integers
+        keys = np.array(list(self.ids.keys()), dtype=np.int64).reshape(-1, 3)
+        provisional = np.array(list(self.ids.values()), dtype=np.int64)
+        order = np.lexsort((keys[:, 1], keys[:, 2], keys[:, 0]))
+        final_id = np.empty(len(order), dtype=np.int64)
+        final_id[provisional[order]] = np.arange(len(order))
+        expiry, strike, right = keys[order, 0], keys[order, 1], keys[order, 2]
+        id_type = np.uint16 if len(order) <= np.iinfo(np.uint16).max else np.uint32
+
+        times = np.array(self.times, dtype=np.int64)
+        columns = {
+            "expiry_delta": np.diff(expiry, prepend=0).astype(np.int32 if expiry[0] > np.iinfo(np.int16).max else np.int16),
+            "strike_delta": np.diff(strike, prepend=0).astype(np.int32),
+            "right": right.astype(np.int8),
+            "start_time": times[:1],
+            "time_delta": np.diff(times, prepend=times[0]).astype(np.int32),
+            "underlying_price": np.array(self.prices, dtype=np.float32),
+            "change_offsets": np.array(self.offsets, dtype=np.int64),
+            "contract": final_id[np.array(self.changes["contract"], dtype=np.int64)].astype(id_type),
+            "present": np.array(self.changes["present"], dtype=np.int8),
+        }
+        for field in QUOTE_FIELDS:
+            values = np.array(self.changes[field], dtype=np.float64)
+            if QUOTE_TYPES[field] is np.int32:
+                values = np.nan_to_num(values, nan=-1)
+            columns[field] = values.astype(QUOTE_TYPES[field])
+
+        os.makedirs(self.folder, exist_ok=True)
+        for name, values in columns.items():
+            temporary = os.path.join(self.folder, f".{name}.tmp.npy")
+            np.save(temporary, values)
+            os.replace(temporary, os.path.join(self.folder, f"{name}.npy"))
+        return len(times)
+
+
+class ChainSnapshot:
+    """One underlying's chain at one time. Iterating yields OptionContractRecord for the listed contracts."""
+    def __init__(self, underlying, time, underlying_price, contracts, state):
+        self.underlying = underlying
+        self.time = time
+        self.underlying_price = underlying_price
+        self.contracts = contracts      # dict of dictionary arrays: expiry (datetime64[D]), strike, right
+        self.state = state              # dict of current quote arrays plus "present"
+
+    def listed(self):
+        return np.flatnonzero(self.state["present"])
+
+    def __len__(self):
+        return int(self.state["present"].sum())
+
+    def __iter__(self):
+        for i in self.listed():
+            yield OptionContractRecord(
+                EPOCH + timedelta(days=int(self.contracts["expiry"][i])), float(self.contracts["strike"][i]),
+                int(self.contracts["right"][i]), float(self.state["bid"][i]), float(self.state["ask"][i]),
+                float(self.state["last"][i]), float(self.state["iv"][i]), int(self.state["volume"][i]),
+                int(self.state["open_interest"][i]), self.underlying_price)
+
+    def copy(self):
+        return ChainSnapshot(self.underlying, self.time, self.underlying_price, self.contracts,
+                             {field: values.copy() for field, values in self.state.items()})
+
+
+class ChainArchive:
+    def __init__(self, root):
+        self.root = root
+
+    def days(self, underlying):
+        folder = os.path.join(self.root, underlying.upper())
+        if not os.path.isdir(folder):
+            return []
+        return sorted(datetime.strptime(name, "%Y%m%d").date() for name in os.listdir(folder) if name.isdigit())
+
+    def open_day(self, underlying, day):
+        folder = os.path.join(self.root, underlying.upper(), f"{day:%Y%m%d}")
+        if not os.path.exists(os.path.join(folder, "change_offsets.npy")):
+            return None
+        return {name[:-4]: np.load(os.path.join(folder, name), mmap_mode="r")
+                for name in os.listdir(folder) if name.endswith(".npy") and not name.startswith(".")}
+
+    def replay(self, underlying, day):
+        """Yield ChainSnapshot for every recorded time of the day, applying the change stream as it goes."""
+        columns = self.open_day(underlying, day)
+        if columns is None:
+            return
+        contracts = {
+            "expiry": np.cumsum(columns["expiry_delta"], dtype=np.int64),
+            "strike": np.cumsum(columns["strike_delta"], dtype=np.int64) / STRIKE_SCALE,
+            "right": np.asarray(columns["right"]),
+        }
+        count = len(contracts["strike"])
+        state = {field: np.full(count, np.nan, dtype=np.float64) for field in QUOTE_FIELDS}
+        state["present"] = np.zeros(count, dtype=bool)
+        times = int(columns["start_time"][0]) + np.cumsum(columns["time_delta"], dtype=np.int64)
+        offsets = columns["change_offsets"]
+        for step in range(len(times)):
+            lo, hi = int(offsets[step]), int(offsets[step + 1])
+            if hi > lo:
+                rows = np.asarray(columns["contract"][lo:hi], dtype=np.int64)
+                state["present"][rows] = columns["present"][lo:hi] == 1
+                for field in QUOTE_FIELDS:
+                    state[field][rows] = columns[field][lo:hi]
+            yield ChainSnapshot(underlying.upper(), np.datetime64(int(times[step]), "ms"),
+                                float(columns["underlying_price"][step]), contracts, state)
+
+    def replay_slices(self, underlyings, day):
+        """
+        Merge several underlyings by time: yields (time, {underlying: ChainSnapshot}) like data.OptionChains.
+        A stream is only advanced after the group holding its snapshot was yielded, so each snapshot still shows
+        its own step (replay() reuses one state per underlying).
+        """
+        streams = [self.replay(u, day) for u in underlyings]
+        heads = []
+        for i, stream in enumerate(streams):
+            snapshot = next(stream, None)
+            if snapshot is not None:
+                heads.append((snapshot.time, i, snapshot))
+        heapq.heapify(heads)
+        while heads:
+            current_time = heads[0][0]
+            group = []
+            while heads and heads[0][0] == current_time:
+                group.append(heapq.heappop(heads))
+            yield current_time, {snapshot.underlying: snapshot for _, _, snapshot in group}
+            for _, i, _ in group:
+                snapshot = next(streams[i], None)
+                if snapshot is not None:
+                    heapq.heappush(heads, (snapshot.time, i, snapshot))
+
+    def size_report(self, underlying, day):
+        """Stored bytes vs. the bytes of the same snapshots stored in full (every contract, every time)."""
+        columns = self.open_day(underlying, day)
+        stored = sum(values.nbytes for values in columns.values())
+        row_bytes = 8 + 8 + 1 + 4 * 4 + 4 * 2 + 4  # time, strike, right, float quotes, int quotes, expiry
+        full = 0
+        present = np.zeros(len(columns["right"]), dtype=bool)
+        offsets = columns["change_offsets"]
+        for step in range(len(offsets) - 1):
+            lo, hi = int(offsets[step]), int(offsets[step + 1])
+            present[np.asarray(columns["contract"][lo:hi], dtype=np.int64)] = columns["present"][lo:hi] == 1
+            full += int(present.sum()) * row_bytes
+        return stored, full
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive", required=True)
+    parser.add_argument("--underlyings", required=True, help="comma separated tickers")
+    args = parser.parse_args()
+    archive = ChainArchive(args.archive)
+    for underlying in args.underlyings.split(","):
+        for day in archive.days(underlying):
+            stored, full = archive.size_report(underlying, day)
+            print(f"{underlying} {day}: {stored:,} bytes stored, {full:,} as full snapshots ({full / max(stored, 1):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
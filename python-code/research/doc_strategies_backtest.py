@@ -0,0 +1,232 @@
+"""
+Vectorized daily backtester for the two documented core strategies (docs/option-trading-strategies.md):
+1. VIX put spread: on every other Friday with VIX <= 16, sell the 0.25 delta / buy the 0.20 delta 45 DTE VIX puts
+   (at least $1 wide), 25 lots, at most 100 spreads open at once, held to expiration.
+2. SPY:XLU buy & hold at 80/20 (MemeStocksStrategy's core holding), rebalanced quarterly or when a weight drifts
+   more than a band away from its target.
+
+Spreads live in a fixed-size array book (one slot per entry: strikes, expiry, lots, credit), so the daily mark to
+market and the expiry settlement of every open spread are single array expressions. VIX options are priced with
+Black-76 on the VIX level (or a vix_future column when the data has one) and a flat or per-day vol of vol.
+Daily data is a CSV with columns: date, vix, spy, xlu and optionally vix_future, vix_iv.
+
+Usage (from this folder):
+    python doc_strategies_backtest.py --data daily.csv --band 0.05 --vix-entry 15,16,17
+"""
+import argparse
+import csv
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+SpreadConfig = namedtuple("SpreadConfig", [
+    "vix_entry", "short_delta", "long_delta", "min_width", "dte", "lots", "max_spreads", "entry_every_fridays",
+    "vol_of_vol", "rate", "multiplier", "capital"])
+
+DEFAULT_SPREAD = SpreadConfig(vix_entry=16.0, short_delta=0.25, long_delta=0.20, min_width=1.0, dte=45, lots=25,
+                              max_spreads=100, entry_every_fridays=2, vol_of_vol=0.90, rate=0.04, multiplier=100,
+                              capital=13920.0)
+
+
+def load_daily(path):
+    columns = {}
+    with open(path, newline="") as handle:
+        for row in csv.DictReader(handle):
+            for key, value in row.items():
+                columns.setdefault(key, []).append(value)
+    data = {"dates": np.array(columns.pop("date"), dtype="datetime64[D]")}
+    for key, values in columns.items():
+        data[key] = np.array([float(v) if v else np.nan for v in values])
+    return data
+
+
+def norm_cdf(x):
+    """Standard normal CDF (Abramowitz & Stegun 7.1.26, |error| < 1.5e-7), vectorized without scipy."""
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def black76_put(forward, strike, years, vol, rate):
+    years = np.maximum(years, 1e-9)
+    root = vol * np.sqrt(years)
+    d1 = (np.log(forward / strike) + 0.5 * root ** 2) / root
+    d2 = d1 - root
+    return np.exp(-rate * years) * (strike * norm_cdf(-d2) - forward * norm_cdf(-d1))
+
+
+def strike_for_put_delta(forward, delta, years, vol):
+    """Strike whose Black-76 put delta (undiscounted) is -delta."""
+    root = vol * np.sqrt(years)
+    d1 = -NormalDist().inv_cdf(delta)
+    return forward * np.exp(0.5 * root ** 2 - d1 * root)
+
+
+def entry_days(dates, every):
+    """Every `every`-th Friday in the data (the first Friday counts as an entry Friday)."""
+    weekday = (dates.view("int64") - 4) % 7
+    fridays = np.flatnonzero(weekday == 4)
+    return fridays[::every]
+
+
+def run_put_spreads(data, config=DEFAULT_SPREAD):
+    """Simulate the VIX put spread book. Returns the daily equity curve, per-entry records and book statistics."""
+    dates = data["dates"]
+    vix = data["vix"]
+    forward = data.get("vix_future", vix)
+    forward = np.where(np.isnan(forward), vix, forward)
+    vol = data.get("vix_iv", np.full(len(dates), config.vol_of_vol))
+    vol = np.where(np.isnan(vol) | (vol <= 0), config.vol_of_vol, vol)
+    day_numbers = dates.view("int64")
+    count = len(dates)
+
+    # === Array book: one slot per spread entry ===
+    size = config.max_spreads
+    short_strike = np.zeros(size)
+    long_strike = np.zeros(size)
+    expiry = np.zeros(size, dtype=np.int64)        # index of the settlement day
+    lots = np.zeros(size)
+    credit = np.zeros(size)                        # per spread, in points
+    is_open = np.zeros(size, dtype=bool)
+    slot_entry = np.zeros(size, dtype=np.int64)   # index into `entries` of the spread in each slot
+    entries = []
+
+    realized = np.zeros(count)
+    unrealized = np.zeros(count)
+    risk = np.zeros(count)
+    entry_set = set(entry_days(dates, config.entry_every_fridays).tolist())
+
+    for t in range(count):
+        # === Settle everything expiring today at the VIX close ===
+        settling = is_open & (expiry == t)
+        if settling.any():
+            payout = np.maximum(short_strike[settling] - vix[t], 0) - np.maximum(long_strike[settling] - vix[t], 0)
+            pnl = (credit[settling] - payout) * lots[settling] * config.multiplier
+            realized[t:] += pnl.sum()
+            for slot, value in zip(np.flatnonzero(settling), pnl):
+                entries[slot_entry[slot]]["pnl"] = float(value)
+            is_open[settling] = False
+
+        # === Enter on entry Fridays when the VIX is at or under the trigger ===
+        open_spreads = lots[is_open].sum()
+        if t in entry_set and vix[t] <= config.vix_entry and open_spreads + config.lots <= config.max_spreads:
+            free = np.flatnonzero(~is_open)
+            target_day = day_numbers[t] + config.dte
+            settle = int(np.searchsorted(day_numbers, target_day))
+            if free.size and settle < count:
+                years = (day_numbers[settle] - day_numbers[t]) / 365.0
+                k_short = np.round(strike_for_put_delta(forward[t], config.short_delta, years, vol[t]))
+                k_long = min(np.round(strike_for_put_delta(forward[t], config.long_delta, years, vol[t])),
+                             k_short - config.min_width)
+                premium = (black76_put(forward[t], k_short, years, vol[t], config.rate)
+                           - black76_put(forward[t], k_long, years, vol[t], config.rate))
+                slot = free[0]
+                short_strike[slot], long_strike[slot], expiry[slot] = k_short, k_long, settle
+                lots[slot], credit[slot], is_open[slot] = config.lots, premium, True
+                slot_entry[slot] = len(entries)
+                entries.append({"date": str(dates[t]), "vix": float(vix[t]), "short": float(k_short),
+                                "long": float(k_long), "credit": float(premium * config.lots * config.multiplier),
+                                "max_loss": float((k_short - k_long - premium) * config.lots * config.multiplier),
+                                "expiry": str(dates[settle]), "pnl": None})
+
+        # === Mark the open book ===
+        if is_open.any():
+            years = (day_numbers[expiry[is_open]] - day_numbers[t]) / 365.0
+            value = (black76_put(forward[t], short_strike[is_open], years, vol[t], config.rate)
+                     - black76_put(forward[t], long_strike[is_open], years, vol[t], config.rate))
+            unrealized[t] = ((credit[is_open] - value) * lots[is_open] * config.multiplier).sum()
+            risk[t] = ((short_strike[is_open] - long_strike[is_open] - credit[is_open]) * lots[is_open] * config.multiplier).sum()
+
+    equity = config.capital + realized + unrealized
+    closed = [e for e in entries if e["pnl"] is not None]
+    return {"dates": dates, "equity": equity, "entries": entries, "max_risk": float(risk.max()),
+            "win_rate": float(np.mean([e["pnl"] > 0 for e in closed])) if closed else 0.0}
+
+
+def run_etf_core(data, spy_weight=0.80, band=None, rebalance_days=90, capital=100000.0):
+    """SPY/XLU core holding. band=None rebalances every `rebalance_days`, otherwise on a weight drift beyond the band."""
+    dates = data["dates"]
+    prices = np.column_stack([data["spy"], data["xlu"]])
+    targets = np.array([spy_weight, 1.0 - spy_weight])
+    day_numbers = dates.view("int64")
+    count = len(dates)
+    shares = np.zeros((count, 2))
+    cash = np.zeros(count)
+    rebalances = []
+
+    t = 0
+    value = capital
+    while t < count:
+        holding = np.floor(targets * value / prices[t])
+        shares[t:] = holding
+        cash[t:] = value - holding @ prices[t]
+        rebalances.append(str(dates[t]))
+        # Find the next rebalance day from the drift of today's holdings over the rest of the data
+        future_values = prices[t + 1:] * holding
+        total = future_values.sum(axis=1) + cash[t]
+        if band is None:
+            due = np.flatnonzero(day_numbers[t + 1:] - day_numbers[t] >= rebalance_days)
+        else:
+            weights = future_values / total[:, None]
+            due = np.flatnonzero(np.abs(weights - targets).max(axis=1) > band)
+        if due.size == 0:
+            break
+        t = t + 1 + int(due[0])
+        value = total[due[0]]
+
+    equity = cash + (shares * prices).sum(axis=1)
+    return {"dates": dates, "equity": equity, "rebalances": rebalances}
+
+
+def statistics(dates, equity):
+    returns = np.diff(equity) / equity[:-1]
+    years = max((dates[-1] - dates[0]).astype(int) / 365.25, 1e-9)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    annual_return = (equity[-1] / equity[0]) ** (1.0 / years) - 1.0 if equity[-1] > 0 else -1.0
+    volatility = float(returns.std() * np.sqrt(252))
+    max_drawdown = float(drawdown.min())
+    return {
+        "annual_return": annual_return,
+        "volatility": volatility,
+        "sharpe": float(np.sqrt(252) * returns.mean() / returns.std()) if returns.std() > 0 else 0.0,
+        "max_drawdown": max_drawdown,
+        "mar": annual_return / abs(max_drawdown) if max_drawdown < 0 else float("inf"),
+    }
+
+
+def parse_floats(text):
+    return [float(v) for v in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", required=True, help="daily CSV: date, vix, spy, xlu[, vix_future, vix_iv]")
+    parser.add_argument("--vix-entry", type=parse_floats, default=[DEFAULT_SPREAD.vix_entry])
+    parser.add_argument("--lots", type=int, default=DEFAULT_SPREAD.lots)
+    parser.add_argument("--vol-of-vol", type=float, default=DEFAULT_SPREAD.vol_of_vol)
+    parser.add_argument("--band", type=parse_floats, default=[0.05], help="drift bands compared with quarterly")
+    args = parser.parse_args()
+    data = load_daily(args.data)
+
+    print("VIX put spread (docs claim: Sharpe 4.43, annual 108.8%, max drawdown -19.4%, MAR 5.62)")
+    for trigger in args.vix_entry:
+        config = DEFAULT_SPREAD._replace(vix_entry=trigger, lots=args.lots, vol_of_vol=args.vol_of_vol)
+        result = run_put_spreads(data, config)
+        stats = statistics(result["dates"], result["equity"])
+        print(f"  VIX <= {trigger:>5.2f}: {len(result['entries']):>4} entries | win {result['win_rate']:.1%} | "
+              f"annual {stats['annual_return']:.1%} | vol {stats['volatility']:.1%} | Sharpe {stats['sharpe']:.2f} | "
+              f"max drawdown {stats['max_drawdown']:.1%} | MAR {stats['mar']:.2f} | max risk ${result['max_risk']:,.0f}")
+
+    print("SPY:XLU 80/20")
+    for label, band in [("quarterly", None)] + [(f"band {b:.0%}", b) for b in args.band]:
+        result = run_etf_core(data, band=band)
+        stats = statistics(result["dates"], result["equity"])
+        print(f"  {label:<10}: {len(result['rebalances']):>3} rebalances | annual {stats['annual_return']:.1%} | "
+              f"vol {stats['volatility']:.1%} | Sharpe {stats['sharpe']:.2f} | max drawdown {stats['max_drawdown']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
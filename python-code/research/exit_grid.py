@@ -0,0 +1,192 @@
+"""
+Exit-rule grid simulator for the MemeStocks strategy.
+Replays every entry of a backtest (trades CSV) over the minute price path that followed it and evaluates a whole grid of
+(stop loss, take profit, trailing stop, max hold) exits at once, instead of one LEAN backtest per combination.
+
+How it works: for each entry the price path is turned into returns relative to the entry fill. Running minimum / maximum
+arrays are monotone, so the first bar that crosses any threshold is a single np.searchsorted per rule and the whole grid
+comes out of one broadcast (entries x stops x targets x trails x holds), the earliest rule winning.
+
+Usage (from this folder):
+    python exit_grid.py --trades "../../backtest/Ugly Yellow Whale_trades.csv" --data /path/to/lean/Data --bar-minutes 60
+    (or --store ./bars after converting the minute data with bar_store.py)
+"""
+import argparse
+import csv
+
+import numpy as np
+
+from bar_store import BarStore
+from lean_data import LeanMinuteLoader, entries_from_trades, read_trades
+
+# Exit reasons, ordered by priority when several rules fire on the same bar (the stop is checked first in ManagePositions)
+EXIT_STOP, EXIT_TRAIL, EXIT_TARGET, EXIT_HOLD = 0, 1, 2, 3
+EXIT_NAMES = ("stop", "trail", "target", "hold")
+
+
+def resample(path, minutes):
+    """Aggregate consecutive minute bars into `minutes`-bar buckets (Hour resolution checks ~ 60)."""
+    if minutes <= 1:
+        return path
+    count = len(path["close"]) // minutes * minutes
+    if count == 0:
+        return None
+    shape = (-1, minutes)
+    return {
+        "time": path["time"][:count].reshape(shape)[:, -1],
+        "open": path["open"][:count].reshape(shape)[:, 0],
+        "high": path["high"][:count].reshape(shape).max(axis=1),
+        "low": path["low"][:count].reshape(shape).min(axis=1),
+        "close": path["close"][:count].reshape(shape)[:, -1],
+    }
+
+
+def stack_paths(paths, entry_prices):
+    """Pad the per-entry paths into (N, T) arrays of returns relative to the entry price."""
+    lengths = np.array([len(p["close"]) for p in paths])
+    width = int(lengths.max())
+    returns = {}
+    for field in ("open", "high", "low", "close"):
+        block = np.full((len(paths), width), np.nan)
+        for row, path in enumerate(paths):
+            block[row, :lengths[row]] = path[field] / entry_prices[row] - 1.0
+        returns[field] = block
+    return returns, lengths
+
+
+def first_passage(running, thresholds, rising):
+    """First index where a monotone running series reaches each threshold (len(row) when it never does). -> (N, K)"""
+    out = np.empty((running.shape[0], len(thresholds)), dtype=np.int64)
+    for row in range(running.shape[0]):
+        series = running[row] if rising else -running[row]
+        out[row] = np.searchsorted(series, thresholds if rising else -np.asarray(thresholds), side="left")
+    return out
+
+
+def simulate(returns, lengths, stops, targets, trails, holds, trigger="close"):
+    """
+    Evaluate the grid. stops are negative returns (-inf = off), targets positive (inf = off),
+    trails are drawdowns from the running high (inf = off), holds are bar counts.
+    trigger="close" mirrors the UnrealizedProfitPercent check on each bar close; "range" uses bar highs/lows and fills
+    stops/targets at the level (or at the open when the bar gapped through it).
+    Returns exit return, exit bar and exit reason arrays shaped (N, S, P, R, H).
+    """
+    stops, targets, trails = (np.asarray(v, dtype=float) for v in (stops, targets, trails))
+    holds = np.asarray(holds, dtype=np.int64)
+    close = returns["close"]
+    low = returns["low"] if trigger == "range" else close
+    high = returns["high"] if trigger == "range" else close
+    count, width = close.shape
+
+    # === Running extremes (NaN padding is ignored by fmin/fmax) ===
+    running_low = np.fmin.accumulate(low, axis=1)
+    running_high = np.fmax.accumulate(high, axis=1)
+    peak = np.fmax.accumulate(np.fmax(high, 0.0), axis=1)  # the entry price counts as the first high
+    drawdown = (1.0 + low) / (1.0 + peak) - 1.0
+    running_drawdown = np.fmin.accumulate(drawdown, axis=1)
+
+    stop_bar = first_passage(running_low, stops, rising=False)
+    target_bar = first_passage(running_high, targets, rising=True)
+    trail_bar = first_passage(running_drawdown, -trails, rising=False)
+    last_bar = lengths - 1
+    hold_bar = np.minimum(holds[None, :] - 1, last_bar[:, None])
+
+    # === Earliest rule wins; ties resolve stop > trail > target > hold ===
+    candidates = np.stack(np.broadcast_arrays(
+        stop_bar[:, :, None, None, None], trail_bar[:, None, None, :, None],
+        target_bar[:, None, :, None, None], hold_bar[:, None, None, None, :]), axis=0)
+    reason = candidates.argmin(axis=0)
+    exit_bar = candidates.min(axis=0)
+
+    rows = np.arange(count)[:, None, None, None, None]
+    exit_return = close[rows, exit_bar]
+    if trigger == "range":
+        opened = returns["open"][rows, exit_bar]
+        stop_level = np.broadcast_to(stops[None, :, None, None, None], exit_bar.shape)
+        target_level = np.broadcast_to(targets[None, None, :, None, None], exit_bar.shape)
+        trail_level = (1.0 + peak[rows, exit_bar]) * (1.0 - trails[None, None, None, :, None]) - 1.0
+        exit_return = np.where(reason == EXIT_STOP, np.minimum(opened, stop_level), exit_return)
+        exit_return = np.where(reason == EXIT_TARGET, np.maximum(opened, target_level), exit_return)
+        exit_return = np.where(reason == EXIT_TRAIL, np.minimum(opened, trail_level), exit_return)
+    return exit_return, exit_bar, reason
+
+
+def surface(exit_return, exit_bar, reason, notionals):
+    """Aggregate per-entry exits into (S, P, R, H) surfaces of P&L and trade statistics."""
+    weights = notionals[:, None, None, None, None]
+    return {
+        "pnl": (exit_return * weights).sum(axis=0),
+        "mean_return": exit_return.mean(axis=0),
+        "win_rate": (exit_return > 0).mean(axis=0),
+        "avg_bars": exit_bar.mean(axis=0) + 1.0,
+        "stop_share": (reason == EXIT_STOP).mean(axis=0),
+        "target_share": (reason == EXIT_TARGET).mean(axis=0),
+    }
+
+
+def grid_rows(result, stops, targets, trails, holds):
+    """Flatten the surface into one row per combination, best P&L first."""
+    order = np.argsort(result["pnl"], axis=None)[::-1]
+    rows = []
+    for flat in order:
+        s, p, r, h = np.unravel_index(flat, result["pnl"].shape)
+        row = {"stop": stops[s], "target": targets[p], "trail": trails[r], "hold": holds[h]}
+        row.update({key: float(values[s, p, r, h]) for key, values in result.items()})
+        rows.append(row)
+    return rows
+
+
+def parse_floats(text):
+    return [float(v) for v in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", required=True, help="LEAN trades CSV")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="LEAN data root (folder containing equity/)")
+    source.add_argument("--store", help="bar_store.py folder (faster than reading the LEAN zips)")
+    parser.add_argument("--bars", type=int, default=390 * 30, help="minute bars replayed after each entry")
+    parser.add_argument("--bar-minutes", type=int, default=60, help="bar size the exits are checked on")
+    parser.add_argument("--trigger", choices=("close", "range"), default="close")
+    parser.add_argument("--stops", type=parse_floats, default=[-0.05, -0.10, -0.15, -0.20, -0.30, -np.inf])
+    parser.add_argument("--targets", type=parse_floats, default=[0.10, 0.20, 0.33, 0.50, 1.00, np.inf])
+    parser.add_argument("--trails", type=parse_floats, default=[0.10, 0.20, 0.30, np.inf])
+    parser.add_argument("--holds", type=parse_floats, default=[7, 35, 70, 140, 10 ** 9], help="in checked bars")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--out", help="write the full grid to this CSV")
+    args = parser.parse_args()
+
+    loader = BarStore(args.store) if args.store else LeanMinuteLoader(args.data)
+    paths, entries = [], []
+    for entry in entries_from_trades(read_trades(args.trades)):
+        path = loader.load(entry.symbol, entry.time, args.bars)
+        path = resample(path, args.bar_minutes) if path is not None else None
+        if path is None:
+            print(f"skip {entry.symbol} {entry.time}: no minute data")
+            continue
+        paths.append(path)
+        entries.append(entry)
+    if not paths:
+        raise SystemExit("No entries with price data")
+
+    prices = np.array([e.price for e in entries])
+    notionals = prices * np.array([e.quantity for e in entries])
+    holds = [int(h) for h in args.holds]
+    returns, lengths = stack_paths(paths, prices)
+    result = surface(*simulate(returns, lengths, args.stops, args.targets, args.trails, holds, args.trigger), notionals)
+    rows = grid_rows(result, args.stops, args.targets, args.trails, holds)
+
+    print(f"{len(entries)} entries, {result['pnl'].size} exit combinations, trigger={args.trigger}")
+    for row in rows[:args.top]:
+        print("stop {stop:>6} target {target:>6} trail {trail:>6} hold {hold:>10} | pnl {pnl:>10.2f} "
+              "mean {mean_return:>7.2%} win {win_rate:>6.1%} bars {avg_bars:>7.1f}".format(**row))
+    if args.out:
+        with open(args.out, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
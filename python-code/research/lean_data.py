@@ -0,0 +1,97 @@
+"""
+Readers shared by the offline research tools in this folder (they run outside LEAN, plain Python + NumPy).
+- read_trades / entries_from_trades: the trades CSV LEAN exports with a backtest (see backtest/Ugly Yellow Whale_trades.csv).
+- LeanMinuteLoader: minute trade bars straight from a LEAN data folder
+  (equity/usa/minute/<ticker>/<YYYYMMDD>_trade.zip, prices in deci-cents, times in ms since midnight New York).
+"""
+import csv
+import io
+import os
+import zipfile
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+NEW_YORK = ZoneInfo("America/New_York")
+LEAN_PRICE_SCALE = 10000.0
+
+Trade = namedtuple("Trade", ["time", "symbol", "price", "quantity", "order_type", "status", "tag"])
+Entry = namedtuple("Entry", ["symbol", "time", "price", "quantity"])
+
+
+def read_trades(path, filled_only=True):
+    """Rows of a LEAN trades CSV. Times are converted from UTC to naive New York time like LEAN's data."""
+    trades = []
+    with open(path, newline="") as handle:
+        for row in csv.DictReader(handle):
+            if filled_only and row["Status"] != "Filled":
+                continue
+            time = datetime.strptime(row["Time"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+            trades.append(Trade(time.astimezone(NEW_YORK).replace(tzinfo=None), row["Symbol"], float(row["Price"]),
+                                int(float(row["Quantity"])), row["Type"], row["Status"], row["Tag"].strip().strip('"')))
+    return trades
+
+
+def entries_from_trades(trades, exclude=("SPY", "XLU")):
+    """Fills that open a long position from flat (the strategy's screening buys), ETFs excluded."""
+    position = {}
+    entries = []
+    for trade in trades:
+        held = position.get(trade.symbol, 0)
+        if held == 0 and trade.quantity > 0 and trade.symbol not in exclude:
+            entries.append(Entry(trade.symbol, trade.time, trade.price, trade.quantity))
+        position[trade.symbol] = held + trade.quantity
+    return entries
+
+
+class LeanMinuteLoader:
+    """Minute OHLCV bars from a local LEAN data folder. Arrays are returned in a dict keyed by field."""
+    FIELDS = ("time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, data_root, market="usa"):
+        self.folder = os.path.join(data_root, "equity", market, "minute")
+
+    def load_day(self, symbol, day):
+        ticker = symbol.lower()
+        path = os.path.join(self.folder, ticker, f"{day:%Y%m%d}_trade.zip")
+        if not os.path.exists(path):
+            return None
+        with zipfile.ZipFile(path) as archive:
+            raw = archive.read(archive.namelist()[0]).decode("utf-8")
+        if not raw.strip():
+            return None
+        values = np.loadtxt(io.StringIO(raw), delimiter=",", ndmin=2)
+        midnight = np.datetime64(datetime(day.year, day.month, day.day), "ms")
+        return {
+            "time": midnight + values[:, 0].astype("timedelta64[ms]"),
+            "open": values[:, 1] / LEAN_PRICE_SCALE,
+            "high": values[:, 2] / LEAN_PRICE_SCALE,
+            "low": values[:, 3] / LEAN_PRICE_SCALE,
+            "close": values[:, 4] / LEAN_PRICE_SCALE,
+            "volume": values[:, 5],
+        }
+
+    def load(self, symbol, start, bars, max_days=400):
+        """Up to `bars` minute bars starting at `start` (inclusive), walking forward day by day."""
+        chunks = []
+        collected = 0
+        day = start.date()
+        start64 = np.datetime64(start, "ms")
+        for _ in range(max_days):
+            if collected >= bars:
+                break
+            chunk = self.load_day(symbol, day)
+            day += timedelta(days=1)
+            if chunk is None:
+                continue
+            keep = chunk["time"] >= start64
+            if not keep.any():
+                continue
+            chunk = {field: values[keep] for field, values in chunk.items()}
+            chunks.append(chunk)
+            collected += len(chunk["time"])
+        if not chunks:
+            return None
+        return {field: np.concatenate([c[field] for c in chunks])[:bars] for field in self.FIELDS}
@@ -0,0 +1,273 @@
+"""
+Vectorized daily research backtester for the MemeStocks signal (IV increase between screenings + call/put volume >= 1.10).
+Replays the MemeStocksStrategy rules on daily panels instead of minute data:
+- Screening on Mondays, at most every 14 days counted from the last screening that placed trades.
+- VIX gate (VIX > 20.50 = BEAR, no new trades) and the 20-IV readiness gate.
+- First screening ranks by absolute ATM IV, later ones by IV increase over the previous traded screening. Top 15.
+- 2% of portfolio value per new position, capped at 160% total allocation including SPY/XLU.
+- SPY/XLU 80/20, rebalanced on the first screening 90+ days after the last rebalance.
+- Exits: -15% stop loss / +33% take profit on the daily close.
+The signal, ranking and exit paths are computed as array operations over the whole panel; the only Python loop is over
+screening dates (a few hundred for years of data), which is what keeps the sizing path dependent like the real algorithm.
+
+Panels are a .npz with: dates (datetime64[D]), symbols, close, atm_iv, call_volume, put_volume (dates x symbols, NaN when
+a symbol is outside the universe / has no chain) and vix (dates). panels_from_csv builds one from a long CSV
+(date,symbol,close,atm_iv,call_volume,put_volume), with the VIX as symbol "VIX".
+
+Usage (from this folder):
+    python signal_backtest.py --panels memestocks_daily.npz --trades "../../backtest/Ugly Yellow Whale_trades.csv"
+"""
+import argparse
+import csv
+from collections import namedtuple
+
+import numpy as np
+
+from lean_data import entries_from_trades, read_trades
+
+ETFS = ("SPY", "XLU")
+
+SignalConfig = namedtuple("SignalConfig", [
+    "screening_frequency_days", "vix_threshold", "min_iv_count", "min_call_put_ratio", "top_n",
+    "position_allocation", "max_portfolio_allocation", "spy_allocation", "xlu_allocation",
+    "rebalance_frequency_days", "stop_loss", "take_profit", "cash"])
+
+DEFAULT_CONFIG = SignalConfig(
+    screening_frequency_days=14, vix_threshold=20.50, min_iv_count=20, min_call_put_ratio=1.10, top_n=15,
+    position_allocation=0.02, max_portfolio_allocation=1.6, spy_allocation=0.80, xlu_allocation=0.20,
+    rebalance_frequency_days=90, stop_loss=-0.15, take_profit=0.33, cash=100000.0)
+
+SimTrade = namedtuple("SimTrade", ["symbol", "entry_date", "entry_price", "quantity", "exit_date", "exit_price", "reason"])
+
+
+def load_panels(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {key: data[key] for key in data.files}
+
+
+def panels_from_csv(path):
+    """Pivot a long daily CSV into the panel dict used by run()."""
+    rows = []
+    with open(path, newline="") as handle:
+        for row in csv.DictReader(handle):
+            rows.append(row)
+    dates = np.array(sorted({r["date"] for r in rows}), dtype="datetime64[D]")
+    symbols = np.array(sorted({r["symbol"] for r in rows if r["symbol"] != "VIX"}))
+    date_index = {d: i for i, d in enumerate(dates.astype(str))}
+    symbol_index = {s: i for i, s in enumerate(symbols)}
+    panels = {field: np.full((len(dates), len(symbols)), np.nan)
+              for field in ("close", "atm_iv", "call_volume", "put_volume")}
+    vix = np.full(len(dates), np.nan)
+    for row in rows:
+        t = date_index[row["date"]]
+        if row["symbol"] == "VIX":
+            vix[t] = float(row["close"])
+            continue
+        j = symbol_index[row["symbol"]]
+        for field, values in panels.items():
+            if row.get(field):
+                values[t, j] = float(row[field])
+    panels.update(dates=dates, symbols=symbols, vix=vix)
+    return panels
+
+
+def forward_fill(values):
+    """Carry the last valid value forward along axis 0 (prices of names that drop out of the universe)."""
+    valid = ~np.isnan(values)
+    index = np.where(valid, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = values[index, np.arange(values.shape[1])]
+    return np.where(np.maximum.accumulate(valid, axis=0), filled, np.nan)
+
+
+def screening_days(dates):
+    """Indices of the first trading day of each week that falls on a Monday (the scheduled 10:05 screening)."""
+    weekday = (dates.astype("datetime64[D]").view("int64") - 4) % 7  # 1970-01-01 was a Thursday
+    return np.flatnonzero(weekday == 0)
+
+
+def exit_paths(close, entry_index, columns, entry_prices, stop_loss, take_profit):
+    """First close at or beyond the stop / target after each entry. Returns (exit index, exit price, reason)."""
+    future = close[entry_index + 1:, columns] / entry_prices - 1.0
+    if future.shape[0] == 0:
+        return np.full(len(columns), entry_index), entry_prices, np.array(["open"] * len(columns))
+    stop = future <= stop_loss
+    target = future >= take_profit
+    hit = stop | target
+    any_hit = hit.any(axis=0)
+    first = np.where(any_hit, hit.argmax(axis=0), future.shape[0] - 1)
+    exit_index = entry_index + 1 + first
+    exit_price = close[exit_index, columns]
+    reason = np.where(~any_hit, "open", np.where(stop[first, np.arange(len(columns))], "stop", "target"))
+    return exit_index, exit_price, reason
+
+
+def run(panels, config=DEFAULT_CONFIG):
+    dates = panels["dates"].astype("datetime64[D]")
+    symbols = np.asarray(panels["symbols"]).astype(str)
+    close = forward_fill(panels["close"])
+    iv = panels["atm_iv"]
+    calls, puts = panels["call_volume"], panels["put_volume"]
+    vix = forward_fill(panels["vix"][:, None])[:, 0]
+    day_numbers = dates.view("int64")
+    count = len(dates)
+
+    # === Signal arrays for every day at once ===
+    valid_iv = (iv > 0) & ~np.isnan(iv)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        call_put = np.where(puts > 0, calls / puts, np.where(calls > 0, np.inf, 0.0))
+    bullish = call_put >= config.min_call_put_ratio
+    is_etf = np.isin(symbols, ETFS)
+    etf_columns = {name: np.flatnonzero(symbols == name) for name in ETFS}
+
+    # === Books: shares per day/symbol and cash per day. Every event edits the rows from its day onward ===
+    shares = np.zeros_like(close)
+    cash = np.full(count, config.cash)
+    open_until = np.full(len(symbols), -1)  # last day a memestock position is held
+    trades = []
+
+    def equity(t):
+        return cash[t] + np.nansum(shares[t] * close[t])
+
+    def rebalance(t):
+        value = equity(t)
+        for name, weight in (("SPY", config.spy_allocation), ("XLU", config.xlu_allocation)):
+            columns = etf_columns[name]
+            if len(columns) == 0 or not close[t, columns[0]] > 0:
+                continue
+            j = columns[0]
+            delta = int(weight * value / close[t, j]) - shares[t, j]
+            shares[t:, j] += delta
+            cash[t:] -= delta * close[t, j]
+
+    rebalance(0)
+    last_rebalance = day_numbers[0]
+    last_trade_day = None
+    previous_iv = None
+    regime = "BULL"
+
+    for t in screening_days(dates):
+        today_iv = np.where(valid_iv[t] & ~is_etf, iv[t], np.nan)
+        available = ~np.isnan(today_iv)
+        if available.sum() < config.min_iv_count:
+            continue
+        if day_numbers[t] - last_rebalance >= config.rebalance_frequency_days:
+            rebalance(t)
+            last_rebalance = day_numbers[t]
+        if last_trade_day is not None and day_numbers[t] - last_trade_day < config.screening_frequency_days:
+            continue
+        if vix[t] > 0:
+            regime = "BEAR" if vix[t] > config.vix_threshold else "BULL"
+        if regime == "BEAR":
+            continue
+
+        # === Rank: absolute IV on the first run, IV increase afterwards ===
+        if previous_iv is None:
+            score = today_iv
+        else:
+            score = today_iv - previous_iv
+            score = np.where(score > 0, score, np.nan)
+        score = np.where(bullish[t], score, np.nan)
+        ranked = np.argsort(-np.nan_to_num(score, nan=-np.inf), kind="stable")[:int(np.sum(~np.isnan(score)))]
+        ranked = ranked[:config.top_n]
+        if len(ranked) == 0:
+            continue
+
+        # === Size: 2% each in rank order, skipping holdings, until the allocation cap ===
+        value = equity(t)
+        allocation = np.nansum(shares[t] * close[t]) / value
+        held = open_until >= t
+        chosen = []
+        for j in ranked:
+            if allocation + config.position_allocation > config.max_portfolio_allocation:
+                break
+            if held[j] or not close[t, j] > 0:
+                continue
+            chosen.append(j)
+            allocation += config.position_allocation
+        chosen = np.array(chosen, dtype=np.int64)
+
+        if len(chosen):
+            prices = close[t, chosen]
+            quantities = (config.position_allocation * value / prices).astype(np.int64)
+            exit_index, exit_price, reasons = exit_paths(close, t, chosen, prices, config.stop_loss, config.take_profit)
+            for j, q, p, x, xp, why in zip(chosen, quantities, prices, exit_index, exit_price, reasons):
+                if q <= 0:
+                    continue
+                held_until = x if why == "open" else x - 1
+                shares[t:held_until + 1, j] += q
+                cash[t:] -= q * p
+                if why != "open":
+                    cash[x:] += q * xp
+                open_until[j] = held_until
+                trades.append(SimTrade(str(symbols[j]), dates[t], float(p), int(q), dates[x], float(xp), str(why)))
+
+        previous_iv = today_iv
+        last_trade_day = day_numbers[t]
+
+    equity_curve = cash + np.nansum(shares * close, axis=1)
+    return {"dates": dates, "equity": equity_curve, "trades": trades}
+
+
+def statistics(dates, equity):
+    returns = np.diff(equity) / equity[:-1]
+    years = max((dates[-1] - dates[0]).astype(int) / 365.25, 1e-9)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    return {
+        "total_return": equity[-1] / equity[0] - 1.0,
+        "cagr": (equity[-1] / equity[0]) ** (1.0 / years) - 1.0,
+        "sharpe": float(np.sqrt(252) * returns.mean() / returns.std()) if returns.std() > 0 else 0.0,
+        "max_drawdown": float(drawdown.min()),
+    }
+
+
+def cross_check(trades, backtest_trades_path):
+    """Compare simulated entries with the LEAN backtest's entries on the dates both cover."""
+    actual = entries_from_trades(read_trades(backtest_trades_path), exclude=ETFS)
+    if not actual or not trades:
+        return None
+    start = max(min(np.datetime64(e.time, "D") for e in actual), min(t.entry_date for t in trades))
+    end = min(max(np.datetime64(e.time, "D") for e in actual), max(t.entry_date for t in trades))
+    lean = {(str(np.datetime64(e.time, "D")), e.symbol) for e in actual if start <= np.datetime64(e.time, "D") <= end}
+    sim = {(str(t.entry_date), t.symbol) for t in trades if start <= t.entry_date <= end}
+    matched = lean & sim
+    return {
+        "start": str(start), "end": str(end), "lean_entries": len(lean), "sim_entries": len(sim),
+        "matched": len(matched), "only_lean": sorted(lean - sim), "only_sim": sorted(sim - lean),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--panels", required=True, help=".npz panels, or a long .csv to pivot")
+    parser.add_argument("--trades", help="LEAN trades CSV to cross-check the entries against")
+    parser.add_argument("--out", help="write the simulated trades to this CSV")
+    args = parser.parse_args()
+
+    panels = panels_from_csv(args.panels) if args.panels.endswith(".csv") else load_panels(args.panels)
+    result = run(panels)
+    stats = statistics(result["dates"], result["equity"])
+    print(f"{len(result['trades'])} trades | return {stats['total_return']:.2%} | CAGR {stats['cagr']:.2%} | "
+          f"Sharpe {stats['sharpe']:.2f} | max drawdown {stats['max_drawdown']:.2%}")
+    reasons, counts = np.unique([t.reason for t in result["trades"]], return_counts=True)
+    print("Exits: " + ", ".join(f"{r}={c}" for r, c in zip(reasons, counts)))
+
+    if args.trades:
+        check = cross_check(result["trades"], args.trades)
+        if check is None:
+            print("Cross-check: no overlapping entries")
+        else:
+            print(f"Cross-check {check['start']}..{check['end']}: {check['matched']} of {check['lean_entries']} LEAN "
+                  f"entries reproduced, {check['sim_entries']} simulated")
+            for label in ("only_lean", "only_sim"):
+                for day, symbol in check[label][:20]:
+                    print(f"  {label:<9} {day} {symbol}")
+    if args.out:
+        with open(args.out, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(SimTrade._fields)
+            writer.writerows(result["trades"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+bar_store reads across the per-year files: a range spanning New Year returns the bars of both years, in order, with
+the [start, end) bounds applied inside each year; a range inside one year stays a zero-copy view.
+
+Usage (from this folder):
+    python -m pytest -q test_bar_store.py
+"""
+from datetime import datetime
+
+import numpy as np
+
+from bar_store import BarStore
+
+
+def minute_bars(day, minutes=3, first_price=1.0):
+    times = np.datetime64(day, "m") + np.arange(minutes)
+    prices = first_price + np.arange(minutes, dtype=float)
+    return {"time": times, "open": prices, "high": prices + 0.5, "low": prices - 0.5, "close": prices,
+            "volume": np.full(minutes, 100.0)}
+
+
+def concat(*chunks):
+    return {field: np.concatenate([c[field] for c in chunks]) for field in chunks[0]}
+
+
+def write_store(root):
+    """GME: two sessions at the end of 2024 and two at the start of 2025 (prices 1-3, 11-13, 21-23, 31-33)."""
+    store = BarStore(root)
+    store.write_year("GME", 2024, concat(minute_bars("2024-12-30T09:31", first_price=1.0),
+                                         minute_bars("2024-12-31T09:31", first_price=11.0)))
+    store.write_year("GME", 2025, concat(minute_bars("2025-01-02T09:31", first_price=21.0),
+                                         minute_bars("2025-01-03T09:31", first_price=31.0)))
+    return store
+
+
+def test_read_across_year_boundary(tmp_path):
+    store = write_store(str(tmp_path))
+    bars = store.read("GME", datetime(2024, 12, 31, 9, 32), datetime(2025, 1, 2, 9, 33))
+    assert bars["close"].tolist() == [12.0, 13.0, 21.0, 22.0]
+    assert np.all(np.diff(bars["time"]) > 0)
+    assert store.years("GME") == [2024, 2025]
+
+
+def test_range_ending_on_new_year_stays_in_one_year(tmp_path):
+    store = write_store(str(tmp_path))
+    bars = store.read("GME", datetime(2024, 12, 30), datetime(2025, 1, 1))
+    assert bars["close"].tolist() == [1.0, 2.0, 3.0, 11.0, 12.0, 13.0]
+    assert isinstance(bars["close"], np.memmap)  # one year touched: a view, not a copy
+
+
+def test_load_counts_bars_past_the_year_end(tmp_path):
+    store = write_store(str(tmp_path))
+    bars = store.load("GME", datetime(2024, 12, 31), 5)
+    assert bars["close"].tolist() == [11.0, 12.0, 13.0, 21.0, 22.0]
+    assert bars["time"][-1] == np.datetime64(datetime(2025, 1, 2, 9, 32), "ms")
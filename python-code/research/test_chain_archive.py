@@ -0,0 +1,70 @@
+"""
+Round trip of chain_archive: snapshots written with ChainArchiveWriter replay with the quotes and listings of
+their own step, both through replay() and through the merged replay_slices().
+
+Usage (from this folder):
+    python -m pytest -q test_chain_archive.py
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from chain_archive import CALL, PUT, ChainArchive, ChainArchiveWriter
+
+DAY = date(2025, 11, 3)
+EXPIRY = np.array(["2025-11-21", "2025-11-21", "2025-11-21"], dtype="datetime64[D]")
+
+
+def write_archive(root):
+    """GME: three minutes, the call bid moves 1.1 -> 1.2 -> 1.3 and the put is delisted at 09:33.
+    AMC: one snapshot at 09:31 and one at 09:33, so the streams interleave."""
+    start = datetime(2025, 11, 3, 9, 31)
+    gme = ChainArchiveWriter(root, "GME", DAY)
+    for step, bid in enumerate((1.1, 1.2, 1.3)):
+        listed = 3 if step < 2 else 2
+        gme.add(start + timedelta(minutes=step), 25.0 + step, EXPIRY[:listed], [25.0, 26.0, 24.0][:listed],
+                [CALL, CALL, PUT][:listed], bid=np.array([bid, 0.5, 0.7][:listed]),
+                ask=np.array([bid + 0.1, 0.6, 0.8][:listed]), volume=np.array([10, 20, 30][:listed]))
+    gme.close()
+
+    amc = ChainArchiveWriter(root, "AMC", DAY)
+    for step, bid in ((0, 0.2), (2, 0.3)):
+        amc.add(start + timedelta(minutes=step), 4.0, EXPIRY[:1], [4.0], [CALL], bid=np.array([bid]),
+                ask=np.array([bid + 0.05]))
+    amc.close()
+
+
+def call_bid(snapshot, strike=25.0):
+    return next(round(c.BidPrice, 4) for c in snapshot if c.Right == CALL and c.Strike == strike)
+
+
+def test_replay_round_trip(tmp_path):
+    write_archive(str(tmp_path))
+    snapshots = [s.copy() for s in ChainArchive(str(tmp_path)).replay("GME", DAY)]
+    assert [call_bid(s) for s in snapshots] == [1.1, 1.2, 1.3]
+    assert [len(s) for s in snapshots] == [3, 3, 2]
+    assert [s.underlying_price for s in snapshots] == [25.0, 26.0, 27.0]
+    record = next(iter(snapshots[0]))
+    assert record.Expiry == date(2025, 11, 21) and record.Volume == 10
+
+
+def test_replay_slices_show_their_own_step(tmp_path):
+    write_archive(str(tmp_path))
+    times, names, bids, listed = [], [], [], []
+    for time, chains in ChainArchive(str(tmp_path)).replay_slices(["GME", "AMC"], DAY):
+        # Read while the slice is current, the way an OnData replay consumes it
+        times.append(str(time))
+        names.append(sorted(chains))
+        bids.append(call_bid(chains["GME"]))
+        listed.append(len(chains["GME"]))
+    assert times == ["2025-11-03T09:31:00.000", "2025-11-03T09:32:00.000", "2025-11-03T09:33:00.000"]
+    assert names == [["AMC", "GME"], ["GME"], ["AMC", "GME"]]
+    assert bids == [1.1, 1.2, 1.3]
+    assert listed == [3, 3, 2]
+
+
+def test_replay_slices_interleaved_stream(tmp_path):
+    write_archive(str(tmp_path))
+    amc_bids = [call_bid(chains["AMC"], strike=4.0)
+                for _, chains in ChainArchive(str(tmp_path)).replay_slices(["GME", "AMC"], DAY) if "AMC" in chains]
+    assert amc_bids == [0.2, 0.3]
@@ -0,0 +1,53 @@
+"""
+doc_strategies_backtest put spread book: entries on every `entry_every_fridays`-th Friday never take the open book
+past max_spreads lots, and a spread that settles frees its lots for an entry on the same day.
+
+Usage (from this folder):
+    python -m pytest -q test_doc_strategies_backtest.py
+"""
+import numpy as np
+
+from doc_strategies_backtest import DEFAULT_SPREAD, entry_days, run_put_spreads
+
+START = np.datetime64("2025-01-03")  # a Friday
+
+
+def calm_vix(weeks=40, level=14.0):
+    days = START + np.arange(weeks * 7)
+    dates = days[(days.view("int64") - 4) % 7 < 5]
+    return {"dates": dates, "vix": np.full(len(dates), level)}
+
+
+def open_lots(result, lots):
+    """Lots open on each day: a spread counts from its entry day until (not including) its settlement day."""
+    dates = result["dates"]
+    entered = np.array([e["date"] for e in result["entries"]], dtype="datetime64[D]")
+    settled = np.array([e["expiry"] for e in result["entries"]], dtype="datetime64[D]")
+    return np.array([lots * np.sum((entered <= day) & (day < settled)) for day in dates])
+
+
+def test_entries_respect_the_lot_cap():
+    data = calm_vix()
+    config = DEFAULT_SPREAD._replace(entry_every_fridays=1, max_spreads=50)
+    result = run_put_spreads(data, config)
+    book = open_lots(result, config.lots)
+    assert book.max() == 50
+    # Weekly entries with a 45-day hold would stack up to seven spreads without the cap
+    fridays = data["dates"][entry_days(data["dates"], 1)]
+    assert len(result["entries"]) < len(fridays)
+
+
+def test_settlement_frees_lots_the_same_day():
+    data = calm_vix()
+    config = DEFAULT_SPREAD._replace(entry_every_fridays=1, max_spreads=25, dte=14)
+    result = run_put_spreads(data, config)
+    dates = [e["date"] for e in result["entries"]]
+    expiries = [e["expiry"] for e in result["entries"]]
+    # One spread at a time; each new one goes on as the previous one settles
+    assert dates[1:] == expiries[:-1]
+    assert open_lots(result, config.lots).max() == 25
+
+
+def test_high_vix_blocks_entries():
+    data = calm_vix(level=DEFAULT_SPREAD.vix_entry + 1.0)
+    assert run_put_spreads(data)["entries"] == []
@@ -0,0 +1,72 @@
+"""
+exit_grid against brute force: first_passage matches a bar-by-bar scan, and simulate picks the same exit as a
+per-entry loop over the rules.
+
+Usage (from this folder):
+    python -m pytest -q test_exit_grid.py
+"""
+import numpy as np
+
+from exit_grid import EXIT_HOLD, EXIT_STOP, EXIT_TARGET, EXIT_TRAIL, first_passage, simulate
+
+
+def random_paths(seed=7, count=40, width=60):
+    rng = np.random.default_rng(seed)
+    close = np.cumprod(1.0 + rng.normal(0.0, 0.02, (count, width)), axis=1) - 1.0
+    lengths = rng.integers(5, width + 1, count)
+    for row, length in enumerate(lengths):
+        close[row, length:] = np.nan
+    return close, lengths
+
+
+def brute_first_passage(running, thresholds, rising):
+    out = np.full((running.shape[0], len(thresholds)), running.shape[1], dtype=np.int64)
+    for row in range(running.shape[0]):
+        for k, threshold in enumerate(thresholds):
+            for bar, value in enumerate(running[row]):
+                if (value >= threshold) if rising else (value <= threshold):
+                    out[row, k] = bar
+                    break
+    return out
+
+
+def test_first_passage_matches_scan():
+    close, _ = random_paths()
+    running_low = np.fmin.accumulate(close, axis=1)
+    running_high = np.fmax.accumulate(close, axis=1)
+    stops = [-0.30, -0.10, -0.05, -0.01]
+    targets = [0.01, 0.05, 0.10, 0.30]
+    assert np.array_equal(first_passage(running_low, stops, rising=False), brute_first_passage(running_low, stops, False))
+    assert np.array_equal(first_passage(running_high, targets, rising=True), brute_first_passage(running_high, targets, True))
+
+
+def brute_exit(close, length, stop, target, trail, hold):
+    """Walk one path bar by bar; on the same bar the stop wins, then the trail, then the target."""
+    peak = 0.0
+    for bar in range(length):
+        value = close[bar]
+        peak = max(peak, value)
+        drawdown = (1.0 + value) / (1.0 + peak) - 1.0
+        if value <= stop:
+            return bar, EXIT_STOP
+        if drawdown <= -trail:
+            return bar, EXIT_TRAIL
+        if value >= target:
+            return bar, EXIT_TARGET
+        if bar == min(hold, length) - 1:
+            return bar, EXIT_HOLD
+    return length - 1, EXIT_HOLD
+
+
+def test_simulate_matches_per_entry_loop():
+    close, lengths = random_paths(seed=11)
+    stops, targets, trails, holds = [-0.15, -0.05], [0.10, 0.33], [0.08, np.inf], [20, 1000]
+    exit_return, exit_bar, reason = simulate({"close": close}, lengths, stops, targets, trails, holds)
+    for row in range(len(lengths)):
+        for s, stop in enumerate(stops):
+            for p, target in enumerate(targets):
+                for r, trail in enumerate(trails):
+                    for h, hold in enumerate(holds):
+                        bar, why = brute_exit(close[row], lengths[row], stop, target, trail, hold)
+                        assert (exit_bar[row, s, p, r, h], reason[row, s, p, r, h]) == (bar, why)
+                        assert exit_return[row, s, p, r, h] == close[row, bar]
@@ -0,0 +1,57 @@
+"""
+signal_backtest screening cadence on synthetic panels: screenings only on Mondays, at least 14 days after the last
+screening that traded, and none while the VIX is above the threshold.
+
+Usage (from this folder):
+    python -m pytest -q test_signal_backtest.py
+"""
+import numpy as np
+
+from signal_backtest import DEFAULT_CONFIG, run, screening_days
+
+START = np.datetime64("2025-01-06")  # a Monday
+NAMES = 24
+
+
+def weekdays(weeks):
+    days = START + np.arange(weeks * 7)
+    return days[(days.view("int64") - 4) % 7 < 5]  # 1970-01-01 was a Thursday
+
+
+def make_panels(weeks=10, high_vix_days=()):
+    """Flat prices (no exits), bullish call/put volume, IV drifting up with a spike on names 2w and 2w + 1 in week w,
+    so every screening has two fresh names at the top of its ranking."""
+    dates = weekdays(weeks)
+    symbols = np.array([f"M{j:02d}" for j in range(NAMES)] + ["SPY", "XLU"])
+    days = np.arange(len(dates))[:, None]
+    shape = (len(dates), len(symbols))
+    spiking = np.arange(len(symbols))[None, :] // 2 == days // 5
+    vix = np.full(len(dates), 15.0)
+    vix[np.isin(dates, np.array(high_vix_days, dtype="datetime64[D]"))] = 25.0
+    return {
+        "dates": dates, "symbols": symbols, "close": np.full(shape, 10.0),
+        "atm_iv": 0.5 + 0.001 * days + 0.1 * spiking,
+        "call_volume": np.full(shape, 200.0), "put_volume": np.full(shape, 100.0), "vix": vix,
+    }
+
+
+def entry_days(result):
+    return sorted({str(t.entry_date) for t in result["trades"]})
+
+
+def test_screening_days_are_mondays():
+    dates = weekdays(6)
+    mondays = dates[screening_days(dates)]
+    assert len(mondays) == 6
+    assert all(np.datetime64(day, "D").item().weekday() == 0 for day in mondays)
+
+
+def test_screenings_trade_every_other_monday():
+    result = run(make_panels(), DEFAULT_CONFIG._replace(top_n=2))
+    assert entry_days(result) == ["2025-01-06", "2025-01-20", "2025-02-03", "2025-02-17", "2025-03-03"]
+
+
+def test_high_vix_skips_the_screening_until_the_next_monday():
+    result = run(make_panels(high_vix_days=["2025-01-20"]), DEFAULT_CONFIG._replace(top_n=2))
+    # The blocked screening does not count as a trade, so the next Monday screens and the cadence restarts from it
+    assert entry_days(result) == ["2025-01-06", "2025-01-27", "2025-02-10", "2025-02-24", "2025-03-10"]